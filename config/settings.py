@@ -69,11 +69,42 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 # Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+DB_ENGINE = os.getenv('DB_ENGINE', 'django.db.backends.sqlite3')
+
+if DB_ENGINE == 'django.db.backends.sqlite3':
+    DATABASES = {
+        'default': {
+            'ENGINE': DB_ENGINE,
+            'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 600)),
+            'OPTIONS': {
+                # Seconds to wait for the write lock before "database is locked"
+                'timeout': 20,
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': DB_ENGINE,
+            'NAME': os.getenv('DB_NAME', 'sentiment'),
+            'USER': os.getenv('DB_USER', ''),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', ''),
+            'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+        }
     }
+
+# Applied to every SQLite connection (see sentiment_app/db_tuning.py)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,       # negative = KiB, i.e. 64 MB page cache
+    'mmap_size': 268435456,     # 256 MB memory-mapped I/O
+    'temp_store': 'MEMORY',
+    # No busy_timeout here: DATABASES OPTIONS 'timeout' sets the lock wait
 }
 
 # Password validation
@@ -127,6 +158,35 @@ CORS_ALLOWED_ORIGINS = [
 FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', 10485760))
 DATA_UPLOAD_MAX_MEMORY_SIZE = FILE_UPLOAD_MAX_MEMORY_SIZE
 
+# Keep a copy of bulk uploads in media/uploads/ (parsed in place otherwise)
+RETAIN_UPLOADS = os.getenv('RETAIN_UPLOADS', 'False') == 'True'
+
+# Working files that must never be served as media (kept outside MEDIA_ROOT)
+STAGING_DIR = BASE_DIR / 'staging'
+
+# Staging area for resumable chunked uploads, how long abandoned ones live,
+# the largest file one may declare, and the most reviews one completed upload
+# may analyze
+CHUNKED_UPLOAD_DIR = STAGING_DIR / 'chunked'
+CHUNKED_UPLOAD_EXPIRY = int(os.getenv('CHUNKED_UPLOAD_EXPIRY', 24 * 3600))
+CHUNKED_UPLOAD_MAX_BYTES = int(os.getenv('CHUNKED_UPLOAD_MAX_BYTES', 512 * 1024 * 1024))
+CHUNKED_UPLOAD_MAX_REVIEWS = int(os.getenv('CHUNKED_UPLOAD_MAX_REVIEWS', 10000))
+
+# Checkpointed bulk jobs: working files (raw review texts, so staged), rows
+# per checkpoint, and how long a processing job's checkpoint may stand still
+# before it counts as interrupted
+BULK_JOB_DIR = STAGING_DIR / 'bulk_jobs'
+BULK_CHECKPOINT_ROWS = int(os.getenv('BULK_CHECKPOINT_ROWS', 500))
+BULK_JOB_STALE_AFTER = int(os.getenv('BULK_JOB_STALE_AFTER', 300))
+
+# Bulk reports: a CSV is always written; 'parquet' and 'xlsx' can be added.
+# The CSV can be gzipped as it is written, and the extra formats are encoded
+# in their own threads while scoring continues.
+BULK_REPORT_FORMATS = os.getenv('BULK_REPORT_FORMATS', 'csv').split(',')
+BULK_REPORT_COMPRESS = os.getenv('BULK_REPORT_COMPRESS', 'False') == 'True'
+BULK_REPORT_PARALLEL = os.getenv('BULK_REPORT_PARALLEL', 'True') == 'True'
+BULK_REPORT_PARQUET_COMPRESSION = os.getenv('BULK_REPORT_PARQUET_COMPRESSION', 'zstd')
+
 # Logging
 LOGGING = {
     'version': 1,
@@ -169,4 +229,53 @@ LOGGING = {
 }
 
 # Model paths
-MODEL_DIR = BASE_DIR / 'sentiment_app/ml_models'
\ No newline at end of file
+MODEL_DIR = BASE_DIR / 'sentiment_app/ml_models'
+
+# Exported NumPy bundle of the deep learning model (see export_deep_model)
+DEEP_MODEL_BUNDLE = MODEL_DIR / 'deep_model.npz'
+
+# Versioned online (hashing + partial_fit) models (see update_online_model)
+ONLINE_MODEL_DIR = MODEL_DIR / 'online'
+
+# Archival of old analyses into Parquet files, run from cron with
+# "manage.py archive_analyses"
+ARCHIVE_DIR = BASE_DIR / 'archive'
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 365))
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 5000))
+
+# Seconds the per-user analytics (sentiment_app.analytics) stay cached
+USER_ANALYTICS_TTL = int(os.getenv('USER_ANALYTICS_TTL', 300))
+
+# Base URL used in links inside notification emails
+SITE_URL = os.getenv('SITE_URL', 'http://localhost:8000')
+
+# Outbox for deferred side effects (see sentiment_app.outbox). With
+# OUTBOX_AUTOSTART each process drains its own events in a background thread;
+# otherwise run `manage.py drain_outbox --loop`.
+OUTBOX_AUTOSTART = os.getenv('OUTBOX_AUTOSTART', 'True') == 'True'
+OUTBOX_POLL_INTERVAL = 5
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 5
+
+# Seconds payloads cached per data version (sentiment_app.data_version) are kept
+DATA_VERSION_CACHE_TTL = 3600
+
+# Import heavy libraries and load models in config/wsgi.py / asgi.py before
+# workers fork (see sentiment_app.startup). Off by default in development so
+# the autoreloader stays fast.
+PRELOAD_MODELS = os.getenv('PRELOAD_MODELS', str(not DEBUG)) == 'True'
+
+# Per-process admission control for the analysis endpoints (see
+# sentiment_app.admission for the lane options and their defaults)
+ADMISSION_CONTROL = {
+    'ENABLED': os.getenv('ADMISSION_CONTROL', 'True') == 'True',
+    'LANES': {
+        'interactive': {'max_concurrent': 16, 'max_queue': 32, 'queue_timeout': 0.5},
+        'batch': {'max_concurrent': 2, 'max_rows': 20000, 'max_queue': 4, 'queue_timeout': 2.0},
+    },
+}
+
+# Reports written by `manage.py evaluate_models`, and how long one isolated
+# scorer run may take before it is reported as failed
+EVALUATION_DIR = BASE_DIR / 'evaluation'
+EVALUATION_TIMEOUT = int(os.getenv('EVALUATION_TIMEOUT', 3600))
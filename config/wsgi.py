@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Import heavy libraries and load models once, before the server forks
+# workers (PRELOAD_MODELS); see sentiment_app.startup
+from sentiment_app.startup import warm_up  # noqa: E402
+
+warm_up()
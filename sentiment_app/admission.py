@@ -0,0 +1,274 @@
+# sentiment_app/admission.py
+"""
+Admission control for the analysis endpoints.
+
+Each worker process runs one AdmissionController. Endpoints are assigned to
+a priority lane in ``ADMISSION_CONTROL['ENDPOINTS']``. Interactive single
+reviews and batch work have separate capacity, so batch traffic can never
+take the slots single reviews need. A lane limits:
+
+* requests in flight (``max_concurrent``) and rows in flight (``max_rows``);
+* the same per user (``per_user_concurrent``, ``per_user_rows``);
+* how many requests may wait for a slot (``max_queue``) and for how long
+  (``queue_timeout``).
+
+A request that cannot be admitted is answered right away with 429 and a
+``Retry-After`` estimated from the lane's recent service times. A single
+request larger than the lane's row budget gets 413.
+"""
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+
+DEFAULT_LANES = {
+    INTERACTIVE: {
+        'max_concurrent': 16,
+        'max_rows': None,
+        'per_user_concurrent': 4,
+        'per_user_rows': None,
+        'max_queue': 32,
+        'queue_timeout': 0.5,
+    },
+    BATCH: {
+        'max_concurrent': 2,
+        'max_rows': 20000,
+        'per_user_concurrent': 1,
+        'per_user_rows': 10000,
+        'max_queue': 4,
+        'queue_timeout': 2.0,
+    },
+}
+
+DEFAULT_ENDPOINTS = {
+    'analyze_single': {'lane': INTERACTIVE},
+    'api_analyze': {'lane': INTERACTIVE},
+    'analyze_bulk': {'lane': BATCH},
+    'api_batch_analyze': {'lane': BATCH},
+    'api_upload_complete': {'lane': BATCH},
+}
+
+
+class AdmissionRejected(Exception):
+    """The request was shed; ``status`` is 429 (retry later) or 413 (too large)"""
+
+    def __init__(self, reason, retry_after=None, status=429):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.status = status
+
+
+class _Lane:
+    def __init__(self, name, max_concurrent, max_rows=None, per_user_concurrent=None,
+                 per_user_rows=None, max_queue=0, queue_timeout=0.0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_rows = max_rows
+        self.per_user_concurrent = per_user_concurrent
+        self.per_user_rows = per_user_rows
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.rows = 0
+        self.waiting = 0
+        self.user_active = {}
+        self.user_rows = {}
+        # Moving average of request durations, for Retry-After estimates
+        self.service_time = 1.0
+
+    def user_fits(self, user_key, rows):
+        if self.per_user_concurrent and self.user_active.get(user_key, 0) >= self.per_user_concurrent:
+            return False
+        if self.per_user_rows and self.user_rows.get(user_key, 0) + rows > self.per_user_rows:
+            return False
+        return True
+
+    def fits(self, rows):
+        if self.active >= self.max_concurrent:
+            return False
+        if self.max_rows and self.rows + rows > self.max_rows:
+            return False
+        return True
+
+    def retry_after(self):
+        # Time for the requests ahead of a new one to drain through the slots
+        backlog = self.waiting + max(self.active - self.max_concurrent + 1, 1)
+        return max(1, math.ceil(self.service_time * backlog / self.max_concurrent))
+
+
+class AdmissionController:
+    def __init__(self, lanes=None, endpoints=None):
+        lanes = lanes or DEFAULT_LANES
+        self.lanes = {name: _Lane(name, **options) for name, options in lanes.items()}
+        self.endpoints = endpoints or DEFAULT_ENDPOINTS
+        self.endpoint_active = {}
+        self._condition = threading.Condition()
+
+    def _endpoint_fits(self, endpoint):
+        limit = self.endpoints.get(endpoint, {}).get('max_concurrent')
+        return not limit or self.endpoint_active.get(endpoint, 0) < limit
+
+    @contextmanager
+    def admit(self, endpoint, user_key, rows=1):
+        """Hold a slot of ``endpoint``'s lane for the duration of the block"""
+        lane = self.lanes[self.endpoints.get(endpoint, {}).get('lane', INTERACTIVE)]
+        rows = max(int(rows or 1), 1)
+
+        with self._condition:
+            limit = min(filter(None, [lane.max_rows, lane.per_user_rows]), default=None)
+            if limit and rows > limit:
+                raise AdmissionRejected(f'Request of {rows} rows exceeds the limit of {limit}',
+                                        status=413)
+            # Per-user limits are not worth queueing for: the user's own work
+            # has to finish first
+            if not lane.user_fits(user_key, rows):
+                raise AdmissionRejected('Too many concurrent requests for this user',
+                                        retry_after=lane.retry_after())
+
+            if not (lane.fits(rows) and self._endpoint_fits(endpoint)):
+                if lane.waiting >= lane.max_queue:
+                    raise AdmissionRejected(f'{lane.name} queue is full',
+                                            retry_after=lane.retry_after())
+                lane.waiting += 1
+                deadline = time.monotonic() + lane.queue_timeout
+                try:
+                    while not (lane.fits(rows) and self._endpoint_fits(endpoint)
+                               and lane.user_fits(user_key, rows)):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise AdmissionRejected(f'Timed out waiting for a {lane.name} slot',
+                                                    retry_after=lane.retry_after())
+                        self._condition.wait(remaining)
+                finally:
+                    lane.waiting -= 1
+
+            lane.active += 1
+            lane.rows += rows
+            lane.user_active[user_key] = lane.user_active.get(user_key, 0) + 1
+            lane.user_rows[user_key] = lane.user_rows.get(user_key, 0) + rows
+            self.endpoint_active[endpoint] = self.endpoint_active.get(endpoint, 0) + 1
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._condition:
+                lane.service_time = 0.8 * lane.service_time + 0.2 * (time.monotonic() - started)
+                lane.active -= 1
+                lane.rows -= rows
+                self.endpoint_active[endpoint] -= 1
+                for counters, amount in ((lane.user_active, 1), (lane.user_rows, rows)):
+                    counters[user_key] -= amount
+                    if not counters[user_key]:
+                        del counters[user_key]
+                self._condition.notify_all()
+
+    def snapshot(self):
+        """Current load per lane, for logging and monitoring"""
+        with self._condition:
+            return {
+                name: {'active': lane.active, 'rows': lane.rows, 'waiting': lane.waiting}
+                for name, lane in self.lanes.items()
+            }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_controller():
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            config = getattr(settings, 'ADMISSION_CONTROL', {})
+            lanes = {name: dict(options) for name, options in DEFAULT_LANES.items()}
+            for name, options in config.get('LANES', {}).items():
+                lanes.setdefault(name, {}).update(options)
+            endpoints = dict(DEFAULT_ENDPOINTS, **config.get('ENDPOINTS', {}))
+            _controller = AdmissionController(lanes, endpoints)
+        return _controller
+
+
+def client_key(request):
+    """Per-user accounting key: the user id, or the client address when anonymous"""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f"addr:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def request_json(request):
+    """The JSON body of ``request``, parsed once for the row estimate and the view"""
+    if not hasattr(request, '_json_body'):
+        request._json_body = json.loads(request.body or '{}')
+    return request._json_body
+
+
+def json_texts_rows(request):
+    """Row estimate for JSON bodies with a ``texts`` list"""
+    try:
+        texts = request_json(request).get('texts', [])
+    except (ValueError, AttributeError):
+        return 1
+    return 1 if isinstance(texts, str) else len(texts)
+
+
+def max_reviews_rows(cap):
+    """
+    Row estimate for bulk runs: the requested maximum number of reviews, or
+    ``cap()`` (the most the view will analyze) when the request names none.
+    """
+    def estimate(request):
+        value = request.POST.get('max_reviews')
+        if value is None and request.content_type == 'application/json':
+            try:
+                value = request_json(request).get('max_reviews')
+            except (ValueError, AttributeError):
+                value = None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return cap()
+    return estimate
+
+
+def admission_controlled(endpoint, rows=None, json_response=True):
+    """
+    Run the view's POST requests under admission control for ``endpoint``.
+    ``rows`` estimates the request's row count from the request.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            config = getattr(settings, 'ADMISSION_CONTROL', {})
+            if request.method != 'POST' or not config.get('ENABLED', True):
+                return view(request, *args, **kwargs)
+
+            controller = get_controller()
+            try:
+                with controller.admit(endpoint, client_key(request),
+                                      rows(request) if rows else 1):
+                    return view(request, *args, **kwargs)
+            except AdmissionRejected as e:
+                logger.warning("Shed %s request (%s): %s", endpoint, e.status, e.reason)
+                if json_response:
+                    response = JsonResponse({'success': False, 'error': e.reason}, status=e.status)
+                else:
+                    response = HttpResponse(f'{e.reason}. Please try again shortly.',
+                                            status=e.status, content_type='text/plain')
+                if e.retry_after is not None:
+                    response['Retry-After'] = str(e.retry_after)
+                return response
+        return wrapper
+    return decorator
@@ -0,0 +1,132 @@
+# sentiment_app/analytics.py
+"""
+Per-user analytics, cached under ``user_analytics_<id>``.
+
+The numbers take three queries: one aggregate over the user's hot analyses
+(totals, distribution, confidence and recent activity), one over the archive
+rollups and a small top-negatives query. They are cached for
+``USER_ANALYTICS_TTL`` seconds together with the user's data version (see
+sentiment_app.data_version). That version is kept in the database, so a
+process whose cache still holds older numbers recomputes them instead of
+serving them. The post_save/post_delete signals bump the version; all
+invalidations raised inside one transaction are coalesced into a single bump
+per user when it commits, so bulk writes and archival runs bump it once.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.utils import timezone
+
+from .archive import archived_totals
+from .data_version import bump_scopes, get_data_version, on_commit_once, user_scope
+from .models import SENTIMENT_CODES, SentimentAnalysis
+
+logger = logging.getLogger(__name__)
+
+TOP_NEGATIVE_LIMIT = 5
+
+_state = threading.local()
+
+
+def cache_key(user_id):
+    return f"user_analytics_{user_id}"
+
+
+def compute_user_analytics(user):
+    """Compute the analytics dict for ``user`` from the database"""
+    now = timezone.now()
+    analyses = SentimentAnalysis.objects.filter(user=user).order_by()
+
+    # Totals, distribution, confidence and recent activity in one query
+    stats = analyses.aggregate(
+        total=Count('id'),
+        confidence_sum=Sum('confidence'),
+        average_confidence=Avg('confidence'),
+        last_analysis_at=Max('created_at'),
+        last_24h=Count('id', filter=Q(created_at__gte=now - timedelta(days=1))),
+        last_7_days=Count('id', filter=Q(created_at__gte=now - timedelta(days=7))),
+        last_30_days=Count('id', filter=Q(created_at__gte=now - timedelta(days=30))),
+        **{label: Count('id', filter=Q(sentiment=label)) for label in SENTIMENT_CODES}
+    )
+
+    # Archived analyses still count towards the totals
+    archived = archived_totals(user)
+    total = stats['total'] + archived['total']
+    confidence_sum = (stats['confidence_sum'] or 0) + archived['confidence_sum']
+    distribution = {label: stats[label] + archived[label] for label in SENTIMENT_CODES}
+
+    top_negative = list(
+        analyses.filter(sentiment='negative')
+        .order_by('-confidence', '-created_at')
+        .values('id', 'text', 'confidence', 'created_at')[:TOP_NEGATIVE_LIMIT]
+    )
+
+    return {
+        'total': total,
+        'distribution': distribution,
+        'percentages': {
+            label: (count / total * 100 if total else 0) for label, count in distribution.items()
+        },
+        'average_confidence': confidence_sum / total if total else 0,
+        'recent_activity': {
+            'last_24h': stats['last_24h'],
+            'last_7_days': stats['last_7_days'],
+            'last_30_days': stats['last_30_days'],
+            'last_analysis_at': stats['last_analysis_at'],
+        },
+        'top_negative': top_negative,
+        'computed_at': now,
+    }
+
+
+def get_user_analytics(user):
+    """Cached analytics for ``user`` (None for anonymous users)"""
+    if user is None or not user.is_authenticated:
+        return None
+
+    key = cache_key(user.id)
+    version = get_data_version(user_scope(user.id))
+    cached = cache.get(key)
+    if cached is not None and cached['version'] == version:
+        return cached['analytics']
+
+    analytics = compute_user_analytics(user)
+    cache.set(key, {'version': version, 'analytics': analytics},
+              getattr(settings, 'USER_ANALYTICS_TTL', 300))
+    return analytics
+
+
+# ---------------------------------------------------------------------------
+# Invalidation
+# ---------------------------------------------------------------------------
+
+def _flush(user_ids):
+    if user_ids:
+        bump_scopes([user_scope(user_id) for user_id in sorted(user_ids)])
+        cache.delete_many([cache_key(user_id) for user_id in user_ids])
+        logger.debug(f"Invalidated analytics cache for {len(user_ids)} users")
+
+
+def _flush_on_commit():
+    pending = getattr(_state, 'on_commit_pending', set())
+    _state.on_commit_pending = set()
+    _flush(pending)
+
+
+def invalidate_user_analytics(user_id):
+    """Drop the cached analytics of ``user_id``, coalescing bursts"""
+    if connection.in_atomic_block:
+        # One callback per transaction, however many rows it writes. Ids
+        # left over from a rolled-back transaction are dropped with it.
+        if on_commit_once('user_analytics', _flush_on_commit):
+            _state.on_commit_pending = set()
+        _state.on_commit_pending.add(user_id)
+        return
+
+    _flush([user_id])
+
@@ -6,6 +6,9 @@ class SentimentAppConfig(AppConfig):
     name = 'sentiment_app'
     
     def ready(self):
+        # Registers the SQLite connection pragmas
+        import sentiment_app.db_tuning  # noqa: F401
+
         # Import signals when the app is ready
         try:
             import sentiment_app.signals
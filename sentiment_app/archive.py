@@ -0,0 +1,432 @@
+# sentiment_app/archive.py
+"""
+Tiered archival of old analyses.
+
+Analyses older than ``ARCHIVE_AFTER_DAYS`` are moved out of the hot
+SentimentAnalysis table into Parquet files partitioned per user and month::
+
+    ARCHIVE_DIR/user=<id|anonymous>/month=YYYY-MM/part-<first_id>-<last_id>.parquet
+
+Every file is recorded as an ArchivePart, and counts and confidence sums of
+everything archived are kept in ArchivedRollup, so totals and distributions
+stay correct. HistoryList lets the history page and exports page through hot
+and archived rows as one list, reading the archive one month at a time.
+
+Nothing archives on its own: run ``manage.py archive_analyses`` from cron
+(e.g. nightly) to move rows as they age past the threshold.
+"""
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .db_tuning import bulk_insert
+from .models import SENTIMENT_CODES, ArchivedRollup, ArchivePart, SentimentAnalysis
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLUMNS = [
+    'id', 'user_id', 'text', 'sentiment', 'confidence',
+    'prob_negative', 'prob_neutral', 'prob_positive',
+    'model_used', 'meta_data', 'created_at',
+]
+
+
+class ArchiveUnavailable(Exception):
+    """pyarrow is not installed, so Parquet archives cannot be read or written"""
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise ArchiveUnavailable('pyarrow is required for the analysis archive')
+
+
+def get_archive_dir():
+    return str(getattr(settings, 'ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'archive')))
+
+
+def _user_dir(user_id):
+    return os.path.join(get_archive_dir(), f"user={user_id if user_id is not None else 'anonymous'}")
+
+
+def _partition_dir(user_id, month):
+    return os.path.join(_user_dir(user_id), f'month={month:%Y-%m}')
+
+
+# ---------------------------------------------------------------------------
+# Write path
+# ---------------------------------------------------------------------------
+
+def _row_record(analysis):
+    return {
+        'id': analysis.id,
+        'user_id': analysis.user_id,
+        'text': analysis.text,
+        'sentiment': analysis.sentiment,
+        'confidence': analysis.confidence,
+        'prob_negative': analysis.prob_negative,
+        'prob_neutral': analysis.prob_neutral,
+        'prob_positive': analysis.prob_positive,
+        'model_used': analysis.model_used,
+        'meta_data': json.dumps(analysis.meta_data or {}),
+        'created_at': analysis.created_at,
+    }
+
+
+def _archive_schema(pa):
+    return pa.schema([
+        ('id', pa.int64()),
+        ('user_id', pa.int64()),
+        ('text', pa.string()),
+        ('sentiment', pa.string()),
+        ('confidence', pa.float64()),
+        ('prob_negative', pa.float64()),
+        ('prob_neutral', pa.float64()),
+        ('prob_positive', pa.float64()),
+        ('model_used', pa.string()),
+        ('meta_data', pa.string()),
+        ('created_at', pa.timestamp('us', tz='UTC')),
+    ])
+
+
+def _write_partition(records, directory, filename):
+    """Write one Parquet file atomically (tmp file + rename)"""
+    pa = _pyarrow()
+    os.makedirs(directory, exist_ok=True)
+    table = pa.Table.from_pylist(records, schema=_archive_schema(pa))
+    tmp_path = os.path.join(directory, f'.{filename}.tmp')
+    pa.parquet.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, os.path.join(directory, filename))
+
+
+def remove_unrecorded_parts():
+    """
+    Delete archive files without an ArchivePart, left behind by a run that
+    died after writing them but before its transaction committed. Their rows
+    are still in SentimentAnalysis and get archived again.
+    """
+    archive_dir = get_archive_dir()
+    if not os.path.isdir(archive_dir):
+        return 0
+    recorded = set(ArchivePart.objects.values_list('path', flat=True))
+    removed = 0
+    for directory, _, filenames in os.walk(archive_dir):
+        for filename in filenames:
+            path = os.path.relpath(os.path.join(directory, filename), archive_dir)
+            if filename.endswith('.parquet') and path not in recorded:
+                os.remove(os.path.join(directory, filename))
+                removed += 1
+    if removed:
+        logger.warning(f"Removed {removed} unrecorded archive files from an interrupted run")
+    return removed
+
+
+def archive_analyses(older_than_days=None, batch_size=None, max_batches=None):
+    """
+    Move analyses older than ``older_than_days`` into the archive, batch by batch.
+
+    Each batch is written to Parquet first. Its rows are then deleted from
+    the database in one transaction with the rollup update and the ArchivePart
+    records of the new files. Readers only see recorded files, so a crash
+    between the two steps leaves an unrecorded file that the next run removes
+    before archiving the same rows again. Returns the number of archived
+    analyses.
+    """
+    _pyarrow()
+    remove_unrecorded_parts()
+    if older_than_days is None:
+        older_than_days = getattr(settings, 'ARCHIVE_AFTER_DAYS', 365)
+    if batch_size is None:
+        batch_size = getattr(settings, 'ARCHIVE_BATCH_SIZE', 5000)
+
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    archived = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        rows = list(
+            SentimentAnalysis.objects.filter(created_at__lt=cutoff)
+            .select_related('model_version')
+            .order_by('id')[:batch_size]
+        )
+        if not rows:
+            break
+
+        first_id, last_id = rows[0].id, rows[-1].id
+        partitions = defaultdict(list)
+        rollups = defaultdict(lambda: [0, 0.0])
+        for analysis in rows:
+            month = analysis.created_at.date().replace(day=1)
+            partitions[(analysis.user_id, month)].append(_row_record(analysis))
+            rollup = rollups[(analysis.user_id, month, analysis.sentiment)]
+            rollup[0] += 1
+            rollup[1] += analysis.confidence or 0
+
+        parts = []
+        for (user_id, month), records in partitions.items():
+            directory = _partition_dir(user_id, month)
+            filename = f'part-{first_id:012d}-{last_id:012d}.parquet'
+            _write_partition(records, directory, filename)
+            parts.append(ArchivePart(
+                user_id=user_id, month=month, rows=len(records),
+                path=os.path.relpath(os.path.join(directory, filename), get_archive_dir()),
+            ))
+
+        with transaction.atomic():
+            bulk_insert(ArchivePart, parts)
+            for (user_id, month, sentiment), (count, confidence_sum) in rollups.items():
+                rollup, _ = ArchivedRollup.objects.get_or_create(
+                    user_id=user_id, month=month, sentiment=sentiment
+                )
+                ArchivedRollup.objects.filter(pk=rollup.pk).update(
+                    count=F('count') + count,
+                    confidence_sum=F('confidence_sum') + confidence_sum,
+                )
+            SentimentAnalysis.objects.filter(id__in=[r.id for r in rows]).delete()
+
+        archived += len(rows)
+        batches += 1
+        logger.info(f"Archived analyses {first_id}-{last_id} ({len(rows)} rows)")
+
+    return archived
+
+
+# ---------------------------------------------------------------------------
+# Read path
+# ---------------------------------------------------------------------------
+
+class ArchivedAnalysis:
+    """Read-only stand-in for a SentimentAnalysis row that lives in the archive"""
+    is_archived = True
+
+    def __init__(self, record, user=None):
+        self.id = record['id']
+        self.user_id = record['user_id']
+        self.user = user
+        self.text = record['text']
+        self.sentiment = record['sentiment']
+        self.confidence = record['confidence']
+        self.prob_negative = record['prob_negative']
+        self.prob_neutral = record['prob_neutral']
+        self.prob_positive = record['prob_positive']
+        self.model_used = record['model_used']
+        self.meta_data = json.loads(record['meta_data'] or '{}')
+        self.created_at = record['created_at']
+
+    def __str__(self):
+        return f"{self.sentiment} - {self.text[:50]}..."
+
+
+class ArchivedRows:
+    """
+    Archived analyses of ``user`` (all users if None), newest first.
+
+    Rows are read one month partition at a time, and only for the months that
+    iteration or a slice actually reaches. Without a search the size of each
+    month comes from ArchivedRollup, so a deep page skips the months before it
+    without opening them; with a search only the text column is scanned to
+    size them.
+    """
+
+    def __init__(self, user=None, sentiment=None, search=None):
+        self.user = user
+        self.sentiment = sentiment
+        self.search = search
+        self._sizes = None
+        self._month = None
+
+    def _parts(self):
+        parts = ArchivePart.objects.all()
+        if self.user is not None:
+            parts = parts.filter(user=self.user)
+        return parts
+
+    def _read_month(self, month, columns):
+        """Matching rows of one month as a pyarrow table, newest first"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+
+        archive_dir = get_archive_dir()
+        paths = [os.path.join(archive_dir, path)
+                 for path in self._parts().filter(month=month).values_list('path', flat=True)]
+        if not paths:
+            return pa.table({c: [] for c in columns})
+
+        dataset = ds.dataset(paths, schema=_archive_schema(pa), format='parquet')
+        expression = None
+        if self.sentiment is not None:
+            expression = ds.field('sentiment') == self.sentiment
+        if self.search:
+            match = pc.match_substring(pc.utf8_lower(ds.field('text')), self.search.lower())
+            expression = match if expression is None else expression & match
+        table = dataset.to_table(columns=columns, filter=expression)
+        if 'created_at' in columns:
+            table = table.sort_by([('created_at', 'descending'), ('id', 'descending')])
+        return table
+
+    def _rows(self, month):
+        # Keep the last month read, so consecutive slices of it parse it once
+        if self._month is None or self._month[0] != month:
+            table = self._read_month(month, ARCHIVE_COLUMNS)
+            self._month = (month, [ArchivedAnalysis(r, self.user) for r in table.to_pylist()])
+        return self._month[1]
+
+    def sizes(self):
+        """``[(month, matching rows)]``, newest month first"""
+        if self._sizes is not None:
+            return self._sizes
+        try:
+            _pyarrow()
+        except ArchiveUnavailable as e:
+            logger.warning(f"Archived analyses not available: {e}")
+            self._sizes = []
+            return self._sizes
+
+        if self.search:
+            months = self._parts().order_by('-month').values_list('month', flat=True).distinct()
+            self._sizes = [(month, self._read_month(month, ['text']).num_rows) for month in months]
+        else:
+            rollups = ArchivedRollup.objects.all()
+            if self.user is not None:
+                rollups = rollups.filter(user=self.user)
+            if self.sentiment is not None:
+                rollups = rollups.filter(sentiment=self.sentiment)
+            rows = rollups.order_by('-month').values('month').annotate(n=Sum('count'))
+            self._sizes = [(row['month'], row['n']) for row in rows if row['n']]
+        return self._sizes
+
+    def __len__(self):
+        return sum(size for _, size in self.sizes())
+
+    def __iter__(self):
+        for month, _ in self.sizes():
+            yield from self._rows(month)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+
+        start, stop = key.start or 0, key.stop
+        items = []
+        month_start = 0
+        for month, size in self.sizes():
+            month_stop = month_start + size
+            if stop is not None and month_start >= stop:
+                break
+            if month_stop > start:
+                rows = self._rows(month)
+                items.extend(rows[max(start - month_start, 0):
+                                  stop - month_start if stop is not None else None])
+            month_start = month_stop
+        return items
+
+
+def read_archived(user=None, sentiment=None, search=None):
+    """Archived analyses of ``user`` (all users if None), newest first"""
+    return ArchivedRows(user, sentiment, search)
+
+
+def archived_totals(user=None):
+    """Counts per sentiment, total and confidence sum of archived analyses"""
+    rollups = ArchivedRollup.objects.all()
+    if user is not None:
+        rollups = rollups.filter(user=user)
+
+    totals = {label: 0 for label in SENTIMENT_CODES}
+    totals['total'] = 0
+    totals['confidence_sum'] = 0.0
+    for row in rollups.values('sentiment').annotate(n=Sum('count'), conf=Sum('confidence_sum')):
+        totals[row['sentiment']] = row['n'] or 0
+        totals['total'] += row['n'] or 0
+        totals['confidence_sum'] += row['conf'] or 0
+    return totals
+
+
+def combined_totals(user=None):
+    """Sentiment counts and average confidence over hot and archived analyses"""
+    analyses = SentimentAnalysis.objects.all()
+    if user is not None:
+        analyses = analyses.filter(user=user)
+
+    totals = archived_totals(user)
+    rows = analyses.order_by().values('sentiment').annotate(n=Count('id'), conf=Sum('confidence'))
+    for row in rows:
+        totals[row['sentiment']] += row['n']
+        totals['total'] += row['n']
+        totals['confidence_sum'] += row['conf'] or 0
+
+    totals['average_confidence'] = (
+        totals['confidence_sum'] / totals['total'] if totals['total'] else 0
+    )
+    return totals
+
+
+class HistoryList:
+    """
+    Hot queryset followed by archived rows, usable with Paginator and for
+    exports. Archived rows are always older than hot ones, so with newest-first
+    ordering they simply come after the queryset.
+    """
+
+    def __init__(self, queryset, user=None, sentiment=None, search=None, total=None):
+        self.queryset = queryset
+        self.user = user
+        self.sentiment = sentiment
+        self.search = search
+        # Known hot + archived count (e.g. from the analytics cache); saves
+        # the COUNT queries when no search is applied
+        self.total = total
+        self._archived = None
+        self._hot_count = None
+
+    @property
+    def archived(self):
+        if self._archived is None:
+            self._archived = read_archived(self.user, self.sentiment, self.search)
+        return self._archived
+
+    def hot_count(self):
+        if self._hot_count is None:
+            self._hot_count = self.queryset.count()
+        return self._hot_count
+
+    def archived_count(self):
+        return len(self.archived)
+
+    def count(self):
+        if self.total is not None and not self.search:
+            return self.total
+        return self.hot_count() + self.archived_count()
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        yield from self.queryset.iterator()
+        yield from self.archived
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return list(self[key:key + 1])[0]
+
+        start, stop = key.start or 0, key.stop
+        hot_count = self.hot_count()
+        items = []
+        if start < hot_count:
+            items.extend(self.queryset[start:min(stop, hot_count) if stop is not None else None])
+        if stop is None or stop > hot_count:
+            archived_start = max(start - hot_count, 0)
+            archived_stop = stop - hot_count if stop is not None else None
+            items.extend(self.archived[archived_start:archived_stop])
+        return items
@@ -0,0 +1,158 @@
+# sentiment_app/batch_summary.py
+"""
+Precomputed summaries of finished bulk batches.
+
+A bulk job adds each chunk of results to a SummaryBuilder as it is scored
+(a resumed job first replays the rows it had already committed), so the
+summary is ready when the job completes. It is stored in
+``BatchAnalysis.summary``, and the detail page and the summary API serve it
+without opening the report again. It holds:
+
+* ``confidence_histogram`` - per-sentiment counts in ``CONFIDENCE_BINS``
+  equal-width confidence bins;
+* ``top_confident`` - the ``TOP_K`` most confident reviews per sentiment;
+* ``length_distribution`` - sentiment counts per review-length bucket
+  (in words, see ``LENGTH_BUCKETS``);
+* ``sample`` - the first ``SAMPLE_PAGE_SIZE`` result rows.
+
+Batches finished before summaries existed get theirs built from the results
+file on first view. Their report only keeps the first 100 characters of each
+review, so their length buckets are marked ``approximate``.
+"""
+import csv
+import heapq
+import logging
+import os
+
+from django.utils import timezone
+
+from .models import BatchAnalysis
+from .reports import iter_results
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_VERSION = 1
+CONFIDENCE_BINS = 10
+TOP_K = 5
+SAMPLE_PAGE_SIZE = 50
+SENTIMENTS = ['positive', 'neutral', 'negative']
+
+# (label, upper bound in words, exclusive); the last bucket is open-ended
+LENGTH_BUCKETS = [
+    ('1-10 words', 11),
+    ('11-50 words', 51),
+    ('51-150 words', 151),
+    ('151+ words', None),
+]
+
+SAMPLE_FIELDS = ['id', 'text', 'sentiment', 'confidence', 'model', 'group_id']
+
+
+def word_count(text):
+    return len(str(text).split())
+
+
+class SummaryBuilder:
+    """Accumulates a batch summary one result row at a time"""
+
+    def __init__(self, approximate_lengths=False):
+        self.histogram = {s: [0] * CONFIDENCE_BINS for s in SENTIMENTS}
+        self.lengths = [{s: 0 for s in SENTIMENTS} for _ in LENGTH_BUCKETS]
+        # Min-heaps of (confidence, -row id, entry) keep the k largest
+        self.top = {s: [] for s in SENTIMENTS}
+        self.sample = []
+        self.rows = 0
+        self.approximate_lengths = approximate_lengths
+
+    def add(self, record, word_count):
+        """Add one result row; ``word_count`` is the length of the full review"""
+        self.rows += 1
+        if len(self.sample) < SAMPLE_PAGE_SIZE:
+            self.sample.append({field: record.get(field) for field in SAMPLE_FIELDS})
+
+        sentiment = record.get('sentiment')
+        if sentiment not in self.histogram:
+            return
+        confidence = float(record.get('confidence') or 0)
+        position = min(max(int(confidence * CONFIDENCE_BINS), 0), CONFIDENCE_BINS - 1)
+        self.histogram[sentiment][position] += 1
+
+        for i, (_, upper) in enumerate(LENGTH_BUCKETS):
+            if upper is None or word_count < upper:
+                self.lengths[i][sentiment] += 1
+                break
+
+        entry = (confidence, -int(record['id']),
+                 {'id': int(record['id']), 'text': record.get('text'), 'confidence': confidence})
+        heap = self.top[sentiment]
+        if len(heap) < TOP_K:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+    def build(self):
+        return {
+            'version': SUMMARY_VERSION,
+            'rows': self.rows,
+            'computed_at': timezone.now().isoformat(),
+            'confidence_histogram': {
+                'bins': [round(i / CONFIDENCE_BINS, 2) for i in range(CONFIDENCE_BINS + 1)],
+                'counts': self.histogram,
+            },
+            'top_confident': {
+                s: [entry for _, _, entry in sorted(self.top[s], key=lambda e: e[:2], reverse=True)]
+                for s in SENTIMENTS
+            },
+            'length_distribution': {
+                'approximate': self.approximate_lengths,
+                'buckets': [
+                    {'label': label, **counts}
+                    for (label, _), counts in zip(LENGTH_BUCKETS, self.lengths)
+                ],
+            },
+            'sample': self.sample,
+        }
+
+
+def summary_builder_from_file(path, texts=None):
+    """
+    SummaryBuilder holding the rows of a results CSV. ``texts`` iterates the
+    full review texts in row order; without it, lengths come from the
+    (truncated) text column.
+    """
+    builder = SummaryBuilder(approximate_lengths=texts is None)
+    texts = iter(texts) if texts is not None else None
+    for record in iter_results(path):
+        text = next(texts) if texts is not None else record.get('text') or ''
+        builder.add(record, word_count(text))
+    return builder
+
+
+def summarize_results_file(path, texts=None):
+    """Summary of a results CSV; see summary_builder_from_file()"""
+    return summary_builder_from_file(path, texts).build()
+
+
+def store_summary(batch, summary):
+    """Save ``summary`` on ``batch`` without triggering its post_save handlers"""
+    BatchAnalysis.objects.filter(pk=batch.pk).update(summary=summary)
+    batch.summary = summary
+
+
+def get_batch_summary(batch):
+    """The stored summary of a completed batch, building it first if missing"""
+    summary = batch.summary
+    if summary and summary.get('version') == SUMMARY_VERSION:
+        return summary
+    if batch.status != 'completed' or not batch.results_file:
+        return None
+    path = batch.results_file.path
+    if not os.path.exists(path):
+        return None
+    try:
+        summary = summarize_results_file(path)
+    except (OSError, ValueError, KeyError, csv.Error) as e:
+        logger.error(f"Could not summarize batch {batch.id}: {e}")
+        return None
+    store_summary(batch, summary)
+    return summary
@@ -0,0 +1,382 @@
+# sentiment_app/bulk.py
+"""
+Bulk analysis pipeline shared by the upload form and the chunked upload API.
+
+A bulk run is a resumable job. When it starts, the texts and their duplicate
+groups are written to ``BULK_JOB_DIR/<batch id>/``. That directory is under
+``STAGING_DIR``, outside MEDIA_ROOT, so raw uploads are never served. Rows
+are then scored in chunks of ``BULK_CHECKPOINT_ROWS``, and each chunk goes
+to the job's report writer (see sentiment_app.reports). The writer appends
+it to a partial CSV and fsyncs that before the BatchAnalysis checkpoint is
+committed. The checkpoint records the row offset, the counters and the size
+of the partial CSV.
+
+If the process dies, ``resume_bulk_job()`` truncates the partial output back
+to the last committed size and carries on from that offset. No row is scored
+or counted twice. Once every row is done, the reports are renamed into
+``media/reports/``; a job that died after that step is only marked completed.
+
+A worker holds an exclusive lock on the job directory while it runs, so a
+live worker is never taken over. Every checkpoint is also conditional on the
+checkpoint the worker wrote last, and a worker whose job moved on stops.
+"""
+import fcntl
+import json
+import logging
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .batch_summary import SummaryBuilder, summarize_results_file, summary_builder_from_file, word_count
+from .dedup import DEDUP_EXACT, DuplicateGroups, group_duplicates
+from .models import BatchAnalysis
+from .reports import FORMAT_CSV, ChunkedReportWriter, iter_results, report_formats
+from .services import analyzer
+
+logger = logging.getLogger(__name__)
+
+SCORING_BATCH_SIZE = 50
+
+INPUT_FILE = 'input.jsonl'
+GROUPS_FILE = 'groups.json'
+LOCK_FILE = 'lock'
+
+
+class JobTaken(Exception):
+    """Another worker is running the job, or took it over"""
+
+
+def get_job_dir(batch_id):
+    # Outside MEDIA_ROOT: the job files hold every uploaded review text
+    base = getattr(settings, 'BULK_JOB_DIR', os.path.join(settings.BASE_DIR, 'staging', 'bulk_jobs'))
+    return os.path.join(str(base), str(batch_id))
+
+
+def _checkpoint_rows():
+    return getattr(settings, 'BULK_CHECKPOINT_ROWS', 500)
+
+
+def _write_json_atomic(path, data):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def create_bulk_job(user, file_name, texts, model_type='ensemble',
+                    dedup_mode=DEDUP_EXACT, similarity_threshold=0.9):
+    """Persist the input and duplicate groups of a new job; returns (batch, groups)"""
+    # Collapse duplicates so each unique review is scored once
+    groups = group_duplicates(texts, mode=dedup_mode or DEDUP_EXACT,
+                              threshold=similarity_threshold or 0.9)
+
+    batch = BatchAnalysis.objects.create(
+        user=user if user is not None and user.is_authenticated else None,
+        file_name=file_name,
+        status='processing',
+        total_reviews=len(texts),
+        checkpoint_at=timezone.now(),
+        job_options={
+            'model_type': model_type,
+            'dedup_mode': dedup_mode or DEDUP_EXACT,
+            'similarity_threshold': similarity_threshold or 0.9,
+            # Fixed for the job's lifetime, so a resumed run writes the same reports
+            'report_formats': report_formats(),
+            'compress_report': getattr(settings, 'BULK_REPORT_COMPRESS', False),
+        },
+    )
+
+    job_dir = get_job_dir(batch.id)
+    os.makedirs(job_dir, exist_ok=True)
+    input_path = os.path.join(job_dir, INPUT_FILE)
+    with open(input_path + '.tmp', 'w', encoding='utf-8') as f:
+        for text in texts:
+            f.write(json.dumps(text) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(input_path + '.tmp', input_path)
+    _write_json_atomic(os.path.join(job_dir, GROUPS_FILE), {
+        'group_ids': groups.group_ids,
+        'representatives': groups.representatives,
+    })
+    return batch, groups
+
+
+def _load_groups(job_dir):
+    with open(os.path.join(job_dir, GROUPS_FILE)) as f:
+        data = json.load(f)
+    return DuplicateGroups(data['group_ids'], data['representatives'])
+
+
+def _iter_input(job_dir, start):
+    with open(os.path.join(job_dir, INPUT_FILE), encoding='utf-8') as f:
+        for row, line in enumerate(f):
+            if row >= start:
+                yield json.loads(line)
+
+
+def _pending_group_results(output_path, groups, offset):
+    """
+    Results of groups scored before ``offset`` that still have rows at or
+    after it, read back from the partial output.
+    """
+    needed = {groups.group_ids[row] for row in range(offset, groups.total)}
+    needed = {g for g in needed if groups.representatives[g] < offset}
+    results = {}
+    if not needed:
+        return results
+    for record in iter_results(output_path):
+        group_id = record['group_id']
+        if group_id in needed and group_id not in results:
+            result = {
+                'sentiment': record['sentiment'],
+                'confidence': record['confidence'],
+                'model': record['model'],
+            }
+            if record.get('error'):
+                result['error'] = record['error']
+            results[group_id] = result
+    return results
+
+
+def _score_chunk(texts, rows, groups, group_results, model_type):
+    """Score the groups first seen in this chunk and fan out to its rows"""
+    new_groups = []
+    for offset, row in enumerate(rows):
+        group_id = groups.group_ids[row]
+        if group_id not in group_results and groups.representatives[group_id] == row:
+            new_groups.append((group_id, texts[offset]))
+
+    for i in range(0, len(new_groups), SCORING_BATCH_SIZE):
+        batch = new_groups[i:i + SCORING_BATCH_SIZE]
+        scored = analyzer.batch_analyze([text for _, text in batch], model_type)
+        for (group_id, _), result in zip(batch, scored):
+            group_results[group_id] = result
+
+    records = []
+    for text, row in zip(texts, rows):
+        group_id = groups.group_ids[row]
+        result = group_results[group_id]
+        records.append({
+            'id': row,
+            'text': text[:100] + '...' if len(text) > 100 else text,
+            'sentiment': result.get('sentiment'),
+            'confidence': result.get('confidence', 0),
+            'model': result.get('model'),
+            'group_id': group_id,
+            'error': result.get('error', ''),
+        })
+    return records
+
+
+def _reports_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'reports')
+
+
+@contextmanager
+def _job_lock(job_dir):
+    """Hold the job directory for this worker; raises JobTaken if it is held"""
+    with open(os.path.join(job_dir, LOCK_FILE), 'a') as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise JobTaken(f'Job directory {job_dir} is locked by another worker')
+        yield
+
+
+def _claim(batch):
+    """Take over a job whose checkpoint is unchanged since it was loaded"""
+    claimed = BatchAnalysis.objects.filter(
+        pk=batch.pk, status='processing', checkpoint_at=batch.checkpoint_at,
+    ).update(checkpoint_at=timezone.now())
+    if claimed:
+        batch.refresh_from_db()
+    return bool(claimed)
+
+
+def process_bulk_job(batch, claim=False):
+    """
+    Score the remaining rows of ``batch`` from its last checkpoint and finish it.
+    With ``claim`` the job is first taken over from the worker that left it.
+    """
+    job_dir = get_job_dir(batch.id)
+    with _job_lock(job_dir):
+        if claim and not _claim(batch):
+            raise JobTaken(f'Batch {batch.id} was taken over by another worker')
+
+        groups = _load_groups(job_dir)
+        options = batch.job_options
+        model_type = options.get('model_type', 'ensemble')
+        chunk_size = _checkpoint_rows()
+        offset = batch.processed_reviews
+
+        published = batch.report_files.get(FORMAT_CSV)
+        if published and os.path.exists(os.path.join(_reports_dir(), published)):
+            # The reports were moved into place, but the job died before it
+            # was marked completed. The CSV is moved last, so all are there.
+            logger.info(f"Batch {batch.id} was already published, completing it")
+            summary = summarize_results_file(os.path.join(_reports_dir(), published),
+                                             _iter_input(job_dir, 0))
+            return _complete_job(batch, summary)
+
+        # Resuming truncates the partial CSV back to the last committed checkpoint
+        writer = ChunkedReportWriter(
+            job_dir,
+            formats=options.get('report_formats', ['csv']),
+            compress=options.get('compress_report', False),
+            resume_size=batch.output_bytes if offset else None,
+            replay_chunk_size=chunk_size,
+        )
+        try:
+            return _process_chunks(batch, groups, writer, offset, model_type, chunk_size)
+        except JobTaken:
+            # The partial files belong to the new owner now
+            writer.detach()
+            raise
+        except Exception:
+            writer.abort()
+            raise
+
+
+def _process_chunks(batch, groups, writer, offset, model_type, chunk_size):
+    job_dir = get_job_dir(batch.id)
+    output_path = writer.partial_path
+    group_results = _pending_group_results(output_path, groups, offset) if offset else {}
+    if offset:
+        # Replay the committed rows; the input still has the full texts for lengths
+        summary = summary_builder_from_file(output_path, _iter_input(job_dir, 0))
+    else:
+        summary = SummaryBuilder()
+
+    # Last row of every group, so results can be dropped once no longer needed
+    last_row = {}
+    for row, group_id in enumerate(groups.group_ids):
+        last_row[group_id] = row
+
+    if offset:
+        logger.info(f"Resuming batch {batch.id} at row {offset} of {groups.total}")
+
+    texts = _iter_input(job_dir, offset)
+    while offset < groups.total:
+        chunk_texts = [text for _, text in zip(range(chunk_size), texts)]
+        rows = range(offset, offset + len(chunk_texts))
+        records = _score_chunk(chunk_texts, rows, groups, group_results, model_type)
+
+        output_bytes = writer.write(records)
+
+        counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+        for record in records:
+            if record['sentiment'] in counts:
+                counts[record['sentiment']] += 1
+        offset += len(records)
+
+        # Commit the checkpoint; update() keeps post_save side effects out of it.
+        # It only applies while the job still has the checkpoint written last.
+        checkpoint_at = timezone.now()
+        committed = BatchAnalysis.objects.filter(
+            pk=batch.pk, status='processing', checkpoint_at=batch.checkpoint_at,
+        ).update(
+            processed_reviews=offset,
+            output_bytes=output_bytes,
+            positive_count=F('positive_count') + counts['positive'],
+            negative_count=F('negative_count') + counts['negative'],
+            neutral_count=F('neutral_count') + counts['neutral'],
+            confidence_sum=F('confidence_sum') + sum(r['confidence'] or 0 for r in records),
+            checkpoint_at=checkpoint_at,
+            updated_at=checkpoint_at,
+        )
+        if not committed:
+            raise JobTaken(f'Batch {batch.id} moved on without this worker at row {offset}')
+        batch.checkpoint_at = checkpoint_at
+
+        for text, record in zip(chunk_texts, records):
+            summary.add(record, word_count(text))
+
+        for group_id in {r['group_id'] for r in records}:
+            if last_row[group_id] < offset:
+                group_results.pop(group_id, None)
+
+    return _finish_job(batch, writer, summary.build())
+
+
+def _finish_job(batch, writer, summary):
+    # Record the report names first, so a resumed job finds them if it dies
+    # while they are moved into place
+    report_files = writer.filenames(batch.id)
+    BatchAnalysis.objects.filter(pk=batch.pk).update(report_files=report_files)
+    batch.report_files = report_files
+    writer.finish(_reports_dir(), batch.id)
+    return _complete_job(batch, summary)
+
+
+def _complete_job(batch, summary):
+    batch.refresh_from_db()
+    batch.results_file.name = f"reports/{batch.report_files[FORMAT_CSV]}"
+    batch.status = 'completed'
+    batch.average_confidence = (
+        batch.confidence_sum / batch.processed_reviews if batch.processed_reviews else 0
+    )
+    batch.summary = summary
+    batch.completed_at = timezone.now()
+    batch.save()
+
+    shutil.rmtree(get_job_dir(batch.id), ignore_errors=True)
+    logger.info(f"Bulk analysis for batch {batch.id} finished: {batch.processed_reviews} reviews")
+    return batch
+
+
+def run_bulk_analysis(user, file_name, texts, model_type='ensemble',
+                      dedup_mode=DEDUP_EXACT, similarity_threshold=0.9):
+    """
+    Score ``texts`` and store a completed BatchAnalysis with its CSV report.
+
+    Returns ``(batch, groups)`` where ``groups`` describes the duplicate
+    collapsing that was applied.
+    """
+    batch, groups = create_bulk_job(user, file_name, texts, model_type=model_type,
+                                    dedup_mode=dedup_mode,
+                                    similarity_threshold=similarity_threshold)
+    try:
+        batch = process_bulk_job(batch)
+    except Exception:
+        # The checkpoint stays behind, so the job can be resumed
+        BatchAnalysis.objects.filter(pk=batch.pk).update(status='failed')
+        raise
+    return batch, groups
+
+
+def interrupted_jobs(stale_after=None):
+    """Processing jobs whose checkpoint hasn't moved for ``stale_after`` seconds"""
+    if stale_after is None:
+        stale_after = getattr(settings, 'BULK_JOB_STALE_AFTER', 300)
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    return BatchAnalysis.objects.filter(status='processing', checkpoint_at__lt=cutoff)
+
+
+def resume_bulk_job(batch):
+    """Continue an interrupted or failed job; returns the batch, or None if taken"""
+    if batch.status == 'failed':
+        BatchAnalysis.objects.filter(pk=batch.pk, status='failed').update(status='processing')
+        batch.refresh_from_db()
+    if batch.status != 'processing':
+        return None
+    if not os.path.exists(os.path.join(get_job_dir(batch.id), INPUT_FILE)):
+        logger.error(f"Batch {batch.id} has no job files left and cannot be resumed")
+        return None
+
+    try:
+        return process_bulk_job(batch, claim=True)
+    except JobTaken as e:
+        # Another worker is running it, or took it over first
+        logger.info(str(e))
+        return None
+    except Exception:
+        BatchAnalysis.objects.filter(pk=batch.pk).update(status='failed')
+        raise
@@ -0,0 +1,125 @@
+# sentiment_app/data_version.py
+"""
+Data-version counters for conditional GETs and response caching.
+
+Every committed write to SentimentAnalysis bumps the global counter (once per
+transaction), and the per-user analytics bump the scope of each user whose
+analyses changed. The counters are DataVersion rows, so all processes see the
+same value even when each one has its own local-memory cache. Views derive
+their ETag/Last-Modified from them, so polling clients get 304s while nothing
+changed, and payloads that only depend on the data are cached under the
+current version with ``versioned()``; a process that never saw a payload for
+that version simply builds it.
+"""
+import time
+import weakref
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DataVersion
+
+GLOBAL_SCOPE = 'global'
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def _initial_version():
+    # Millisecond clock, so a counter created after the database was reset
+    # never repeats a version that clients or a shared cache may still hold
+    return int(time.time() * 1000)
+
+
+def _current(scope):
+    row = DataVersion.objects.filter(scope=scope).values_list('version', 'modified_at').first()
+    if row is None:
+        try:
+            with transaction.atomic():
+                created = DataVersion.objects.create(scope=scope, version=_initial_version())
+            row = (created.version, created.modified_at)
+        except IntegrityError:
+            # Created by another request in the meantime
+            row = DataVersion.objects.filter(scope=scope).values_list('version', 'modified_at').get()
+    return row
+
+
+def get_data_version(scope=GLOBAL_SCOPE):
+    """Current version number of ``scope``"""
+    return _current(scope)[0]
+
+
+def get_data_modified(scope=GLOBAL_SCOPE):
+    """Time of the last committed write in ``scope``, as an aware datetime"""
+    modified = _current(scope)[1]
+    # HTTP dates have one-second resolution
+    return datetime.fromtimestamp(int(modified.timestamp()), tz=dt_timezone.utc)
+
+
+def bump_scopes(scopes):
+    """Advance the counters of ``scopes`` right away"""
+    now = timezone.now()
+    for scope in scopes:
+        updated = DataVersion.objects.filter(scope=scope).update(
+            version=F('version') + 1, modified_at=now,
+        )
+        if not updated:
+            _current(scope)
+            DataVersion.objects.filter(scope=scope).update(version=F('version') + 1, modified_at=now)
+
+
+class _CommitCallback:
+    """A callback scheduled by on_commit_once(); unregisters its key when it runs"""
+
+    def __init__(self, connection, key, func):
+        self.connection = connection
+        self.key = key
+        self.func = func
+
+    def __call__(self):
+        self.connection.commit_callbacks.pop(self.key, None)
+        self.func()
+
+
+def on_commit_once(key, func):
+    """
+    Run ``func`` when the current transaction commits (right away outside
+    one), however often it is scheduled under ``key`` before then. Returns
+    True when this call scheduled it.
+    """
+    connection = transaction.get_connection()
+    if not hasattr(connection, 'commit_callbacks'):
+        connection.commit_callbacks = {}
+    # Only a weak reference is kept: a rollback discards the callback, and
+    # the next call then schedules a new one
+    scheduled = connection.commit_callbacks.get(key)
+    if scheduled is not None and scheduled() is not None:
+        return False
+    callback = _CommitCallback(connection, key, func)
+    connection.commit_callbacks[key] = weakref.ref(callback)
+    transaction.on_commit(callback)
+    return True
+
+
+def _bump():
+    bump_scopes([GLOBAL_SCOPE])
+
+
+def bump_data_version():
+    """Advance the global version once the current transaction (if any) commits"""
+    on_commit_once('data_version', _bump)
+
+
+def versioned(name, builder):
+    """Return ``builder()``, cached for the current data version"""
+    key = f'{name}_v{get_data_version()}'
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        cache.set(key, value, getattr(settings, 'DATA_VERSION_CACHE_TTL', 3600))
+    return value
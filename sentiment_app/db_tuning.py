@@ -0,0 +1,113 @@
+# sentiment_app/db_tuning.py
+"""
+Database tuning.
+
+* SQLite connections get WAL journaling and the cache/mmap/synchronous
+  pragmas from ``SQLITE_PRAGMAS`` as soon as they are opened, so readers no
+  longer block behind a bulk job's writes.
+* ``bulk_insert`` writes many rows with multi-row INSERTs in one transaction,
+  or with COPY when the default database is PostgreSQL. The archive uses it
+  to record the files of each batch it moves (see sentiment_app.archive).
+"""
+import io
+import json
+import logging
+
+from django.conf import settings
+from django.db import connections, models, router, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Rows per multi-row INSERT statement when the backend has no tighter limit
+DEFAULT_INSERT_BATCH_SIZE = 1000
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Apply SQLITE_PRAGMAS to every new SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    logger.debug(f"Applied SQLite pragmas: {', '.join(pragmas)}")
+
+
+def _copy_value(field, obj, connection):
+    value = field.pre_save(obj, add=True)
+    if value is None:
+        return None
+    if isinstance(field, models.JSONField):
+        return json.dumps(value, cls=field.encoder)
+    value = field.get_db_prep_save(value, connection)
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return value
+
+
+def _copy_field(value):
+    # In CSV COPY only an unquoted empty field is NULL, so quoting every other
+    # value keeps empty strings and literal "\N" text intact
+    if value is None:
+        return ''
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _copy_rows(fields, objs, connection):
+    buffer = io.StringIO()
+    for obj in objs:
+        buffer.write(','.join(_copy_field(_copy_value(f, obj, connection)) for f in fields))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+
+def _copy_insert(model, objs, connection):
+    """PostgreSQL fast path: stream rows through COPY ... FROM STDIN"""
+    fields = [f for f in model._meta.concrete_fields if not isinstance(f, models.AutoField)]
+    columns = ', '.join(connection.ops.quote_name(f.column) for f in fields)
+    table = connection.ops.quote_name(model._meta.db_table)
+    sql = f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)"
+    buffer = _copy_rows(fields, objs, connection)
+
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):  # psycopg2
+            raw.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+def bulk_insert(model, objs, batch_size=None, use_copy=True):
+    """
+    Insert ``objs`` in as few statements as possible inside one transaction.
+
+    On PostgreSQL rows are streamed with COPY (primary keys are not set on the
+    objects in that case); elsewhere multi-row INSERTs are used, sized to the
+    backend's bound-parameter limit. Returns the number of rows written.
+    """
+    objs = list(objs)
+    if not objs:
+        return 0
+
+    alias = router.db_for_write(model)
+    connection = connections[alias]
+
+    with transaction.atomic(using=alias):
+        if use_copy and connection.vendor == 'postgresql':
+            _copy_insert(model, objs, connection)
+        else:
+            fields = model._meta.concrete_fields
+            max_batch = connection.ops.bulk_batch_size(fields, objs)
+            batch_size = min(batch_size or DEFAULT_INSERT_BATCH_SIZE, max_batch)
+            model.objects.using(alias).bulk_create(objs, batch_size=batch_size)
+
+    logger.debug(f"Bulk inserted {len(objs)} {model._meta.model_name} rows")
+    return len(objs)
@@ -0,0 +1,188 @@
+# sentiment_app/dedup.py
+"""
+Duplicate collapsing for bulk uploads.
+
+Review dumps contain many repeated or near-identical texts. Before scoring,
+rows are grouped so that each group's representative is scored once and the
+result is fanned back out to every member (see sentiment_app.bulk):
+
+* exact duplicates share the hash of their normalized text;
+* near duplicates (optional) are found with MinHash signatures and
+  locality-sensitive hashing over character shingles, then confirmed with the
+  estimated Jaccard similarity against a configurable threshold.
+"""
+import hashlib
+import logging
+import re
+import zlib
+
+logger = logging.getLogger(__name__)
+
+DEDUP_NONE = 'none'
+DEDUP_EXACT = 'exact'
+DEDUP_NEAR = 'near'
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Large Mersenne prime for the universal hash family used by MinHash
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize_text(text):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    text = _PUNCTUATION_RE.sub(' ', str(text).lower())
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            # Keep the earliest row as the root so it becomes the representative
+            if root_a < root_b:
+                self.parent[root_b] = root_a
+            else:
+                self.parent[root_a] = root_b
+
+
+class MinHasher:
+    """MinHash signatures over character shingles, computed with NumPy"""
+
+    def __init__(self, num_perm=128, shingle_size=5, seed=42):
+        # NumPy is only needed for near-duplicate detection, so keep it off
+        # the import path of forms and views
+        import numpy as np
+
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        # Coefficients below 2**31 keep a * x + b inside uint64 for 32-bit x
+        self.a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+
+    def shingles(self, normalized):
+        k = self.shingle_size
+        if len(normalized) <= k:
+            return {normalized} if normalized else set()
+        return {normalized[i:i + k] for i in range(len(normalized) - k + 1)}
+
+    def signature(self, normalized):
+        shingles = self.shingles(normalized)
+        if not shingles:
+            return None
+        import numpy as np
+
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        # (a * x + b) mod p for every permutation/shingle pair, then min per permutation
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % _MERSENNE_PRIME
+        return (permuted & _MAX_HASH).min(axis=1)
+
+
+def lsh_parameters(num_perm, threshold):
+    """Pick (bands, rows) whose S-curve threshold (1/b)^(1/r) is closest to ``threshold``"""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class DuplicateGroups:
+    """Result of grouping: a group id per row and one representative per group"""
+
+    def __init__(self, group_ids, representatives):
+        self.group_ids = group_ids
+        self.representatives = representatives
+
+    @property
+    def total(self):
+        return len(self.group_ids)
+
+    @property
+    def unique(self):
+        return len(self.representatives)
+
+    @property
+    def duplicates(self):
+        return self.total - self.unique
+
+
+def group_duplicates(texts, mode=DEDUP_EXACT, threshold=0.9, num_perm=128):
+    """Group ``texts`` into duplicate sets according to ``mode``"""
+    if mode == DEDUP_NONE:
+        return DuplicateGroups(list(range(len(texts))), list(range(len(texts))))
+
+    normalized = [normalize_text(t) for t in texts]
+
+    # Exact duplicates: first row with a given normalized hash is the root
+    uf = _UnionFind(len(texts))
+    first_seen = {}
+    for row, norm in enumerate(normalized):
+        digest = hashlib.blake2b(norm.encode('utf-8'), digest_size=16).digest()
+        if digest in first_seen:
+            uf.union(first_seen[digest], row)
+        else:
+            first_seen[digest] = row
+
+    if mode == DEDUP_NEAR and len(first_seen) > 1:
+        _merge_near_duplicates(uf, normalized, sorted(first_seen.values()), threshold, num_perm)
+
+    roots = [uf.find(row) for row in range(len(texts))]
+    group_of_root = {}
+    representatives = []
+    group_ids = []
+    for root in roots:
+        if root not in group_of_root:
+            group_of_root[root] = len(representatives)
+            representatives.append(root)
+        group_ids.append(group_of_root[root])
+
+    groups = DuplicateGroups(group_ids, representatives)
+    logger.info(f"Deduplicated {groups.total} rows into {groups.unique} groups (mode={mode})")
+    return groups
+
+
+def _merge_near_duplicates(uf, normalized, rows, threshold, num_perm):
+    """Union rows whose MinHash similarity reaches ``threshold`` (LSH candidates only)"""
+    hasher = MinHasher(num_perm=num_perm)
+    bands, band_rows = lsh_parameters(num_perm, threshold)
+
+    signatures = {}
+    for row in rows:
+        signature = hasher.signature(normalized[row])
+        if signature is not None:
+            signatures[row] = signature
+
+    for band in range(bands):
+        buckets = {}
+        start = band * band_rows
+        for row, signature in signatures.items():
+            key = signature[start:start + band_rows].tobytes()
+            buckets.setdefault(key, []).append(row)
+
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            anchor = members[0]
+            for other in members[1:]:
+                if uf.find(anchor) == uf.find(other):
+                    continue
+                similarity = (signatures[anchor] == signatures[other]).mean()
+                if similarity >= threshold:
+                    uf.union(anchor, other)
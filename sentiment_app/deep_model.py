@@ -0,0 +1,544 @@
+# sentiment_app/deep_model.py
+"""
+NumPy-only inference for the hybrid deep learning model.
+
+The notebook trains a Keras model (tokenizer + embedding, Conv1D, BiLSTM and a
+dense meta-feature branch). Loading TensorFlow in every web worker is far too
+expensive, so the trained model is exported once into a compressed ``.npz``
+bundle (layer graph, weights, tokenizer vocabulary and scaler statistics) and
+served here with a batched forward pass written in plain NumPy.
+"""
+import json
+import logging
+import re
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT_VERSION = 1
+
+# Layers the NumPy forward pass knows how to evaluate
+SUPPORTED_LAYERS = {
+    'InputLayer', 'Embedding', 'Conv1D', 'Dropout', 'LSTM', 'Bidirectional',
+    'Dense', 'Concatenate', 'GlobalMaxPooling1D', 'Flatten',
+}
+
+# Meta features used by the notebook, in training order
+META_FEATURES = [
+    'polarity', 'subjectivity', 'word_count', 'char_count',
+    'helpful_ratio', 'wilson_lower_bound', 'score_average_rating',
+    'exclamation_count', 'question_count', 'uppercase_ratio',
+]
+
+SENTIMENT_LABELS = ['negative', 'neutral', 'positive']
+
+
+# ---------------------------------------------------------------------------
+# Export (runs where TensorFlow is installed, e.g. the training notebook)
+# ---------------------------------------------------------------------------
+
+def _inbound_names(layer_config):
+    """Return the names of the layers feeding a functional-model layer"""
+    nodes = layer_config.get('inbound_nodes') or []
+    if not nodes:
+        return []
+    node = nodes[0]
+    # Keras 2.x: [[name, node_index, tensor_index, kwargs], ...]
+    if isinstance(node, list):
+        return [inbound[0] for inbound in node]
+    # Keras 3.x: {'args': [...], 'kwargs': {...}}
+    names = []
+    for arg in node.get('args', []):
+        items = arg if isinstance(arg, list) else [arg]
+        for item in items:
+            history = item.get('config', {}).get('keras_history')
+            if history:
+                names.append(history[0])
+    return names
+
+
+def _layer_spec(layer_config):
+    """Extract the configuration the NumPy forward pass needs for one layer"""
+    class_name = layer_config['class_name']
+    config = layer_config['config']
+    spec = {
+        'name': layer_config.get('name', config.get('name')),
+        'class_name': class_name,
+        'inbound': _inbound_names(layer_config),
+    }
+
+    if class_name == 'Conv1D':
+        spec.update({
+            'padding': config['padding'],
+            'strides': config['strides'][0],
+            'dilation_rate': config['dilation_rate'][0],
+            'activation': config['activation'],
+        })
+    elif class_name == 'Dense':
+        spec['activation'] = config['activation']
+    elif class_name == 'LSTM':
+        spec.update(_lstm_spec(config))
+    elif class_name == 'Bidirectional':
+        spec.update(_lstm_spec(config['layer']['config']))
+        spec['merge_mode'] = config.get('merge_mode', 'concat')
+    elif class_name == 'Concatenate':
+        spec['axis'] = config.get('axis', -1)
+
+    return spec
+
+
+def _lstm_spec(config):
+    return {
+        'units': config['units'],
+        'return_sequences': config.get('return_sequences', False),
+        'go_backwards': config.get('go_backwards', False),
+        'activation': config.get('activation', 'tanh'),
+        'recurrent_activation': config.get('recurrent_activation', 'sigmoid'),
+    }
+
+
+def export_keras_model(model, tokenizer, output_path, max_len=200, scaler=None,
+                       meta_features=None, padding='post', truncating='pre'):
+    """
+    Export a trained functional Keras model and its tokenizer to an ``.npz``
+    bundle that :class:`NumpyDeepModel` can serve without TensorFlow.
+    """
+    model_config = model.get_config()
+    layers = []
+    weights = {}
+
+    for layer_config in model_config['layers']:
+        class_name = layer_config['class_name']
+        if class_name not in SUPPORTED_LAYERS:
+            raise ValueError(f"Layer type {class_name} is not supported by the NumPy engine")
+
+        spec = _layer_spec(layer_config)
+        layer = model.get_layer(spec['name'])
+        layers.append(spec)
+
+        for i, array in enumerate(layer.get_weights()):
+            weights[f"w/{spec['name']}/{i}"] = np.asarray(array, dtype=np.float32)
+
+    # Keras Tokenizer: only the first num_words - 1 indices are ever emitted
+    num_words = tokenizer.num_words or (len(tokenizer.word_index) + 1)
+    vocabulary = [''] * num_words
+    for word, index in tokenizer.word_index.items():
+        if index < num_words:
+            vocabulary[index] = word
+
+    oov_index = tokenizer.word_index.get(tokenizer.oov_token) if tokenizer.oov_token else None
+
+    def _names(entries):
+        return [entry[0] if isinstance(entry, list) else entry for entry in entries]
+
+    topology = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'layers': layers,
+        'input_layers': _names(model_config['input_layers']),
+        'output_layers': _names(model_config['output_layers']),
+        'tokenizer': {
+            'num_words': num_words,
+            'oov_index': oov_index,
+            'filters': tokenizer.filters,
+            'lower': tokenizer.lower,
+            'split': tokenizer.split,
+        },
+        'max_len': max_len,
+        'padding': padding,
+        'truncating': truncating,
+        'meta_features': list(meta_features or META_FEATURES),
+    }
+
+    arrays = dict(weights)
+    arrays['vocabulary'] = np.array(vocabulary)
+    if scaler is not None:
+        arrays['scaler_mean'] = np.asarray(scaler.mean_, dtype=np.float32)
+        arrays['scaler_scale'] = np.asarray(scaler.scale_, dtype=np.float32)
+
+    np.savez_compressed(output_path, topology=np.array(json.dumps(topology)), **arrays)
+    logger.info(f"Exported deep model bundle to {output_path} ({len(layers)} layers)")
+    return output_path
+
+
+# ---------------------------------------------------------------------------
+# NumPy forward pass
+# ---------------------------------------------------------------------------
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _hard_sigmoid(x):
+    return np.clip(0.2 * x + 0.5, 0.0, 1.0)
+
+
+def _softmax(x):
+    shifted = x - x.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    None: lambda x: x,
+    'relu': lambda x: np.maximum(x, 0.0),
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+    'hard_sigmoid': _hard_sigmoid,
+    'softmax': _softmax,
+}
+
+
+def _activation(name):
+    try:
+        return ACTIVATIONS[name]
+    except KeyError:
+        raise ValueError(f"Activation {name} is not supported by the NumPy engine")
+
+
+def conv1d(x, kernel, bias, padding='valid', strides=1, dilation_rate=1):
+    """Conv1D over (batch, steps, channels) with a Keras (width, in, out) kernel"""
+    width = kernel.shape[0]
+    span = (width - 1) * dilation_rate + 1
+
+    if padding == 'same':
+        out_steps = -(-x.shape[1] // strides)
+        total = max((out_steps - 1) * strides + span - x.shape[1], 0)
+        x = np.pad(x, ((0, 0), (total // 2, total - total // 2), (0, 0)))
+    elif padding == 'causal':
+        x = np.pad(x, ((0, 0), (span - 1, 0), (0, 0)))
+
+    steps = (x.shape[1] - span) // strides + 1
+    out = np.zeros((x.shape[0], steps, kernel.shape[2]), dtype=np.float32)
+    for k in range(width):
+        start = k * dilation_rate
+        window = x[:, start:start + (steps - 1) * strides + 1:strides, :]
+        out += window @ kernel[k]
+    return out + bias
+
+
+def lstm(x, kernel, recurrent_kernel, bias, units, return_sequences=False,
+         go_backwards=False, activation='tanh', recurrent_activation='sigmoid'):
+    """Keras LSTM (gate order i, f, c, o) over (batch, steps, features)"""
+    act = _activation(activation)
+    rec_act = _activation(recurrent_activation)
+
+    batch, steps, _ = x.shape
+    # Input projections for every timestep in one matmul
+    projected = x @ kernel + bias
+    h = np.zeros((batch, units), dtype=np.float32)
+    c = np.zeros((batch, units), dtype=np.float32)
+    outputs = np.zeros((batch, steps, units), dtype=np.float32) if return_sequences else None
+
+    order = range(steps - 1, -1, -1) if go_backwards else range(steps)
+    for position, t in enumerate(order):
+        z = projected[:, t, :] + h @ recurrent_kernel
+        i = rec_act(z[:, :units])
+        f = rec_act(z[:, units:2 * units])
+        g = act(z[:, 2 * units:3 * units])
+        o = rec_act(z[:, 3 * units:])
+        c = f * c + i * g
+        h = o * act(c)
+        if return_sequences:
+            outputs[:, position, :] = h
+
+    return outputs if return_sequences else h
+
+
+class NumpyDeepModel:
+    """Serve an exported deep model bundle with NumPy only"""
+
+    def __init__(self, bundle_path):
+        with np.load(bundle_path, allow_pickle=False) as bundle:
+            self.topology = json.loads(str(bundle['topology']))
+            self.vocabulary = bundle['vocabulary']
+            self.weights = {
+                key: bundle[key] for key in bundle.files if key.startswith('w/')
+            }
+            self.scaler_mean = bundle['scaler_mean'] if 'scaler_mean' in bundle.files else None
+            self.scaler_scale = bundle['scaler_scale'] if 'scaler_scale' in bundle.files else None
+
+        if self.topology.get('format_version') != BUNDLE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported deep model bundle version in {bundle_path}")
+
+        self.layers = self.topology['layers']
+        self.max_len = self.topology['max_len']
+        self.meta_features = self.topology['meta_features']
+        self.word_index = {
+            word: index for index, word in enumerate(self.vocabulary.tolist()) if word
+        }
+
+        tokenizer = self.topology['tokenizer']
+        self._split = tokenizer['split']
+        self._lower = tokenizer['lower']
+        self._oov_index = tokenizer['oov_index']
+        self._translate = str.maketrans({c: tokenizer['split'] for c in tokenizer['filters']})
+
+        logger.info(f"Loaded NumPy deep model from {bundle_path}")
+
+    def _layer_weights(self, name):
+        weights = []
+        i = 0
+        while f"w/{name}/{i}" in self.weights:
+            weights.append(self.weights[f"w/{name}/{i}"])
+            i += 1
+        return weights
+
+    # -- preprocessing ------------------------------------------------------
+
+    def texts_to_sequences(self, texts):
+        """Mirror keras Tokenizer.texts_to_sequences for the exported vocabulary"""
+        sequences = []
+        for text in texts:
+            if self._lower:
+                text = text.lower()
+            words = [w for w in text.translate(self._translate).split(self._split) if w]
+            sequence = []
+            for word in words:
+                index = self.word_index.get(word)
+                if index is not None:
+                    sequence.append(index)
+                elif self._oov_index is not None:
+                    sequence.append(self._oov_index)
+            sequences.append(sequence)
+        return sequences
+
+    def pad_sequences(self, sequences):
+        """Mirror keras pad_sequences with the exported padding/truncating mode"""
+        padded = np.zeros((len(sequences), self.max_len), dtype=np.int64)
+        for row, sequence in enumerate(sequences):
+            if not sequence:
+                continue
+            if len(sequence) > self.max_len:
+                if self.topology['truncating'] == 'pre':
+                    sequence = sequence[-self.max_len:]
+                else:
+                    sequence = sequence[:self.max_len]
+            if self.topology['padding'] == 'post':
+                padded[row, :len(sequence)] = sequence
+            else:
+                padded[row, -len(sequence):] = sequence
+        return padded
+
+    def scale_meta(self, meta):
+        meta = np.asarray(meta, dtype=np.float32)
+        if self.scaler_mean is not None:
+            meta = (meta - self.scaler_mean) / self.scaler_scale
+        return meta
+
+    # -- forward pass -------------------------------------------------------
+
+    def _run_layer(self, spec, inputs):
+        class_name = spec['class_name']
+        weights = self._layer_weights(spec['name'])
+
+        if class_name == 'Embedding':
+            return weights[0][inputs[0]]
+        if class_name == 'Dropout':
+            return inputs[0]
+        if class_name == 'Dense':
+            kernel, bias = weights[0], (weights[1] if len(weights) > 1 else 0.0)
+            return _activation(spec['activation'])(inputs[0] @ kernel + bias)
+        if class_name == 'Conv1D':
+            bias = weights[1] if len(weights) > 1 else 0.0
+            out = conv1d(inputs[0], weights[0], bias, spec['padding'],
+                         spec['strides'], spec['dilation_rate'])
+            return _activation(spec['activation'])(out)
+        if class_name == 'LSTM':
+            return lstm(inputs[0], *weights[:3], units=spec['units'],
+                        return_sequences=spec['return_sequences'],
+                        go_backwards=spec['go_backwards'],
+                        activation=spec['activation'],
+                        recurrent_activation=spec['recurrent_activation'])
+        if class_name == 'Bidirectional':
+            options = dict(units=spec['units'], return_sequences=spec['return_sequences'],
+                           activation=spec['activation'],
+                           recurrent_activation=spec['recurrent_activation'])
+            forward = lstm(inputs[0], *weights[:3], go_backwards=False, **options)
+            backward = lstm(inputs[0], *weights[3:6], go_backwards=True, **options)
+            if spec['return_sequences']:
+                # Keras re-aligns the backward sequence with the input timesteps
+                backward = backward[:, ::-1, :]
+            merge_mode = spec['merge_mode']
+            if merge_mode == 'concat':
+                return np.concatenate([forward, backward], axis=-1)
+            if merge_mode == 'sum':
+                return forward + backward
+            if merge_mode == 'mul':
+                return forward * backward
+            if merge_mode == 'ave':
+                return (forward + backward) / 2
+            raise ValueError(f"Bidirectional merge mode {merge_mode} is not supported")
+        if class_name == 'Concatenate':
+            return np.concatenate(inputs, axis=spec['axis'])
+        if class_name == 'GlobalMaxPooling1D':
+            return inputs[0].max(axis=1)
+        if class_name == 'Flatten':
+            return inputs[0].reshape(inputs[0].shape[0], -1)
+
+        raise ValueError(f"Layer type {class_name} is not supported by the NumPy engine")
+
+    def forward(self, inputs):
+        """Run the layer graph; ``inputs`` maps input layer names to arrays"""
+        outputs = {}
+        for spec in self.layers:
+            if spec['class_name'] == 'InputLayer':
+                outputs[spec['name']] = inputs[spec['name']]
+                continue
+            layer_inputs = [outputs[name] for name in spec['inbound']]
+            outputs[spec['name']] = self._run_layer(spec, layer_inputs)
+        return outputs[self.topology['output_layers'][0]]
+
+    def predict_proba(self, texts, batch_size=64):
+        """Return class probabilities (negative, neutral, positive) for raw texts"""
+        input_names = self.topology['input_layers']
+        probabilities = []
+
+        for start in range(0, len(texts), batch_size):
+            chunk = [str(text) for text in texts[start:start + batch_size]]
+            sequences = self.pad_sequences(self.texts_to_sequences([clean_text(t) for t in chunk]))
+            inputs = {input_names[0]: sequences}
+            if len(input_names) > 1:
+                meta = [extract_meta_features(t, self.meta_features, self.scaler_mean) for t in chunk]
+                inputs[input_names[1]] = self.scale_meta(meta)
+            probabilities.append(self.forward(inputs))
+
+        if not probabilities:
+            return np.zeros((0, len(SENTIMENT_LABELS)), dtype=np.float32)
+        return np.concatenate(probabilities, axis=0)
+
+
+# ---------------------------------------------------------------------------
+# Serving-time feature extraction
+# ---------------------------------------------------------------------------
+
+_URL_RE = re.compile(r'http\S+|www\S+|https\S+')
+_MENTION_RE = re.compile(r'@\w+|\#')
+_NON_ALPHA_RE = re.compile(r'[^a-zA-Z\s]')
+
+# nltk.corpus.stopwords.words('english') as used by the notebook, so stopword
+# removal matches without NLTK installed
+STOPWORDS = frozenset("""
+i me my myself we our ours ourselves you you're you've you'll you'd your yours
+yourself yourselves he him his himself she she's her hers herself it it's its
+itself they them their theirs themselves what which who whom this that that'll
+these those am is are was were be been being have has had having do does did
+doing a an the and but if or because as until while of at by for with about
+against between into through during before after above below to from up down
+in out on off over under again further then once here there when where why how
+all any both each few more most other some such no nor not only own same so
+than too very s t can will just don don't should should've now d ll m o re ve
+y ain aren aren't couldn couldn't didn didn't doesn doesn't hadn hadn't hasn
+hasn't haven haven't isn isn't ma mightn mightn't mustn mustn't needn needn't
+shan shan't shouldn shouldn't wasn wasn't weren weren't won won't wouldn
+wouldn't
+""".split())
+
+# Cached results of the optional imports (None = not tried yet, False = missing)
+_lemmatizer = None
+_textblob = None
+
+
+def _get_lemmatizer():
+    """The notebook's POS-aware WordNet lemmatizer, or False without NLTK data"""
+    global _lemmatizer
+    if _lemmatizer is None:
+        try:
+            import nltk
+            from nltk.stem import WordNetLemmatizer
+
+            wordnet = WordNetLemmatizer()
+            # Both raise LookupError when the corpora were never downloaded
+            wordnet.lemmatize('reviews')
+            nltk.pos_tag(['reviews'])
+        except (ImportError, LookupError):
+            logger.info("NLTK data not available, serving without lemmatization")
+            _lemmatizer = False
+        else:
+            pos = {'J': 'a', 'V': 'v', 'N': 'n', 'R': 'r'}
+
+            def lemmatize(tokens):
+                return [
+                    wordnet.lemmatize(word, pos[tag[0]]) if tag[:1] in pos else wordnet.lemmatize(word)
+                    for word, tag in nltk.pos_tag(tokens)
+                ]
+            _lemmatizer = lemmatize
+    return _lemmatizer
+
+
+def _get_textblob():
+    global _textblob
+    if _textblob is None:
+        try:
+            from textblob import TextBlob
+            _textblob = TextBlob
+        except ImportError:
+            _textblob = False
+    return _textblob
+
+
+def clean_text(text, lemmatize=True):
+    """
+    The notebook's preprocess_text: strip URLs, mentions and non-letters,
+    drop stopwords and words of two letters or fewer, then lemmatize.
+
+    Lemmatization needs NLTK with its wordnet and tagger data. Without them
+    the tokens are the same but not lemmatized ("reviews" stays "reviews"),
+    so vocabulary lookups of inflected words can differ from training.
+    """
+    text = str(text).lower()
+    text = _URL_RE.sub('', text)
+    text = _MENTION_RE.sub('', text)
+    text = _NON_ALPHA_RE.sub(' ', text)
+    tokens = [word for word in text.split() if word not in STOPWORDS and len(word) > 2]
+    lemmatizer = _get_lemmatizer() if lemmatize and tokens else None
+    if lemmatizer:
+        tokens = lemmatizer(tokens)
+    return ' '.join(tokens)
+
+
+def extract_meta_features(text, feature_names=META_FEATURES, defaults=None):
+    """
+    Compute the meta features available from the raw text alone.
+
+    Review-level features (helpfulness, ratings) are unknown at serving time,
+    so they fall back to ``defaults`` (the scaler means, i.e. 0 after scaling).
+    """
+    text = str(text)
+    words = text.split()
+    features = {
+        'word_count': len(words),
+        'char_count': len(text),
+        'exclamation_count': text.count('!'),
+        'question_count': text.count('?'),
+        'uppercase_ratio': sum(1 for c in text if c.isupper()) / len(text) if text else 0,
+    }
+
+    TextBlob = _get_textblob()
+    if TextBlob:
+        blob = TextBlob(text)
+        features['polarity'] = blob.sentiment.polarity
+        features['subjectivity'] = blob.sentiment.subjectivity
+
+    row = []
+    for i, name in enumerate(feature_names):
+        if name in features:
+            row.append(features[name])
+        elif defaults is not None:
+            row.append(float(defaults[i]))
+        else:
+            row.append(0.0)
+    return row
+
+
+def probabilities_to_result(probabilities):
+    """Turn one probability row into the analyzer's sentiment/confidence/probabilities"""
+    index = int(np.argmax(probabilities))
+    return {
+        'sentiment': SENTIMENT_LABELS[index],
+        'confidence': float(probabilities[index]),
+        'probabilities': {
+            label: float(p) for label, p in zip(SENTIMENT_LABELS, probabilities)
+        },
+    }
@@ -0,0 +1,328 @@
+# sentiment_app/evaluation.py
+"""
+Accuracy-versus-throughput evaluation of the analyzer's scorers.
+
+Every scorer runs over the same labeled hold-out split (the notebook's
+stratified 80/20 split with random_state=42) through the serving path
+(``SentimentAnalyzer.batch_analyze``), batch by batch. For each scorer we
+report weighted and macro F1, accuracy, rows/sec, p50/p99 batch latency and
+peak RSS. Scorers are run in a fresh process each by default, so peak RSS
+includes loading the model. A Pareto report lists the scorers for which no
+other is both more accurate and faster.
+
+Scorer names are analyzer model types (``keyword``, ``ensemble``,
+``deep_learning``, ``online``) or cascades written ``first>second@threshold``:
+``first`` scores everything and rows whose top probability is below
+``threshold`` are re-scored by ``second``. A trained model type whose model
+is not loaded is reported as unavailable rather than scored by the keyword
+fallback. Unknown names are rejected with UnknownScorer before anything
+runs. An isolated run that crashes, is killed or exceeds
+``EVALUATION_TIMEOUT`` seconds is reported as failed.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import time
+from queue import Empty
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATASET = os.path.join('data', 'processed', 'processed_reviews_with_features.csv')
+DEFAULT_SCORERS = ['keyword', 'ensemble', 'deep_learning', 'online']
+LABELS = ['negative', 'neutral', 'positive']
+
+# The keyword matcher every other model type falls back to
+KEYWORD_MODEL_TYPE = 'keyword'
+# Analyzer model types whose trained model may be missing (then the analyzer
+# silently falls back to keywords, which must not be reported as that model)
+TRAINED_MODEL_TYPES = ('ensemble', 'deep_learning', 'online')
+SCORER_TYPES = (KEYWORD_MODEL_TYPE,) + TRAINED_MODEL_TYPES
+
+
+class ScorerUnavailable(Exception):
+    """The scorer's model is not trained/published in this deployment"""
+
+
+class UnknownScorer(ValueError):
+    """The scorer name is neither an analyzer model type nor a valid cascade"""
+
+
+def load_split(path=None, text_column='reviewText', label_column='sentiment',
+               test_size=0.2, seed=42, limit=None):
+    """The labeled hold-out split as ``(texts, labels)``"""
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+
+    path = path or os.path.join(settings.BASE_DIR, DEFAULT_DATASET)
+    df = pd.read_csv(path, usecols=[text_column, label_column])
+    df = df.dropna()
+    df = df[df[label_column].isin(LABELS)]
+
+    _, test = train_test_split(df, test_size=test_size, random_state=seed,
+                               stratify=df[label_column])
+    if limit:
+        test = test.iloc[:limit]
+    return test[text_column].astype(str).tolist(), test[label_column].tolist()
+
+
+def parse_cascade(name):
+    """``'first>second@0.8'`` -> ``('first', 'second', 0.8)``, or None"""
+    if '>' not in name:
+        return None
+    first, rest = name.split('>', 1)
+    second, _, threshold = rest.partition('@')
+    try:
+        threshold = float(threshold or 0.8)
+    except ValueError:
+        raise UnknownScorer(f"Invalid cascade threshold in '{name}'")
+    return first, second, threshold
+
+
+def validate_scorer(name):
+    """Raise UnknownScorer unless ``name`` only uses registered model types"""
+    cascade = parse_cascade(name)
+    parts = cascade[:2] if cascade is not None else (name,)
+    for part in parts:
+        if part not in SCORER_TYPES:
+            raise UnknownScorer(f"Unknown scorer '{part}' in '{name}' "
+                                f"(choose from {', '.join(SCORER_TYPES)})")
+    if cascade is not None and not 0 < cascade[2] <= 1:
+        raise UnknownScorer(f"Cascade threshold in '{name}' must be in (0, 1]")
+
+
+class _AnalyzerScorer:
+    def __init__(self, analyzer, model_type):
+        if model_type in TRAINED_MODEL_TYPES and analyzer.get_scorer(model_type) is None:
+            raise ScorerUnavailable(f'No trained {model_type} model is available')
+        self.analyzer = analyzer
+        self.model_type = model_type
+
+    def score(self, texts):
+        """Probability rows (negative, neutral, positive) for ``texts``"""
+        results = self.analyzer.batch_analyze(texts, self.model_type, include_probabilities=True)
+        return [
+            [(r.get('probabilities') or {}).get(label, 0.0) for label in LABELS]
+            for r in results
+        ]
+
+
+class _CascadeScorer:
+    def __init__(self, first, second, threshold):
+        self.first = first
+        self.second = second
+        self.threshold = threshold
+        self.scored = 0
+        self.escalated = 0
+
+    def score(self, texts):
+        rows = self.first.score(texts)
+        uncertain = [i for i, row in enumerate(rows) if max(row) < self.threshold]
+        if uncertain:
+            for i, row in zip(uncertain, self.second.score([texts[i] for i in uncertain])):
+                rows[i] = row
+        self.scored += len(texts)
+        self.escalated += len(uncertain)
+        return rows
+
+
+def build_scorer(name, analyzer=None):
+    validate_scorer(name)
+    if analyzer is None:
+        from .services import SentimentAnalyzer
+        analyzer = SentimentAnalyzer()
+
+    cascade = parse_cascade(name)
+    if cascade is not None:
+        first, second, threshold = cascade
+        return _CascadeScorer(_AnalyzerScorer(analyzer, first),
+                              _AnalyzerScorer(analyzer, second), threshold)
+    return _AnalyzerScorer(analyzer, name)
+
+
+def _percentile(values, q):
+    import numpy as np
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def evaluate_scorer(name, texts, labels, batch_size=50):
+    """Score the split with one scorer in this process and return its metrics"""
+    from sklearn.metrics import accuracy_score, f1_score
+
+    load_started = time.perf_counter()
+    try:
+        scorer = build_scorer(name)
+    except ScorerUnavailable as e:
+        return {'scorer': name, 'available': False, 'error': str(e)}
+    # One warm-up batch so lazy imports don't land in the first latency sample
+    scorer.score(texts[:1])
+    load_seconds = time.perf_counter() - load_started
+
+    predictions = []
+    latencies = []
+    started = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        batch_started = time.perf_counter()
+        rows = scorer.score(texts[i:i + batch_size])
+        latencies.append(time.perf_counter() - batch_started)
+        predictions.extend(LABELS[max(range(len(LABELS)), key=row.__getitem__)] for row in rows)
+    elapsed = time.perf_counter() - started
+
+    metrics = {
+        'scorer': name,
+        'available': True,
+        'rows': len(texts),
+        'f1_weighted': f1_score(labels, predictions, labels=LABELS, average='weighted', zero_division=0),
+        'f1_macro': f1_score(labels, predictions, labels=LABELS, average='macro', zero_division=0),
+        'accuracy': accuracy_score(labels, predictions),
+        'rows_per_sec': len(texts) / elapsed if elapsed else 0.0,
+        'p50_batch_ms': _percentile(latencies, 50) * 1000,
+        'p99_batch_ms': _percentile(latencies, 99) * 1000,
+        'load_seconds': load_seconds,
+        # ru_maxrss is in KiB on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    if isinstance(scorer, _CascadeScorer):
+        metrics['escalation_rate'] = scorer.escalated / scorer.scored if scorer.scored else 0.0
+    return metrics
+
+
+def _evaluate_in_child(name, texts, labels, batch_size, queue):
+    import django
+    django.setup()
+    try:
+        queue.put(evaluate_scorer(name, texts, labels, batch_size))
+    except Exception as e:
+        queue.put({'scorer': name, 'available': False, 'error': f'{type(e).__name__}: {e}'})
+
+
+def _wait_for_result(name, process, queue, timeout):
+    """The child's result, or a failure report if it dies or runs out of time"""
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                return queue.get(timeout=1)
+            except Empty:
+                pass
+            if not process.is_alive():
+                # It may have put its result just before exiting
+                try:
+                    return queue.get(timeout=1)
+                except Empty:
+                    error = f'evaluation process exited with code {process.exitcode}'
+                    break
+            if time.monotonic() > deadline:
+                process.terminate()
+                error = f'evaluation timed out after {timeout:.0f}s'
+                break
+    finally:
+        process.join(5)
+        if process.is_alive():
+            process.kill()
+            process.join()
+    logger.error(f"Evaluating {name} failed: {error}")
+    return {'scorer': name, 'available': False, 'failed': True, 'error': error}
+
+
+def evaluate_isolated(name, texts, labels, batch_size=50, timeout=None):
+    """evaluate_scorer() in a fresh interpreter, so peak RSS is the scorer's own"""
+    if timeout is None:
+        timeout = getattr(settings, 'EVALUATION_TIMEOUT', 3600)
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_evaluate_in_child,
+                              args=(name, texts, labels, batch_size, queue))
+    process.start()
+    return _wait_for_result(name, process, queue, timeout)
+
+
+def pareto_front(results, accuracy_key='f1_weighted', speed_key='rows_per_sec'):
+    """Names of the available scorers not dominated on (accuracy, speed)"""
+    available = [r for r in results if r.get('available')]
+    front = []
+    for r in available:
+        dominated = any(
+            o[accuracy_key] >= r[accuracy_key] and o[speed_key] >= r[speed_key]
+            and (o[accuracy_key] > r[accuracy_key] or o[speed_key] > r[speed_key])
+            for o in available if o is not r
+        )
+        if not dominated:
+            front.append(r['scorer'])
+    return front
+
+
+def check_gate(report, scorer, min_f1=None, min_rows_per_sec=None, max_p99_ms=None,
+               require_pareto=True):
+    """List of reasons ``scorer`` may not be promoted (empty if it passes)"""
+    result = next((r for r in report['results'] if r['scorer'] == scorer), None)
+    if result is None or not result.get('available'):
+        return [f'{scorer} was not evaluated']
+
+    failures = []
+    if min_f1 is not None and result['f1_weighted'] < min_f1:
+        failures.append(f"F1 {result['f1_weighted']:.3f} is below {min_f1}")
+    if min_rows_per_sec is not None and result['rows_per_sec'] < min_rows_per_sec:
+        failures.append(f"{result['rows_per_sec']:.0f} rows/sec is below {min_rows_per_sec}")
+    if max_p99_ms is not None and result['p99_batch_ms'] > max_p99_ms:
+        failures.append(f"p99 batch latency {result['p99_batch_ms']:.1f} ms is above {max_p99_ms}")
+    if require_pareto and scorer not in report['pareto_front']:
+        failures.append('another scorer is both more accurate and faster')
+    return failures
+
+
+def run_evaluation(scorers=None, batch_size=50, isolate=True, **split_options):
+    """Evaluate ``scorers`` on the hold-out split and return the report dict"""
+    scorers = scorers or DEFAULT_SCORERS
+    for name in scorers:
+        validate_scorer(name)
+    texts, labels = load_split(**split_options)
+    evaluate = evaluate_isolated if isolate else evaluate_scorer
+
+    results = []
+    for name in scorers:
+        logger.info(f"Evaluating {name} on {len(texts)} rows")
+        results.append(evaluate(name, texts, labels, batch_size))
+
+    return {
+        'created_at': timezone.now().isoformat(),
+        'rows': len(texts),
+        'batch_size': batch_size,
+        'results': results,
+        'pareto_front': pareto_front(results),
+    }
+
+
+def write_report(report, output_dir=None):
+    """Write the report as JSON and Markdown; returns the JSON path"""
+    output_dir = str(output_dir or getattr(settings, 'EVALUATION_DIR',
+                                           os.path.join(settings.BASE_DIR, 'evaluation')))
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+    json_path = os.path.join(output_dir, f'evaluation_{stamp}.json')
+    with open(json_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    lines = [
+        f"# Model evaluation ({report['rows']} rows, batch size {report['batch_size']})",
+        '',
+        '| scorer | F1 (weighted) | F1 (macro) | rows/sec | p99 batch ms | peak RSS MB | Pareto |',
+        '|---|---|---|---|---|---|---|',
+    ]
+    for r in report['results']:
+        if not r.get('available'):
+            status = 'failed' if r.get('failed') else 'unavailable'
+            lines.append(f"| {r['scorer']} | {status}: {r['error']} | | | | | |")
+            continue
+        lines.append(
+            f"| {r['scorer']} | {r['f1_weighted']:.3f} | {r['f1_macro']:.3f} | "
+            f"{r['rows_per_sec']:.0f} | {r['p99_batch_ms']:.1f} | {r['peak_rss_mb']:.0f} | "
+            f"{'yes' if r['scorer'] in report['pareto_front'] else ''} |"
+        )
+    with open(json_path[:-len('.json')] + '.md', 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return json_path
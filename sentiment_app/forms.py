@@ -1,5 +1,6 @@
 from django import forms
 from .models import BatchAnalysis
+from .dedup import DEDUP_EXACT, DEDUP_NEAR, DEDUP_NONE
 
 class SingleAnalysisForm(forms.Form):
     text = forms.CharField(
@@ -16,6 +17,7 @@ class SingleAnalysisForm(forms.Form):
         choices=[
             ('ensemble', 'Ensemble Model (Recommended)'),
             ('deep_learning', 'Deep Learning Model'),
+            ('online', 'Online Model (Continuously Updated)'),
         ],
         initial='ensemble',
         widget=forms.Select(attrs={'class': 'form-select'}),
@@ -43,6 +45,7 @@ class BulkAnalysisForm(forms.Form):
         choices=[
             ('ensemble', 'Ensemble Model (Faster)'),
             ('deep_learning', 'Deep Learning Model (More Accurate)'),
+            ('online', 'Online Model (Continuously Updated)'),
         ],
         initial='ensemble',
         widget=forms.Select(attrs={'class': 'form-select'}),
@@ -56,4 +59,27 @@ class BulkAnalysisForm(forms.Form):
         max_value=1000,
         widget=forms.NumberInput(attrs={'class': 'form-control'}),
         help_text='Limit processing to prevent timeout'
-    )
\ No newline at end of file
+    )
+    
+    dedup_mode = forms.ChoiceField(
+        choices=[
+            (DEDUP_EXACT, 'Collapse exact duplicates'),
+            (DEDUP_NEAR, 'Collapse exact and near-duplicates'),
+            (DEDUP_NONE, 'Score every row'),
+        ],
+        initial=DEDUP_EXACT,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        label='Duplicate Handling',
+        help_text='Duplicates are scored once and share the same result'
+    )
+    
+    similarity_threshold = forms.FloatField(
+        label='Near-duplicate Similarity',
+        initial=0.9,
+        min_value=0.5,
+        max_value=1.0,
+        required=False,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.05'}),
+        help_text='Minimum estimated Jaccard similarity for near-duplicates'
+    )
@@ -0,0 +1,30 @@
+# sentiment_app/management/commands/archive_analyses.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from sentiment_app.archive import ArchiveUnavailable, archive_analyses
+
+
+class Command(BaseCommand):
+    help = ('Move old analyses into per-user/month Parquet files. '
+            'Schedule it e.g. nightly from cron: "manage.py archive_analyses"')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+                            help='Archive analyses older than this many days')
+        parser.add_argument('--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE,
+                            help='Rows moved per transaction')
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help='Stop after this many batches (default: until done)')
+
+    def handle(self, *args, **options):
+        try:
+            archived = archive_analyses(
+                older_than_days=options['older_than_days'],
+                batch_size=options['batch_size'],
+                max_batches=options['max_batches'],
+            )
+        except ArchiveUnavailable as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} analyses'))
@@ -0,0 +1,17 @@
+# sentiment_app/management/commands/cleanup_uploads.py
+from django.core.management.base import BaseCommand
+
+from sentiment_app.uploads import cleanup_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete abandoned resumable chunked uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=None,
+                            help='Age in seconds after which a partial upload is removed '
+                                 '(defaults to CHUNKED_UPLOAD_EXPIRY)')
+
+    def handle(self, *args, **options):
+        removed = cleanup_stale_uploads(options['max_age'])
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} stale uploads'))
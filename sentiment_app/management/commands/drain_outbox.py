@@ -0,0 +1,29 @@
+# sentiment_app/management/commands/drain_outbox.py
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from sentiment_app.outbox import drain_all
+
+
+class Command(BaseCommand):
+    help = 'Carry out pending outbox events (completion emails, batch statistics)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling instead of exiting once the outbox is empty')
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Seconds between polls with --loop (defaults to OUTBOX_POLL_INTERVAL)')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Events claimed per batch (defaults to OUTBOX_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or getattr(settings, 'OUTBOX_POLL_INTERVAL', 5)
+        while True:
+            drained = drain_all(options['batch_size'])
+            if drained or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Processed {drained} outbox events'))
+            if not options['loop']:
+                return
+            time.sleep(interval)
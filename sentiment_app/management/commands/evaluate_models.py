@@ -0,0 +1,81 @@
+# sentiment_app/management/commands/evaluate_models.py
+from django.core.management.base import BaseCommand, CommandError
+
+from sentiment_app.evaluation import (
+    DEFAULT_SCORERS, UnknownScorer, check_gate, run_evaluation, validate_scorer, write_report,
+)
+
+
+class Command(BaseCommand):
+    help = ('Compare scorers on the labeled hold-out split: F1, rows/sec, p99 batch '
+            'latency and peak RSS, with a Pareto report; optionally gate a promotion')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scorer', action='append', dest='scorers',
+                            help='Scorer to evaluate (repeatable): an analyzer model type or a '
+                                 f"cascade 'first>second@threshold'. Defaults to {', '.join(DEFAULT_SCORERS)}")
+        parser.add_argument('--csv', default=None,
+                            help='Labeled CSV (defaults to the processed reviews dataset)')
+        parser.add_argument('--text-column', default='reviewText')
+        parser.add_argument('--label-column', default='sentiment')
+        parser.add_argument('--test-size', type=float, default=0.2)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Only use the first N rows of the split')
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--in-process', action='store_true',
+                            help='Run every scorer in this process (faster, but peak RSS is shared)')
+        parser.add_argument('--output-dir', default=None,
+                            help='Where to write the report (defaults to EVALUATION_DIR)')
+        parser.add_argument('--gate', default=None,
+                            help='Fail unless this scorer meets the thresholds below '
+                                 'and is on the Pareto front')
+        parser.add_argument('--min-f1', type=float, default=None)
+        parser.add_argument('--min-rows-per-sec', type=float, default=None)
+        parser.add_argument('--max-p99-ms', type=float, default=None)
+
+    def handle(self, *args, **options):
+        scorers = options['scorers'] or list(DEFAULT_SCORERS)
+        if options['gate'] and options['gate'] not in scorers:
+            scorers.append(options['gate'])
+        for name in scorers:
+            try:
+                validate_scorer(name)
+            except UnknownScorer as e:
+                raise CommandError(str(e))
+
+        report = run_evaluation(
+            scorers,
+            batch_size=options['batch_size'],
+            isolate=not options['in_process'],
+            path=options['csv'],
+            text_column=options['text_column'],
+            label_column=options['label_column'],
+            test_size=options['test_size'],
+            seed=options['seed'],
+            limit=options['limit'],
+        )
+        path = write_report(report, options['output_dir'])
+
+        self.stdout.write(f"{'scorer':<32} {'F1 w':>6} {'F1 m':>6} {'rows/s':>9} "
+                          f"{'p99 ms':>8} {'RSS MB':>7}  pareto")
+        for r in report['results']:
+            if not r.get('available'):
+                status = 'failed' if r.get('failed') else 'unavailable'
+                self.stdout.write(f"{r['scorer']:<32} {status}: {r['error']}")
+                continue
+            self.stdout.write(
+                f"{r['scorer']:<32} {r['f1_weighted']:>6.3f} {r['f1_macro']:>6.3f} "
+                f"{r['rows_per_sec']:>9.0f} {r['p99_batch_ms']:>8.1f} {r['peak_rss_mb']:>7.0f}  "
+                f"{'*' if r['scorer'] in report['pareto_front'] else ''}"
+            )
+        self.stdout.write(self.style.SUCCESS(f'Report written to {path}'))
+
+        if options['gate']:
+            failures = check_gate(report, options['gate'],
+                                  min_f1=options['min_f1'],
+                                  min_rows_per_sec=options['min_rows_per_sec'],
+                                  max_p99_ms=options['max_p99_ms'])
+            if failures:
+                raise CommandError(f"{options['gate']} may not be promoted: " + '; '.join(failures))
+            self.stdout.write(self.style.SUCCESS(f"{options['gate']} passes the promotion gate"))
@@ -0,0 +1,50 @@
+# sentiment_app/management/commands/export_deep_model.py
+import pickle
+
+import joblib
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from sentiment_app.deep_model import export_keras_model
+
+
+class Command(BaseCommand):
+    help = 'Export the trained Keras model and tokenizer to a NumPy bundle for serving'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=str(settings.MODEL_DIR / 'sentiment_deep_model.h5'),
+                            help='Path to the trained Keras model (.h5)')
+        parser.add_argument('--tokenizer', default=str(settings.MODEL_DIR / 'tokenizer.pickle'),
+                            help='Path to the pickled Keras tokenizer')
+        parser.add_argument('--scaler', default=str(settings.MODEL_DIR / 'feature_scaler.joblib'),
+                            help='Path to the meta feature scaler (optional)')
+        parser.add_argument('--max-len', type=int, default=200,
+                            help='Sequence length used during training')
+        parser.add_argument('--output', default=str(settings.DEEP_MODEL_BUNDLE),
+                            help='Where to write the .npz bundle')
+
+    def handle(self, *args, **options):
+        try:
+            # TensorFlow is only needed here, never in the web workers
+            from tensorflow.keras.models import load_model
+        except ImportError:
+            raise CommandError('TensorFlow is required to export the deep model')
+
+        try:
+            model = load_model(options['model'])
+            with open(options['tokenizer'], 'rb') as handle:
+                tokenizer = pickle.load(handle)
+        except (OSError, IOError) as e:
+            raise CommandError(f'Could not load model artifacts: {e}')
+
+        scaler = None
+        try:
+            scaler = joblib.load(options['scaler'])
+        except (OSError, IOError):
+            self.stdout.write(self.style.WARNING('No feature scaler found, meta features will be unscaled'))
+
+        output = export_keras_model(
+            model, tokenizer, options['output'],
+            max_len=options['max_len'], scaler=scaler,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Exported deep model bundle to {output}'))
@@ -0,0 +1,47 @@
+# sentiment_app/management/commands/import_profile.py
+from django.core.management.base import BaseCommand, CommandError
+
+from sentiment_app.startup import import_time_report
+
+# Packages that should never be imported on the cold startup path
+HEAVY_PACKAGES = ('pandas', 'numpy', 'sklearn', 'scipy', 'pyarrow', 'tensorflow',
+                  'keras', 'xgboost', 'lightgbm', 'torch')
+
+
+class Command(BaseCommand):
+    help = 'Report which modules a cold worker start imports and how long they take'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25,
+                            help='Number of slowest modules to list')
+        parser.add_argument('--preload', action='store_true',
+                            help='Include the warm-up (heavy imports and model loading)')
+        parser.add_argument('--fail-on-heavy', action='store_true',
+                            help='Exit with an error if a heavy package is imported at startup')
+
+    def handle(self, *args, **options):
+        try:
+            total, modules = import_time_report(preload=options['preload'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f'Startup time: {total:.3f}s ({len(modules)} modules imported)')
+        self.stdout.write('')
+        self.stdout.write(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        slowest = sorted(modules, key=lambda m: m[2], reverse=True)[:options['top']]
+        for name, self_us, cumulative_us, depth in slowest:
+            self.stdout.write(f'{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  '
+                              f"{'  ' * depth}{name}")
+
+        heavy = sorted({
+            name for name, _, _, _ in modules
+            if name.split('.')[0] in HEAVY_PACKAGES and '.' not in name
+        })
+        self.stdout.write('')
+        if heavy:
+            message = f"Heavy packages imported at startup: {', '.join(heavy)}"
+            if options['fail_on_heavy'] and not options['preload']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS('No heavy packages on the startup path'))
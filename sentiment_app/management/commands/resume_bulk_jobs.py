@@ -0,0 +1,39 @@
+# sentiment_app/management/commands/resume_bulk_jobs.py
+from django.core.management.base import BaseCommand, CommandError
+
+from sentiment_app.bulk import interrupted_jobs, resume_bulk_job
+from sentiment_app.models import BatchAnalysis
+
+
+class Command(BaseCommand):
+    help = 'Resume bulk analysis jobs that were interrupted, from their last checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, action='append', default=[],
+                            help='Resume this batch id (processing or failed); repeatable')
+        parser.add_argument('--stale-after', type=int, default=None,
+                            help='Seconds without a checkpoint before a processing job '
+                                 'counts as interrupted (defaults to BULK_JOB_STALE_AFTER)')
+
+    def handle(self, *args, **options):
+        if options['batch']:
+            batches = list(BatchAnalysis.objects.filter(pk__in=options['batch']))
+            missing = set(options['batch']) - {b.pk for b in batches}
+            if missing:
+                raise CommandError(f"Unknown batch ids: {', '.join(map(str, sorted(missing)))}")
+        else:
+            batches = list(interrupted_jobs(options['stale_after']))
+
+        resumed = 0
+        for batch in batches:
+            try:
+                result = resume_bulk_job(batch)
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f'Batch {batch.pk} failed again: {e}'))
+                continue
+            if result is None:
+                self.stdout.write(f'Skipped batch {batch.pk}')
+            else:
+                resumed += 1
+                self.stdout.write(f'Finished batch {batch.pk} ({result.processed_reviews} reviews)')
+        self.stdout.write(self.style.SUCCESS(f'Resumed {resumed} bulk jobs'))
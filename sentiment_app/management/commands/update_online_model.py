@@ -0,0 +1,81 @@
+# sentiment_app/management/commands/update_online_model.py
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from sentiment_app.online_model import (
+    OnlineSentimentModel, encode_label, load_current_model, publish_model,
+)
+
+
+class Command(BaseCommand):
+    help = 'Stream new labeled reviews into the online model and publish a new version'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--csv', action='append', default=[],
+                            help='CSV file of labeled reviews (can be given several times)')
+        parser.add_argument('--text-column', default='reviewText',
+                            help='Column containing the review text')
+        parser.add_argument('--label-column', default='sentiment',
+                            help='Column containing the label (sentiment name or 1-5 rating)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Mini-batch size for partial_fit')
+        parser.add_argument('--reset', action='store_true',
+                            help='Start from a fresh model instead of the published one')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Train but do not publish a new version')
+
+    def handle(self, *args, **options):
+        # Only human labels are used: stored analyses hold the models' own
+        # predictions, and training on those would just reinforce them
+        if not options['csv']:
+            raise CommandError('Nothing to train on: pass --csv with labeled reviews')
+
+        model = None if options['reset'] else load_current_model()
+        if model is None:
+            model = OnlineSentimentModel()
+            self.stdout.write('Starting a new online model')
+        else:
+            self.stdout.write(f'Updating online model version {model.version}')
+
+        batch_size = options['batch_size']
+        trained = 0
+
+        for csv_path in options['csv']:
+            trained += self.train_from_csv(model, csv_path, options['text_column'],
+                                           options['label_column'], batch_size)
+
+        if trained == 0:
+            self.stdout.write(self.style.WARNING('No new labeled reviews, nothing published'))
+            return
+
+        if options['dry_run']:
+            self.stdout.write(f'Trained on {trained} reviews (dry run, not published)')
+            return
+
+        path = publish_model(model)
+        self.stdout.write(self.style.SUCCESS(
+            f'Trained on {trained} reviews, published version {model.version} to {path}'
+        ))
+
+    def _fit_batch(self, model, texts, labels):
+        pairs = [(str(t), encode_label(l)) for t, l in zip(texts, labels)]
+        pairs = [(t, l) for t, l in pairs if t.strip() and l is not None]
+        if pairs:
+            batch_texts, batch_labels = zip(*pairs)
+            model.partial_fit(list(batch_texts), list(batch_labels))
+        return len(pairs)
+
+    def train_from_csv(self, model, csv_path, text_column, label_column, batch_size):
+        """Read the CSV in chunks so arbitrarily large files stream through"""
+        trained = 0
+        try:
+            reader = pd.read_csv(csv_path, usecols=[text_column, label_column], chunksize=batch_size)
+            for chunk in reader:
+                chunk = chunk.dropna()
+                trained += self._fit_batch(model, chunk[text_column].tolist(),
+                                           chunk[label_column].tolist())
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Error reading {csv_path}: {e}')
+
+        self.stdout.write(f'{csv_path}: {trained} reviews')
+        return trained
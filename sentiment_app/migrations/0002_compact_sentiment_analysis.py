@@ -0,0 +1,165 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+import sentiment_app.models
+
+
+SENTIMENT_CODES = {'negative': 0, 'neutral': 1, 'positive': 2}
+RESULT_COLUMN_KEYS = ('sentiment', 'confidence', 'probabilities', 'model')
+BATCH_SIZE = 2000
+
+
+def compact_rows(apps, schema_editor):
+    """Move redundant meta_data JSON into typed columns, in id-ordered batches"""
+    SentimentAnalysis = apps.get_model('sentiment_app', 'SentimentAnalysis')
+    ModelVersion = apps.get_model('sentiment_app', 'ModelVersion')
+
+    # Refuse to guess a code for a label we don't know; fix those rows first
+    unknown = list(
+        SentimentAnalysis.objects.exclude(sentiment__in=list(SENTIMENT_CODES))
+        .order_by('id').values_list('id', 'sentiment')[:20]
+    )
+    if unknown:
+        listed = ', '.join(f'{pk} ({sentiment!r})' for pk, sentiment in unknown)
+        raise ValueError(f'SentimentAnalysis rows with unknown sentiment labels: {listed}')
+
+    versions = {}
+    last_id = 0
+
+    while True:
+        rows = list(
+            SentimentAnalysis.objects.filter(id__gt=last_id).order_by('id')[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+
+        for row in rows:
+            meta = row.meta_data or {}
+            probabilities = meta.get('probabilities') or {}
+            row.sentiment_code = SENTIMENT_CODES[row.sentiment]
+            row.prob_negative = probabilities.get('negative')
+            row.prob_neutral = probabilities.get('neutral')
+            row.prob_positive = probabilities.get('positive')
+
+            name = row.model_used or meta.get('model')
+            if name:
+                if name not in versions:
+                    versions[name], _ = ModelVersion.objects.get_or_create(name=name[:50])
+                row.model_version = versions[name]
+
+            row.meta_data = {k: v for k, v in meta.items() if k not in RESULT_COLUMN_KEYS}
+
+        SentimentAnalysis.objects.bulk_update(rows, [
+            'sentiment_code', 'prob_negative', 'prob_neutral', 'prob_positive',
+            'model_version', 'meta_data',
+        ])
+        last_id = rows[-1].id
+
+
+def expand_rows(apps, schema_editor):
+    """Reverse of compact_rows: restore the string columns and full meta_data"""
+    SentimentAnalysis = apps.get_model('sentiment_app', 'SentimentAnalysis')
+    labels = {code: label for label, code in SENTIMENT_CODES.items()}
+    last_id = 0
+
+    while True:
+        rows = list(
+            SentimentAnalysis.objects.filter(id__gt=last_id)
+            .select_related('model_version').order_by('id')[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+
+        for row in rows:
+            code = row.sentiment_code
+            # The historical SentimentField may already have converted the code
+            row.sentiment = code if code in SENTIMENT_CODES else labels.get(code, 'neutral')
+            row.model_used = row.model_version.name if row.model_version_id else ''
+            meta = dict(row.meta_data or {})
+            meta.update({
+                'sentiment': row.sentiment,
+                'confidence': row.confidence,
+                'model': row.model_used,
+                'probabilities': {
+                    'negative': row.prob_negative,
+                    'neutral': row.prob_neutral,
+                    'positive': row.prob_positive,
+                },
+            })
+            row.meta_data = meta
+
+        SentimentAnalysis.objects.bulk_update(rows, ['sentiment', 'model_used', 'meta_data'])
+        last_id = rows[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sentiment_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModelVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='sentimentanalysis',
+            name='sentiment_code',
+            field=sentiment_app.models.SentimentField(null=True, choices=[('positive', 'Positive'), ('negative', 'Negative'), ('neutral', 'Neutral')]),
+        ),
+        migrations.AddField(
+            model_name='sentimentanalysis',
+            name='prob_negative',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sentimentanalysis',
+            name='prob_neutral',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sentimentanalysis',
+            name='prob_positive',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sentimentanalysis',
+            name='model_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='sentiment_app.modelversion'),
+        ),
+        # Defaults let the old columns be re-added when the migration is reversed
+        migrations.AlterField(
+            model_name='sentimentanalysis',
+            name='sentiment',
+            field=models.CharField(choices=[('positive', 'Positive'), ('negative', 'Negative'), ('neutral', 'Neutral')], default='neutral', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='sentimentanalysis',
+            name='model_used',
+            field=models.CharField(default='', max_length=50),
+        ),
+        migrations.RunPython(compact_rows, expand_rows),
+        migrations.RemoveField(
+            model_name='sentimentanalysis',
+            name='sentiment',
+        ),
+        migrations.RemoveField(
+            model_name='sentimentanalysis',
+            name='model_used',
+        ),
+        migrations.RenameField(
+            model_name='sentimentanalysis',
+            old_name='sentiment_code',
+            new_name='sentiment',
+        ),
+        migrations.AlterField(
+            model_name='sentimentanalysis',
+            name='sentiment',
+            field=sentiment_app.models.SentimentField(choices=[('positive', 'Positive'), ('negative', 'Negative'), ('neutral', 'Neutral')]),
+        ),
+    ]
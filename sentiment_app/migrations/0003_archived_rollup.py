@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import sentiment_app.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('sentiment_app', '0002_compact_sentiment_analysis'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('sentiment', sentiment_app.models.SentimentField(choices=[('positive', 'Positive'), ('negative', 'Negative'), ('neutral', 'Neutral')])),
+                ('count', models.IntegerField(default=0)),
+                ('confidence_sum', models.FloatField(default=0)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'month', 'sentiment')},
+            },
+        ),
+    ]
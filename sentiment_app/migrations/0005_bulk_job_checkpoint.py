@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sentiment_app', '0004_outbox_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batchanalysis',
+            name='checkpoint_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='batchanalysis',
+            name='confidence_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='batchanalysis',
+            name='job_options',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='batchanalysis',
+            name='output_bytes',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='batchanalysis',
+            name='processed_reviews',
+            field=models.IntegerField(default=0),
+        ),
+    ]
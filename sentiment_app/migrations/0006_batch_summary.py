@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sentiment_app', '0005_bulk_job_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batchanalysis',
+            name='summary',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sentiment_app', '0008_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='once',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddConstraint(
+            model_name='outboxevent',
+            constraint=models.UniqueConstraint(condition=models.Q(('once', True)), fields=('kind', 'dedup_key'), name='outbox_once_unique'),
+        ),
+    ]
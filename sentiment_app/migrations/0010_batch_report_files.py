@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:20
+
+from django.db import migrations, models
+
+
+EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'xlsx': '.xlsx'}
+
+
+def record_report_files(apps, schema_editor):
+    """Name the reports of finished batches the way the writer named them"""
+    BatchAnalysis = apps.get_model('sentiment_app', 'BatchAnalysis')
+    for batch in BatchAnalysis.objects.filter(status='completed').exclude(results_file=''):
+        formats = batch.job_options.get('report_formats') or ['csv']
+        compress = batch.job_options.get('compress_report', False)
+        files = {}
+        for fmt in formats:
+            if fmt not in EXTENSIONS:
+                continue
+            suffix = '.gz' if compress and fmt == 'csv' else ''
+            files[fmt] = f'batch_{batch.id}_results{EXTENSIONS[fmt]}{suffix}'
+        files['csv'] = batch.results_file.name.rsplit('/', 1)[-1]
+        BatchAnalysis.objects.filter(pk=batch.pk).update(report_files=files)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sentiment_app', '0009_outbox_once'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batchanalysis',
+            name='report_files',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(record_report_files, migrations.RunPython.noop),
+    ]
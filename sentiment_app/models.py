@@ -1,5 +1,54 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+# Sentiment labels are stored as small integers (same encoding as the notebook)
+SENTIMENT_CODES = {'negative': 0, 'neutral': 1, 'positive': 2}
+SENTIMENT_LABELS = {code: label for label, code in SENTIMENT_CODES.items()}
+
+# Analyzer result keys that have their own columns and are not kept in meta_data
+RESULT_COLUMN_KEYS = ('sentiment', 'confidence', 'probabilities', 'model')
+
+
+class SentimentField(models.SmallIntegerField):
+    """Stores a sentiment label as a small integer code, exposes it as a string"""
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return SENTIMENT_LABELS.get(value, value)
+
+    def to_python(self, value):
+        if value is None or value in SENTIMENT_CODES:
+            return value
+        return SENTIMENT_LABELS.get(int(value), value)
+
+    def get_prep_value(self, value):
+        if value is None:
+            return value
+        if value in SENTIMENT_CODES:
+            return SENTIMENT_CODES[value]
+        if isinstance(value, int) and value in SENTIMENT_LABELS:
+            return value
+        raise ValueError(f"Unknown sentiment {value!r}")
+
+
+class ModelVersion(models.Model):
+    """A scorer name/version referenced by stored analyses"""
+    name = models.CharField(max_length=50, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return self.name
+    
+    @classmethod
+    def for_name(cls, name):
+        """Return the row for ``name``, creating it on first use"""
+        # Looked up every time: the table is tiny, and a cached row could have
+        # been deleted since (flush, admin, a fresh test database)
+        version, _ = cls.objects.get_or_create(name=name)
+        return version
+
 
 class SentimentAnalysis(models.Model):
     SENTIMENT_CHOICES = [
@@ -10,9 +59,13 @@ class SentimentAnalysis(models.Model):
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     text = models.TextField()
-    sentiment = models.CharField(max_length=10, choices=SENTIMENT_CHOICES)
+    sentiment = SentimentField(choices=SENTIMENT_CHOICES)
     confidence = models.FloatField()
-    model_used = models.CharField(max_length=50)
+    prob_negative = models.FloatField(null=True, blank=True)
+    prob_neutral = models.FloatField(null=True, blank=True)
+    prob_positive = models.FloatField(null=True, blank=True)
+    model_version = models.ForeignKey(ModelVersion, on_delete=models.PROTECT, null=True, blank=True)
+    # Only data that has no column of its own (e.g. full-text statistics)
     meta_data = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -22,6 +75,70 @@ class SentimentAnalysis(models.Model):
     
     def __str__(self):
         return f"{self.sentiment} - {self.text[:50]}..."
+    
+    @property
+    def model_used(self):
+        return self.model_version.name if self.model_version_id else ''
+    
+    @property
+    def probabilities(self):
+        return {
+            'negative': self.prob_negative,
+            'neutral': self.prob_neutral,
+            'positive': self.prob_positive,
+        }
+    
+    @classmethod
+    def from_result(cls, result, **kwargs):
+        """Build an unsaved row from an analyzer result dict"""
+        probabilities = result.get('probabilities') or {}
+        return cls(
+            sentiment=result['sentiment'],
+            confidence=result['confidence'],
+            prob_negative=probabilities.get('negative'),
+            prob_neutral=probabilities.get('neutral'),
+            prob_positive=probabilities.get('positive'),
+            model_version=ModelVersion.for_name(result['model']) if result.get('model') else None,
+            meta_data={k: v for k, v in result.items() if k not in RESULT_COLUMN_KEYS},
+            **kwargs
+        )
+
+class ArchivedRollup(models.Model):
+    """
+    Counters for analyses that were moved out of SentimentAnalysis into the
+    columnar archive, so totals and distributions stay correct.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    month = models.DateField()
+    sentiment = SentimentField(choices=SentimentAnalysis.SENTIMENT_CHOICES)
+    count = models.IntegerField(default=0)
+    confidence_sum = models.FloatField(default=0)
+    
+    class Meta:
+        unique_together = ('user', 'month', 'sentiment')
+    
+    def __str__(self):
+        return f"{self.user_id} {self.month:%Y-%m} {self.sentiment}: {self.count}"
+
+class ArchivePart(models.Model):
+    """
+    One Parquet file of the analysis archive. A part is recorded in the same
+    transaction that deletes its rows from SentimentAnalysis, so files without
+    a record are leftovers of an interrupted run and are never read.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    month = models.DateField()
+    path = models.CharField(max_length=255, unique=True)  # relative to ARCHIVE_DIR
+    rows = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'month'], name='archive_part_user_month_idx'),
+        ]
+    
+    def __str__(self):
+        return self.path
 
 class BatchAnalysis(models.Model):
     STATUS_CHOICES = [
@@ -44,8 +161,64 @@ class BatchAnalysis(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     
+    # Checkpoint of a running bulk job (see sentiment_app.bulk): rows written
+    # to the partial output so far, its size in bytes and when it was taken
+    processed_reviews = models.IntegerField(default=0)
+    confidence_sum = models.FloatField(default=0)
+    output_bytes = models.BigIntegerField(default=0)
+    checkpoint_at = models.DateTimeField(null=True, blank=True)
+    job_options = models.JSONField(default=dict, blank=True)
+    # Report file names under media/reports/ by format, recorded before they
+    # are moved into place
+    report_files = models.JSONField(default=dict, blank=True)
+    # Precomputed results summary (see sentiment_app.batch_summary)
+    summary = models.JSONField(null=True, blank=True)
+    
     class Meta:
         verbose_name_plural = 'Batch Analyses'
     
     def __str__(self):
-        return f"Batch {self.id} - {self.file_name}"
\ No newline at end of file
+        return f"Batch {self.id} - {self.file_name}"
+
+class OutboxEvent(models.Model):
+    """
+    Side effect recorded in the same transaction as the write that caused it
+    and carried out later by the outbox worker (see sentiment_app.outbox).
+    """
+    kind = models.CharField(max_length=50)
+    # Pending events with the same kind and key are merged into one
+    dedup_key = models.CharField(max_length=100, blank=True, default='')
+    # Recorded at most once per kind and key, ever (enforced by the database)
+    once = models.BooleanField(default=False)
+    payload = models.JSONField(default=dict, blank=True)
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['processed_at', 'available_at'], name='outbox_pending_idx'),
+            models.Index(fields=['kind', 'dedup_key'], name='outbox_dedup_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'dedup_key'], condition=models.Q(once=True),
+                                    name='outbox_once_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind}:{self.dedup_key} ({'done' if self.processed_at else 'pending'})"
+
+class DataVersion(models.Model):
+    """
+    Version counter of one data scope (see sentiment_app.data_version). Kept
+    in the database so every process agrees on it, whatever cache backend
+    each one uses.
+    """
+    scope = models.CharField(max_length=64, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    modified_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.scope} v{self.version}"
@@ -0,0 +1,177 @@
+# sentiment_app/online_model.py
+"""
+Online sentiment model: hashing-trick features + a linear classifier that is
+updated incrementally with ``partial_fit``.
+
+Unlike the TF-IDF + ensemble pipeline there is no vocabulary to fit, so memory
+stays constant and new labeled reviews can be streamed in mini-batches without
+retraining on the whole corpus. Each update is published as a new numbered
+version under ``ONLINE_MODEL_DIR``; a ``CURRENT`` pointer file names the version
+that serving should use.
+"""
+import logging
+import os
+import re
+import tempfile
+
+import joblib
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SENTIMENT_LABELS = ['negative', 'neutral', 'positive']
+LABEL_ENCODER = {'negative': 0, 'neutral': 1, 'positive': 2}
+
+POINTER_FILE = 'CURRENT'
+VERSION_FILE_RE = re.compile(r'^online_v(\d+)\.joblib$')
+
+
+def rating_to_sentiment(rating):
+    """Same mapping the EDA notebook uses to derive labels from star ratings"""
+    if rating >= 4:
+        return 'positive'
+    elif rating == 3:
+        return 'neutral'
+    return 'negative'
+
+
+def encode_label(label):
+    """Map a sentiment string or 1-5 star rating to a class index (None if unusable)"""
+    if label is None:
+        return None
+    if isinstance(label, str):
+        label = label.strip().lower()
+        if label in LABEL_ENCODER:
+            return LABEL_ENCODER[label]
+        try:
+            label = float(label)
+        except ValueError:
+            return None
+    try:
+        if np.isnan(label):
+            return None
+    except TypeError:
+        return None
+    return LABEL_ENCODER[rating_to_sentiment(label)]
+
+
+class OnlineSentimentModel:
+    """Hashing vectorizer + SGD logistic regression trained with partial_fit"""
+
+    def __init__(self, n_features=2 ** 20, ngram_range=(1, 2), alpha=1e-5):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.linear_model import SGDClassifier
+
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features,
+            ngram_range=ngram_range,
+            alternate_sign=False,
+            norm='l2',
+        )
+        self.classifier = SGDClassifier(loss='log_loss', alpha=alpha, random_state=42)
+        self.classes = np.arange(len(SENTIMENT_LABELS))
+        self.version = 0
+        self.samples_seen = 0
+        self.updated_at = None
+
+    @property
+    def is_fitted(self):
+        return hasattr(self.classifier, 'coef_')
+
+    def partial_fit(self, texts, labels):
+        """Update the model with one mini-batch of texts and encoded labels"""
+        if not texts:
+            return
+        features = self.vectorizer.transform(texts)
+        self.classifier.partial_fit(features, np.asarray(labels), classes=self.classes)
+        self.samples_seen += len(texts)
+
+    def predict_proba(self, texts):
+        """Return class probabilities (negative, neutral, positive)"""
+        features = self.vectorizer.transform(texts)
+        return self.classifier.predict_proba(features)
+
+
+# ---------------------------------------------------------------------------
+# Version store
+# ---------------------------------------------------------------------------
+
+def get_model_dir():
+    model_dir = getattr(settings, 'ONLINE_MODEL_DIR', settings.MODEL_DIR / 'online')
+    os.makedirs(model_dir, exist_ok=True)
+    return model_dir
+
+
+def current_version_path():
+    """Path of the published version named by the CURRENT pointer, or None"""
+    model_dir = get_model_dir()
+    pointer = os.path.join(model_dir, POINTER_FILE)
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer) as handle:
+        filename = handle.read().strip()
+    path = os.path.join(model_dir, filename)
+    return path if os.path.exists(path) else None
+
+
+def load_current_model():
+    """Load the currently published online model, or None if nothing is published"""
+    path = current_version_path()
+    if path is None:
+        return None
+    return joblib.load(path)
+
+
+def _atomic_write(directory, filename, writer):
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{filename}.')
+    os.close(fd)
+    try:
+        writer(tmp_path)
+        os.replace(tmp_path, os.path.join(directory, filename))
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def published_versions(model_dir=None):
+    """``{version number: filename}`` of every version file on disk"""
+    model_dir = model_dir or get_model_dir()
+    versions = {}
+    for name in os.listdir(model_dir):
+        match = VERSION_FILE_RE.match(name)
+        if match:
+            versions[int(match.group(1))] = name
+    return versions
+
+
+def publish_model(model, keep=5):
+    """Save ``model`` as the next version and point CURRENT at it"""
+    model_dir = get_model_dir()
+    # Number after everything on disk, so a fresh (--reset) model never
+    # reuses or sorts before an existing version
+    existing = published_versions(model_dir)
+    model.version = max([model.version, *existing]) + 1
+    model.updated_at = timezone.now()
+    filename = f'online_v{model.version:04d}.joblib'
+
+    _atomic_write(model_dir, filename, lambda path: joblib.dump(model, path, compress=3))
+
+    def write_pointer(path):
+        with open(path, 'w') as handle:
+            handle.write(filename)
+
+    _atomic_write(model_dir, POINTER_FILE, write_pointer)
+    logger.info(f"Published online model version {model.version} "
+                f"({model.samples_seen} samples seen)")
+
+    # Prune old versions, keeping the most recent ones for rollback; the file
+    # CURRENT names is never removed
+    versions = published_versions(model_dir)
+    for number in sorted(versions)[:-keep]:
+        if versions[number] != filename:
+            os.remove(os.path.join(model_dir, versions[number]))
+
+    return os.path.join(model_dir, filename)
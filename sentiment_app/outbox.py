@@ -0,0 +1,228 @@
+# sentiment_app/outbox.py
+"""
+Transactional outbox for side effects of model writes.
+
+Signal handlers call ``enqueue()`` instead of doing slow work (sending mail,
+recomputing aggregates) inline. The event row is written in the same
+transaction as the change that caused it, so it exists exactly when the
+change was committed. A local worker thread, woken on commit, drains pending
+events in batches; ``manage.py drain_outbox`` does the same from cron or a
+dedicated process.
+
+Pending events with the same kind and ``dedup_key`` are merged, and
+``once=True`` events are never recorded twice for the same key (a unique
+constraint backs this up). Drainers claim events one by one with a
+conditional UPDATE, so each event is carried out by exactly one of them, even
+on SQLite where row locks are not available.
+"""
+import logging
+import os
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# kind -> (function, batched)
+HANDLERS = {}
+
+
+def handler(kind, batched=False):
+    """
+    Register the function that carries out events of ``kind``.
+
+    Plain handlers are called with one payload at a time; batched handlers get
+    the list of payloads of every claimed event of that kind at once and may
+    return the positions of the payloads that failed, so only those are retried.
+    """
+    def decorator(func):
+        HANDLERS[kind] = (func, batched)
+        return func
+    return decorator
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue(kind, payload=None, dedup_key='', once=False):
+    """Record a side effect; it runs after the current transaction commits"""
+    payload = payload or {}
+    dedup_key = str(dedup_key)
+
+    if once and dedup_key:
+        try:
+            with transaction.atomic():
+                event = OutboxEvent.objects.create(kind=kind, dedup_key=dedup_key,
+                                                   payload=payload, once=True)
+        except IntegrityError:
+            # Already recorded, possibly by a concurrent request
+            return None
+        transaction.on_commit(wake_worker)
+        return event
+
+    if dedup_key:
+        pending = OutboxEvent.objects.filter(
+            kind=kind, dedup_key=dedup_key, once=False, processed_at__isnull=True,
+        ).first()
+        if pending is not None:
+            # Merge into the pending event; the newest payload wins
+            OutboxEvent.objects.filter(pk=pending.pk).update(payload=payload)
+            return pending
+
+    event = OutboxEvent.objects.create(kind=kind, dedup_key=dedup_key, payload=payload)
+    transaction.on_commit(wake_worker)
+    return event
+
+
+def _claim_event(event, lease):
+    """
+    Lease ``event`` if it is unchanged since it was read. Only one of several
+    drainers that read it can move ``available_at`` from the value they saw.
+    """
+    claimed = OutboxEvent.objects.filter(
+        pk=event.pk, processed_at__isnull=True, available_at=event.available_at,
+    ).update(available_at=lease)
+    if claimed == 1:
+        event.available_at = lease
+        return True
+    return False
+
+
+def _claim(limit):
+    """Lease up to ``limit`` due events so concurrent drainers skip them"""
+    now = timezone.now()
+    lease = now + timedelta(seconds=_setting('OUTBOX_LEASE_SECONDS', 300))
+    candidates = (OutboxEvent.objects.filter(processed_at__isnull=True, available_at__lte=now)
+                  .order_by('id')[:limit])
+    return [event for event in candidates if _claim_event(event, lease)]
+
+
+def _finish(events, error=None):
+    now = timezone.now()
+    ids = [e.pk for e in events]
+    if error is None:
+        OutboxEvent.objects.filter(pk__in=ids).update(processed_at=now, last_error='')
+        return
+
+    max_attempts = _setting('OUTBOX_MAX_ATTEMPTS', 5)
+    for event in events:
+        attempts = event.attempts + 1
+        update = {'attempts': attempts, 'last_error': str(error)[:2000]}
+        if attempts >= max_attempts:
+            # Give up; the row stays behind with its error for inspection
+            update['processed_at'] = now
+            logger.error("Outbox event %s (%s) failed permanently: %s", event.pk, event.kind, error)
+        else:
+            update['available_at'] = now + timedelta(seconds=30 * 2 ** (attempts - 1))
+        OutboxEvent.objects.filter(pk=event.pk).update(**update)
+
+
+def _dispatch(kind, events):
+    if kind not in HANDLERS:
+        _finish(events, error=f'No handler registered for {kind!r}')
+        return
+
+    func, batched = HANDLERS[kind]
+    if batched:
+        try:
+            failed = set(func([e.payload for e in events]) or ())
+        except Exception as e:
+            logger.exception("Outbox handler %s failed for %d events", kind, len(events))
+            _finish(events, error=e)
+            return
+        _finish([e for i, e in enumerate(events) if i not in failed])
+        if failed:
+            _finish([events[i] for i in sorted(failed)], error=f'{kind} handler reported a failure')
+        return
+
+    for event in events:
+        try:
+            func(event.payload)
+        except Exception as e:
+            logger.exception("Outbox handler %s failed for event %s", kind, event.pk)
+            _finish([event], error=e)
+        else:
+            _finish([event])
+
+
+def drain(limit=None):
+    """Process one batch of due events; returns how many were claimed"""
+    events = _claim(limit or _setting('OUTBOX_BATCH_SIZE', 100))
+    if not events:
+        return 0
+
+    # Collapse duplicates that slipped in between claims, keeping the newest
+    by_kind = {}
+    duplicates = []
+    for event in events:
+        kind_events = by_kind.setdefault(event.kind, {})
+        key = event.dedup_key or f'#{event.pk}'
+        if key in kind_events:
+            duplicates.append(kind_events[key])
+        kind_events[key] = event
+    if duplicates:
+        _finish(duplicates)
+
+    for kind, kind_events in by_kind.items():
+        _dispatch(kind, list(kind_events.values()))
+
+    logger.debug("Drained %d outbox events", len(events))
+    return len(events)
+
+
+def drain_all(limit=None):
+    total = 0
+    while True:
+        drained = drain(limit)
+        if not drained:
+            return total
+        total += drained
+
+
+class OutboxWorker(threading.Thread):
+    """Background thread that drains the outbox when woken or every poll interval"""
+
+    def __init__(self, interval=None):
+        super().__init__(name='outbox-worker', daemon=True)
+        self.interval = interval or _setting('OUTBOX_POLL_INTERVAL', 5)
+        self.pid = os.getpid()
+        self._wakeup = threading.Event()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                close_old_connections()
+                drain_all()
+            except Exception:
+                logger.exception("Outbox worker iteration failed")
+            finally:
+                close_old_connections()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def wake_worker():
+    """Start the in-process worker if needed and let it drain right away"""
+    global _worker
+    if not _setting('OUTBOX_AUTOSTART', True):
+        return
+
+    with _worker_lock:
+        # Threads don't survive fork, so each worker process starts its own
+        if _worker is None or _worker.pid != os.getpid() or not _worker.is_alive():
+            _worker = OutboxWorker()
+            _worker.start()
+    _worker.wake()
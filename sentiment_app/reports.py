@@ -0,0 +1,386 @@
+# sentiment_app/reports.py
+"""
+Chunked report writing for bulk results.
+
+A bulk job hands each scored chunk to a ChunkedReportWriter as soon as it
+is ready, so no report is ever held in memory as a whole. The writer keeps
+one partial file per format in the job directory:
+
+* ``csv`` - the primary report, written and fsynced synchronously because
+  the job's checkpoint points into it. When it is compressed, every chunk
+  is appended as its own gzip member. Concatenated members form a valid
+  gzip file, so the report can still be truncated at any checkpoint.
+* ``parquet`` - one row group per chunk, compressed with
+  ``BULK_REPORT_PARQUET_COMPRESSION``;
+* ``xlsx`` - an openpyxl write-only workbook (the format is zipped anyway).
+
+Parquet and XLSX are optional extras. With ``parallel`` each one runs in its
+own thread behind a small bounded queue, so they encode while the next chunk
+is scored. These extras cannot be truncated to a checkpoint: on resume they
+are rebuilt from the committed part of the primary CSV. When the job is
+done, every partial file is moved into ``media/reports/`` with an atomic
+rename.
+"""
+import csv
+import errno
+import gzip
+import io
+import logging
+import os
+import queue
+import shutil
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+FORMAT_CSV = 'csv'
+FORMAT_PARQUET = 'parquet'
+FORMAT_XLSX = 'xlsx'
+
+EXTENSIONS = {
+    FORMAT_CSV: '.csv',
+    FORMAT_PARQUET: '.parquet',
+    FORMAT_XLSX: '.xlsx',
+}
+LABELS = {
+    FORMAT_CSV: 'CSV',
+    FORMAT_PARQUET: 'Parquet',
+    FORMAT_XLSX: 'Excel',
+}
+
+RESULT_COLUMNS = ['id', 'text', 'sentiment', 'confidence', 'model', 'group_id', 'error']
+
+# Chunks an extra format may fall behind before the scorer waits for it
+MAX_PENDING_CHUNKS = 4
+
+
+class ReportError(Exception):
+    """A report could not be written"""
+
+
+def _available(fmt):
+    try:
+        if fmt == FORMAT_PARQUET:
+            import pyarrow.parquet  # noqa: F401
+        elif fmt == FORMAT_XLSX:
+            import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return fmt in EXTENSIONS
+
+
+def report_formats(formats=None):
+    """
+    The formats to write, with the primary CSV first. Unknown formats and
+    formats whose package is missing are left out.
+    """
+    if formats is None:
+        formats = getattr(settings, 'BULK_REPORT_FORMATS', [FORMAT_CSV])
+    selected = [FORMAT_CSV]
+    for fmt in formats:
+        fmt = fmt.strip().lower()
+        if not fmt or fmt in selected:
+            continue
+        if _available(fmt):
+            selected.append(fmt)
+        else:
+            logger.warning(f"Report format '{fmt}' is unknown or not installed, skipping it")
+    return selected
+
+
+def report_filename(batch_id, fmt, compress=False):
+    suffix = '.gz' if compress and fmt == FORMAT_CSV else ''
+    return f'batch_{batch_id}_results{EXTENSIONS[fmt]}{suffix}'
+
+
+def open_results(path):
+    """Text handle on a results CSV, compressed or not"""
+    # Sniff instead of trusting the name: partial files end in .part
+    with open(path, 'rb') as f:
+        compressed = f.read(2) == b'\x1f\x8b'
+    if compressed:
+        return gzip.open(path, 'rt', newline='', encoding='utf-8')
+    return open(path, newline='', encoding='utf-8')
+
+
+def iter_results(path):
+    """Typed result records of a results CSV, in row order"""
+    with open_results(path) as f:
+        for row in csv.DictReader(f):
+            record = dict(row)
+            record['id'] = int(record['id'])
+            record['confidence'] = float(record.get('confidence') or 0)
+            if record.get('group_id') not in (None, ''):
+                record['group_id'] = int(record['group_id'])
+            yield record
+
+
+def _iter_chunks(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _publish(path, destination):
+    """Move ``path`` to ``destination`` so it appears there complete or not at all"""
+    try:
+        os.replace(path, destination)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # The staging directory is on another filesystem: copy next to the
+        # destination first, so the final rename is still atomic
+        tmp_path = f'{destination}.tmp'
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, destination)
+        os.remove(path)
+
+
+class _CsvReport:
+    """The checkpointed primary report; ``write`` returns its durable size"""
+
+    def __init__(self, path, compress=False, size=None):
+        self.path = path
+        self.compress = compress
+        if size is None:
+            with open(path, 'wb') as f:
+                f.write(self._encode(None))
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            # Drop anything written after the last committed checkpoint
+            with open(path, 'r+b') as f:
+                f.truncate(size)
+
+    def _encode(self, records):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=RESULT_COLUMNS)
+        if records is None:
+            writer.writeheader()
+        else:
+            writer.writerows(records)
+        data = buffer.getvalue().encode('utf-8')
+        if self.compress:
+            data = gzip.compress(data, compresslevel=getattr(settings, 'BULK_REPORT_GZIP_LEVEL', 6),
+                                 mtime=0)
+        return data
+
+    def write(self, records):
+        data = self._encode(records)
+        with open(self.path, 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+
+class _ParquetReport:
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ('id', pa.int64()),
+            ('text', pa.string()),
+            ('sentiment', pa.string()),
+            ('confidence', pa.float64()),
+            ('model', pa.string()),
+            ('group_id', pa.int64()),
+            ('error', pa.string()),
+        ])
+        compression = getattr(settings, 'BULK_REPORT_PARQUET_COMPRESSION', 'zstd')
+        self.writer = pq.ParquetWriter(path, self.schema, compression=compression)
+
+    def write(self, records):
+        rows = [{column: record.get(column) for column in RESULT_COLUMNS} for record in records]
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class _XlsxReport:
+    def __init__(self, path):
+        from openpyxl import Workbook
+
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet('Results')
+        self.sheet.append(RESULT_COLUMNS)
+
+    def write(self, records):
+        for record in records:
+            self.sheet.append([record.get(column) for column in RESULT_COLUMNS])
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+_EXTRA_REPORTS = {
+    FORMAT_PARQUET: _ParquetReport,
+    FORMAT_XLSX: _XlsxReport,
+}
+
+
+class _ThreadedReport:
+    """Runs a report in its own thread; errors surface on the next call"""
+
+    def __init__(self, report, name):
+        self.report = report
+        self.error = None
+        self.discard = False
+        self.queue = queue.Queue(MAX_PENDING_CHUNKS)
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            records = self.queue.get()
+            if records is None:
+                break
+            if self.error is None and not self.discard:
+                try:
+                    self.report.write(records)
+                except Exception as e:
+                    self.error = e
+        if self.error is None and not self.discard:
+            try:
+                self.report.close()
+            except Exception as e:
+                self.error = e
+
+    def _raise(self):
+        if self.error is not None:
+            raise ReportError(f'{self.thread.name} failed: {self.error}') from self.error
+
+    def write(self, records):
+        self._raise()
+        self.queue.put(records)
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self._raise()
+
+    def stop(self):
+        """End the thread without writing anything more"""
+        self.discard = True
+        self.queue.put(None)
+        self.thread.join()
+
+
+class ChunkedReportWriter:
+    """
+    Writes the reports of one bulk job chunk by chunk.
+
+    ``work_dir`` holds the partial files. ``resume_size`` is the committed
+    size of the primary CSV when continuing from a checkpoint. ``write()``
+    returns the new committed size after each chunk.
+    """
+
+    def __init__(self, work_dir, formats=None, compress=False, parallel=None,
+                 resume_size=None, replay_chunk_size=500):
+        self.work_dir = work_dir
+        self.formats = report_formats(formats)
+        self.compress = compress
+        if parallel is None:
+            parallel = getattr(settings, 'BULK_REPORT_PARALLEL', True)
+
+        self.csv = _CsvReport(self._partial_path(FORMAT_CSV), compress, resume_size)
+        self.extras = {}
+        try:
+            for fmt in self.formats[1:]:
+                report = _EXTRA_REPORTS[fmt](self._partial_path(fmt))
+                self.extras[fmt] = _ThreadedReport(report, f'{fmt} report') if parallel else report
+            if resume_size is not None and self.extras:
+                # Extra formats can't be truncated; rebuild them from the CSV
+                for records in _iter_chunks(iter_results(self.csv.path), replay_chunk_size):
+                    self._write_extras(records)
+        except Exception:
+            self.abort()
+            raise
+
+    def _partial_path(self, fmt):
+        return os.path.join(self.work_dir, f'results{EXTENSIONS[fmt]}.part')
+
+    @property
+    def partial_path(self):
+        """The primary CSV as written so far"""
+        return self.csv.path
+
+    def _write_extras(self, records):
+        for report in self.extras.values():
+            report.write(records)
+
+    def write(self, records):
+        # Threaded extras encode this chunk while the CSV is written and synced
+        self._write_extras(records)
+        return self.csv.write(records)
+
+    def _close_extras(self):
+        errors = []
+        for fmt, report in self.extras.items():
+            try:
+                report.close()
+            except Exception as e:
+                errors.append(f'{fmt}: {e}')
+        self.extras = {}
+        return errors
+
+    def abort(self):
+        """Stop the extra formats and drop their partial files; the CSV stays"""
+        self._close_extras()
+        for fmt in self.formats[1:]:
+            try:
+                os.remove(self._partial_path(fmt))
+            except FileNotFoundError:
+                pass
+
+    def detach(self):
+        """
+        Stop without touching the partial files, because another worker owns
+        them now. Extras that are not threaded are left unclosed.
+        """
+        for report in self.extras.values():
+            if isinstance(report, _ThreadedReport):
+                report.stop()
+        self.extras = {}
+
+    def filenames(self, batch_id):
+        """The report file names ``finish()`` publishes, by format, the primary CSV first"""
+        return {fmt: report_filename(batch_id, fmt, self.compress) for fmt in self.formats}
+
+    def finish(self, reports_dir, batch_id):
+        """
+        Close every report and move it into ``reports_dir``. Returns the file
+        names by format, the primary CSV first.
+        """
+        errors = self._close_extras()
+        if errors:
+            self.abort()
+            raise ReportError(f"Could not write reports: {'; '.join(errors)}")
+
+        os.makedirs(reports_dir, exist_ok=True)
+        names = self.filenames(batch_id)
+        # The primary report goes last, so it only appears with its siblings
+        for fmt in self.formats[1:] + self.formats[:1]:
+            _publish(self._partial_path(fmt), os.path.join(reports_dir, names[fmt]))
+        return names
+
+
+def batch_report_files(batch):
+    """(format, relative media name) of each extra report a batch has on disk"""
+    files = []
+    for fmt, filename in batch.report_files.items():
+        name = f'reports/{filename}'
+        if fmt != FORMAT_CSV and os.path.exists(os.path.join(settings.MEDIA_ROOT, name)):
+            files.append((fmt, name))
+    return files
@@ -0,0 +1,205 @@
+# sentiment_app/response_formats.py
+"""
+Response formats for batch results.
+
+``api_batch_analyze`` negotiates one of:
+
+* ``json`` (default) - the original list of per-review objects;
+* ``columnar`` - JSON with parallel arrays, one per field, sentiments encoded
+  as indexes into ``labels`` and the model name hoisted to the top level;
+* ``msgpack`` - the columnar layout packed with MessagePack;
+* ``arrow`` - an Arrow IPC stream with one record batch (dictionary-encoded
+  sentiment, float32 scores), model name in the schema metadata.
+
+The format comes from an explicit ``format`` option or the Accept header, so
+every response (JSON included) carries ``Vary: Accept``. msgpack and pyarrow
+are optional; formats whose package is missing are skipped during
+negotiation and rejected with 406 when asked for explicitly. Probabilities
+are only included on request.
+"""
+import json
+
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+
+from .models import SENTIMENT_CODES
+
+FORMAT_JSON = 'json'
+FORMAT_COLUMNAR = 'columnar'
+FORMAT_MSGPACK = 'msgpack'
+FORMAT_ARROW = 'arrow'
+
+CONTENT_TYPES = {
+    FORMAT_JSON: 'application/json',
+    FORMAT_COLUMNAR: 'application/vnd.sentiment.columnar+json',
+    FORMAT_MSGPACK: 'application/msgpack',
+    FORMAT_ARROW: 'application/vnd.apache.arrow.stream',
+}
+
+# Extra media types accepted in the Accept header
+MEDIA_TYPE_ALIASES = {
+    'application/x-msgpack': FORMAT_MSGPACK,
+    'application/vnd.msgpack': FORMAT_MSGPACK,
+    'application/vnd.apache.arrow.file': FORMAT_ARROW,
+}
+
+LABELS = sorted(SENTIMENT_CODES, key=SENTIMENT_CODES.get)
+ERROR_CODE = -1
+
+
+class UnsupportedFormat(ValueError):
+    """The requested format is unknown or its package is not installed"""
+
+
+def _available(fmt):
+    try:
+        if fmt == FORMAT_MSGPACK:
+            import msgpack  # noqa: F401
+        elif fmt == FORMAT_ARROW:
+            import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _parse_accept(header):
+    """Media types of an Accept header, best first"""
+    ranges = []
+    for position, part in enumerate(header.split(',')):
+        media_type, *params = [p.strip() for p in part.split(';')]
+        quality = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if media_type and quality > 0:
+            ranges.append((-quality, position, media_type.lower()))
+    return [media_type for _, _, media_type in sorted(ranges)]
+
+
+def negotiate_format(request, requested=None):
+    """
+    Pick the response format from ``requested`` (a format name) or the
+    request's Accept header. Raises UnsupportedFormat for an explicit request
+    that cannot be served.
+    """
+    if requested:
+        requested = str(requested).lower()
+        if requested not in CONTENT_TYPES:
+            raise UnsupportedFormat(f"Unknown format '{requested}'")
+        if not _available(requested):
+            raise UnsupportedFormat(f"Format '{requested}' is not available on this server")
+        return requested
+
+    by_media_type = {content_type: fmt for fmt, content_type in CONTENT_TYPES.items()}
+    by_media_type.update(MEDIA_TYPE_ALIASES)
+    for media_type in _parse_accept(request.headers.get('Accept', '')):
+        fmt = by_media_type.get(media_type)
+        if fmt is not None and _available(fmt):
+            return fmt
+    return FORMAT_JSON
+
+
+def _prune(results, include_text, include_probabilities):
+    if include_text and include_probabilities:
+        return results
+    dropped = set()
+    if not include_text:
+        dropped.add('text')
+    if not include_probabilities:
+        dropped.add('probabilities')
+    return [{k: v for k, v in item.items() if k not in dropped} for item in results]
+
+
+def to_columns(results, include_text=True, include_probabilities=False):
+    """Parallel-array layout of batch results"""
+    models = {item['model'] for item in results if item['sentiment'] != 'error'}
+    columns = {
+        'count': len(results),
+        'labels': LABELS,
+        'model': models.pop() if len(models) == 1 else None,
+        'id': [item['id'] for item in results],
+        'sentiment': [SENTIMENT_CODES.get(item['sentiment'], ERROR_CODE) for item in results],
+        'confidence': [item['confidence'] for item in results],
+    }
+    if columns['model'] is None and models:
+        columns['models'] = [item['model'] for item in results]
+    if include_probabilities:
+        for label in LABELS:
+            columns[f'prob_{label}'] = [
+                (item.get('probabilities') or {}).get(label) for item in results
+            ]
+    if include_text:
+        columns['text'] = [item['text'] for item in results]
+    errors = {str(item['id']): item['error'] for item in results if 'error' in item}
+    if errors:
+        columns['errors'] = errors
+    return columns
+
+
+def _arrow_payload(columns):
+    import pyarrow as pa
+
+    # Error rows have no label and become nulls in the dictionary column
+    codes = pa.array([c if c != ERROR_CODE else None for c in columns['sentiment']],
+                     type=pa.int8())
+    arrays = {
+        'id': pa.array(columns['id'], type=pa.int32()),
+        'sentiment': pa.DictionaryArray.from_arrays(codes, pa.array(LABELS)),
+        'confidence': pa.array(columns['confidence'], type=pa.float32()),
+    }
+    for label in LABELS:
+        key = f'prob_{label}'
+        if key in columns:
+            arrays[key] = pa.array(columns[key], type=pa.float32())
+    if 'models' in columns:
+        arrays['model'] = pa.array(columns['models'], type=pa.string()).dictionary_encode()
+    if 'text' in columns:
+        arrays['text'] = pa.array(columns['text'], type=pa.string())
+
+    metadata = {'count': str(columns['count'])}
+    if columns['model']:
+        metadata['model'] = columns['model']
+    if 'errors' in columns:
+        metadata['errors'] = json.dumps(columns['errors'])
+
+    batch = pa.RecordBatch.from_pydict(arrays).replace_schema_metadata(metadata)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def render_batch_results(results, fmt, model_type, include_text=True,
+                         include_probabilities=False):
+    """HttpResponse with ``results`` (from batch_analyze) in format ``fmt``"""
+    if fmt == FORMAT_JSON:
+        results = _prune(results, include_text, include_probabilities)
+        response = JsonResponse({
+            'success': True,
+            'results': results,
+            'count': len(results),
+            'model_used': model_type
+        })
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    columns = to_columns(results, include_text, include_probabilities)
+    if fmt == FORMAT_COLUMNAR:
+        body = json.dumps({'success': True, 'model_used': model_type, **columns},
+                          separators=(',', ':'))
+    elif fmt == FORMAT_MSGPACK:
+        import msgpack
+        # Scores are float32, as in the Arrow stream
+        body = msgpack.packb({'success': True, 'model_used': model_type, **columns},
+                             use_bin_type=True, use_single_float=True)
+    elif fmt == FORMAT_ARROW:
+        body = _arrow_payload(columns)
+    else:
+        raise UnsupportedFormat(f"Unknown format '{fmt}'")
+
+    response = HttpResponse(body, content_type=CONTENT_TYPES[fmt])
+    patch_vary_headers(response, ['Accept'])
+    return response
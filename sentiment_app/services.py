@@ -1,16 +1,103 @@
 
 # sentiment_app/services.py
 import logging
+import os
+import time
 
 logger = logging.getLogger(__name__)
 
 class SentimentAnalyzer:
+    # How often to check whether a new online model version was published
+    ONLINE_MODEL_CHECK_INTERVAL = 30
+
     def __init__(self):
+        self._deep_model = None
+        self._deep_model_loaded = False
+        self._online_model = None
+        self._online_model_path = None
+        self._online_model_checked_at = None
         logger.info("SentimentAnalyzer initialized")
-        
+
+    def get_deep_model(self):
+        """Load the exported NumPy deep model bundle once, if it exists"""
+        if not self._deep_model_loaded:
+            from django.conf import settings
+            from .deep_model import NumpyDeepModel
+
+            self._deep_model_loaded = True
+            bundle_path = getattr(settings, 'DEEP_MODEL_BUNDLE', None)
+            if bundle_path and os.path.exists(bundle_path):
+                try:
+                    self._deep_model = NumpyDeepModel(bundle_path)
+                except Exception as e:
+                    logger.error(f"Error loading deep model bundle: {e}")
+            else:
+                logger.info("No deep model bundle found, using keyword fallback")
+        return self._deep_model
+
+    def get_online_model(self):
+        """Return the currently published online model, reloading on new versions"""
+        now = time.monotonic()
+        if (self._online_model_checked_at is None
+                or now - self._online_model_checked_at >= self.ONLINE_MODEL_CHECK_INTERVAL):
+            from .online_model import current_version_path
+            import joblib
+
+            self._online_model_checked_at = now
+            path = current_version_path()
+            if path != self._online_model_path:
+                try:
+                    self._online_model = joblib.load(path) if path else None
+                    self._online_model_path = path
+                    if self._online_model is not None:
+                        logger.info(f"Loaded online model version {self._online_model.version}")
+                except Exception as e:
+                    logger.error(f"Error loading online model: {e}")
+        if self._online_model is not None and self._online_model.is_fitted:
+            return self._online_model
+        return None
+
+    def warm_up(self):
+        """Load every available model now instead of on the first request"""
+        self.get_deep_model()
+        self.get_online_model()
+        # Run one text through each loaded model so lazy paths are exercised too
+        for model_type in ('deep_learning', 'online'):
+            scorer = self.get_scorer(model_type)
+            if scorer is not None:
+                scorer[0].predict_proba(['warm up'])
+
+    def get_scorer(self, model_type):
+        """Return (model, display name) for a trained model type, or None"""
+        if model_type == 'deep_learning':
+            model = self.get_deep_model()
+            if model is not None:
+                return model, 'Deep Learning Model (NumPy)'
+        elif model_type == 'online':
+            model = self.get_online_model()
+            if model is not None:
+                return model, f'Online Model v{model.version}'
+        return None
+
+    def _model_result(self, text, probabilities, model_name):
+        from .deep_model import probabilities_to_result
+
+        result = probabilities_to_result(probabilities)
+        result['model'] = model_name
+        result['text_statistics'] = {
+            'word_count': len(text.split()),
+            'char_count': len(text)
+        }
+        return result
+
     def analyze(self, text, model_type='ensemble'):
         """Analyze text sentiment"""
-        # For now, use simple keyword matching
+        scorer = self.get_scorer(model_type)
+        if scorer is not None:
+            model, model_name = scorer
+            return self._model_result(text, model.predict_proba([text])[0], model_name)
+
+        # Fall back to simple keyword matching
         text_lower = text.lower()
         
         positive_words = ['good', 'great', 'excellent', 'love', 'best', 'perfect', 'amazing', 'awesome']
@@ -60,26 +147,43 @@ class SentimentAnalyzer:
             'sentiment': sentiment,
             'confidence': confidence,
             'probabilities': probabilities,
-            'model': 'Keyword-based Analyzer' if model_type == 'ensemble' else 'DL Model (Placeholder)',
+            'model': ('Keyword-based Analyzer' if model_type in ('ensemble', 'keyword')
+                      else 'DL Model (Placeholder)'),
             'text_statistics': {
                 'word_count': len(text.split()),
                 'char_count': len(text)
             }
         }
 
-    def batch_analyze(self, texts, model_type='ensemble'):
+    def batch_analyze(self, texts, model_type='ensemble', include_probabilities=False):
         """Analyze multiple texts"""
+        # Trained models score the whole batch in one vectorized call
+        precomputed = None
+        scorer = self.get_scorer(model_type) if texts else None
+        if scorer is not None:
+            model, model_name = scorer
+            try:
+                precomputed = model.predict_proba([str(t) for t in texts])
+            except Exception as e:
+                logger.error(f"Batch inference with {model_name} failed: {e}")
+
         results = []
         for i, text in enumerate(texts):
             try:
-                result = self.analyze(text, model_type)
-                results.append({
+                if precomputed is not None:
+                    result = self._model_result(text, precomputed[i], model_name)
+                else:
+                    result = self.analyze(text, model_type)
+                item = {
                     'id': i,
                     'text': text[:100] + '...' if len(text) > 100 else text,
                     'sentiment': result['sentiment'],
                     'confidence': result['confidence'],
                     'model': result['model']
-                })
+                }
+                if include_probabilities:
+                    item['probabilities'] = result['probabilities']
+                results.append(item)
             except Exception as e:
                 results.append({
                     'id': i,
@@ -1,36 +1,41 @@
 # sentiment_app/signals.py
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.db.models import Count, Avg
+from django.core.files.storage import default_storage
+from django.db.models import Avg, Count, Q
 import logging
 from .models import SentimentAnalysis, BatchAnalysis
+from .outbox import enqueue, handler
+from .reports import batch_report_files
 
 logger = logging.getLogger(__name__)
 
+# Slow side effects (aggregates, mail) are recorded in the outbox and carried
+# out by the outbox worker, so saves never wait on them.
+
 @receiver(post_save, sender=SentimentAnalysis)
 def log_sentiment_analysis_created(sender, instance, created, **kwargs):
     """Log when a new sentiment analysis is created"""
     if created:
-        logger.info(f"New sentiment analysis created: ID={instance.id}, "
-                   f"Sentiment={instance.sentiment}, "
-                   f"Confidence={instance.confidence}")
+        logger.info("New sentiment analysis created: ID=%s, Sentiment=%s, Confidence=%s",
+                    instance.id, instance.sentiment, instance.confidence)
         
         # Update batch analysis statistics if this is part of a batch
-        if hasattr(instance, 'batch_analysis'):
-            update_batch_statistics(instance.batch_analysis)
+        batch_id = getattr(instance, 'batch_analysis_id', None)
+        if batch_id:
+            enqueue('batch_statistics', {'batch_id': batch_id}, dedup_key=batch_id)
 
 @receiver(post_delete, sender=SentimentAnalysis)
 def log_sentiment_analysis_deleted(sender, instance, **kwargs):
     """Log when a sentiment analysis is deleted"""
-    logger.info(f"Sentiment analysis deleted: ID={instance.id}")
+    logger.info("Sentiment analysis deleted: ID=%s", instance.id)
 
 @receiver(post_save, sender=BatchAnalysis)
 def log_batch_analysis_created(sender, instance, created, **kwargs):
     """Log when a new batch analysis is created"""
     if created:
-        logger.info(f"New batch analysis created: ID={instance.id}, "
-                   f"File={instance.file_name}, "
-                   f"Total={instance.total_reviews}")
+        logger.info("New batch analysis created: ID=%s, File=%s, Total=%s",
+                    instance.id, instance.file_name, instance.total_reviews)
 
 @receiver(post_delete, sender=BatchAnalysis)
 def cleanup_batch_files(sender, instance, **kwargs):
@@ -39,79 +44,113 @@ def cleanup_batch_files(sender, instance, **kwargs):
         if instance.results_file:
             # Delete the results file
             instance.results_file.delete(save=False)
-            logger.info(f"Deleted results file for batch: {instance.id}")
+            logger.info("Deleted results file for batch: %s", instance.id)
+        for _, name in batch_report_files(instance):
+            default_storage.delete(name)
     except Exception as e:
-        logger.error(f"Error cleaning up batch files: {e}")
+        logger.error("Error cleaning up batch files: %s", e)
+
+@handler('batch_statistics')
+def update_batch_statistics_event(payload):
+    batch = BatchAnalysis.objects.filter(pk=payload['batch_id']).first()
+    if batch is not None:
+        update_batch_statistics(batch)
 
 def update_batch_statistics(batch):
     """Update statistics for a batch analysis"""
     try:
-        # Count sentiments in this batch
-        sentiments = SentimentAnalysis.objects.filter(batch_analysis=batch)
+        # Count sentiments and average confidence of this batch in one query
+        stats = SentimentAnalysis.objects.filter(batch_analysis=batch).order_by().aggregate(
+            positive=Count('id', filter=Q(sentiment='positive')),
+            negative=Count('id', filter=Q(sentiment='negative')),
+            neutral=Count('id', filter=Q(sentiment='neutral')),
+            average_confidence=Avg('confidence'),
+        )
         
-        batch.positive_count = sentiments.filter(sentiment='positive').count()
-        batch.negative_count = sentiments.filter(sentiment='negative').count()
-        batch.neutral_count = sentiments.filter(sentiment='neutral').count()
-        
-        # Calculate average confidence
-        avg_conf = sentiments.aggregate(Avg('confidence'))['confidence__avg']
-        batch.average_confidence = avg_conf or 0
+        batch.positive_count = stats['positive']
+        batch.negative_count = stats['negative']
+        batch.neutral_count = stats['neutral']
+        batch.average_confidence = stats['average_confidence'] or 0
         
         batch.save(update_fields=[
             'positive_count', 'negative_count', 'neutral_count', 
             'average_confidence', 'updated_at'
         ])
         
-        logger.info(f"Updated statistics for batch {batch.id}")
+        logger.info("Updated statistics for batch %s", batch.id)
     except Exception as e:
-        logger.error(f"Error updating batch statistics: {e}")
+        logger.error("Error updating batch statistics: %s", e)
 
 # Email notifications (optional)
 @receiver(post_save, sender=BatchAnalysis)
-def send_batch_completion_email(sender, instance, created, **kwargs):
-    """Send email notification when batch analysis is complete"""
-    if not created and instance.results_file:  # Only when results are ready
-        from django.core.mail import send_mail
-        from django.conf import settings
-        
-        try:
-            subject = f"Batch Analysis Complete: {instance.file_name}"
+def send_batch_completion_email(sender, instance, **kwargs):
+    """Queue one completion email per batch once its results are ready"""
+    if instance.status == 'completed' and instance.results_file and instance.user_id:
+        enqueue('batch_completion_email', {'batch_id': instance.id},
+                dedup_key=instance.id, once=True)
+
+@handler('batch_completion_email', batched=True)
+def send_batch_completion_emails(payloads):
+    """Send the queued completion emails over a single mail connection"""
+    from django.core.mail import EmailMessage, get_connection
+    from django.conf import settings
+    
+    batches = BatchAnalysis.objects.select_related('user').in_bulk(
+        [p['batch_id'] for p in payloads])
+    failed = []
+    with get_connection() as connection:
+        for position, payload in enumerate(payloads):
+            batch = batches.get(payload['batch_id'])
+            if batch is None or not (batch.user and batch.user.email):
+                continue
+            
+            subject = f"Batch Analysis Complete: {batch.file_name}"
             message = f"""
             Your batch analysis is complete!
             
-            File: {instance.file_name}
-            Total Reviews: {instance.total_reviews}
-            Positive: {instance.positive_count}
-            Negative: {instance.negative_count}
-            Neutral: {instance.neutral_count}
-            Average Confidence: {instance.average_confidence:.2%}
+            File: {batch.file_name}
+            Total Reviews: {batch.total_reviews}
+            Positive: {batch.positive_count}
+            Negative: {batch.negative_count}
+            Neutral: {batch.neutral_count}
+            Average Confidence: {batch.average_confidence:.2%}
             
-            You can view the results at: {settings.SITE_URL}/batch/{instance.id}/
+            You can view the results at: {settings.SITE_URL}/batch/{batch.id}/
             """
             
-            if instance.user and instance.user.email:
-                send_mail(
+            try:
+                EmailMessage(
                     subject=subject,
-                    message=message,
+                    body=message,
                     from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[instance.user.email],
-                    fail_silently=True,
-                )
-                logger.info(f"Sent completion email for batch {instance.id}")
-        except Exception as e:
-            logger.error(f"Error sending batch completion email: {e}")
+                    to=[batch.user.email],
+                    connection=connection,
+                ).send()
+                logger.info("Sent completion email for batch %s", batch.id)
+            except Exception as e:
+                logger.error("Error sending completion email for batch %s: %s", batch.id, e)
+                failed.append(position)
+    return failed
 
 # Signal to update user analytics
 @receiver(post_save, sender=SentimentAnalysis)
 def update_user_analytics(sender, instance, created, **kwargs):
-    """Update user analytics when analysis is created"""
-    if created and instance.user:
-        from django.contrib.auth.models import User
-        from django.core.cache import cache
-        
-        # Clear user analytics cache
-        cache_key = f"user_analytics_{instance.user.id}"
-        cache.delete(cache_key)
-        
-        # You could also update a UserProfile model here
-        logger.debug(f"Updated analytics cache for user {instance.user.id}")
\ No newline at end of file
+    """Invalidate the user's cached analytics when an analysis is created"""
+    if created and instance.user_id:
+        from .analytics import invalidate_user_analytics
+        invalidate_user_analytics(instance.user_id)
+
+@receiver(post_delete, sender=SentimentAnalysis)
+def invalidate_user_analytics_on_delete(sender, instance, **kwargs):
+    """Deleted (or archived) analyses change the user's analytics too"""
+    if instance.user_id:
+        from .analytics import invalidate_user_analytics
+        invalidate_user_analytics(instance.user_id)
+
+# Conditional GETs on the dashboard and stats endpoints key off this counter
+@receiver(post_save, sender=SentimentAnalysis)
+@receiver(post_delete, sender=SentimentAnalysis)
+def bump_data_version_on_change(sender, instance, **kwargs):
+    """Any committed analysis write changes the global statistics"""
+    from .data_version import bump_data_version
+    bump_data_version()
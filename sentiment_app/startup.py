@@ -0,0 +1,133 @@
+# sentiment_app/startup.py
+"""
+Worker startup profile.
+
+Heavy libraries (pandas, NumPy, scikit-learn, pyarrow) are imported lazily by
+the code paths that need them, so a bare ``django.setup()`` plus the URLconf
+stays cheap. ``warm_up()`` is the explicit counterpart: config/wsgi.py and
+config/asgi.py call it once after the application is built, which with a
+preloading server (``gunicorn --preload``) happens in the master before
+fork, so every worker shares the imported modules and loaded models
+copy-on-write.
+
+``import_time_report()`` measures the cold import path in a fresh
+interpreter with ``python -X importtime``; see ``manage.py import_profile``.
+"""
+import gc
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Imported by warm_up(); missing optional packages are skipped
+PRELOAD_MODULES = [
+    'numpy',
+    'pandas',
+    'joblib',
+    'sklearn.feature_extraction.text',
+    'sklearn.linear_model',
+    'pyarrow',
+    'pyarrow.parquet',
+    'sentiment_app.deep_model',
+    'sentiment_app.online_model',
+]
+
+_warmed_up = False
+
+
+def warm_up(force=False):
+    """
+    Import heavy modules and load the models once; returns timings in seconds.
+
+    Does nothing unless ``PRELOAD_MODELS`` is enabled (or ``force`` is given),
+    and only runs once per process.
+    """
+    global _warmed_up
+    if _warmed_up or not (force or getattr(settings, 'PRELOAD_MODELS', False)):
+        return {}
+
+    timings = {}
+    started = time.perf_counter()
+    for name in getattr(settings, 'PRELOAD_MODULES', PRELOAD_MODULES):
+        module_started = time.perf_counter()
+        try:
+            # __import__ rather than importlib so -X importtime sees the module
+            __import__(name)
+        except ImportError as e:
+            logger.info(f"Preload skipped {name}: {e}")
+            continue
+        timings[name] = time.perf_counter() - module_started
+
+    from .services import analyzer
+    models_started = time.perf_counter()
+    try:
+        analyzer.warm_up()
+    except Exception as e:
+        logger.error(f"Model warm-up failed: {e}")
+    timings['models'] = time.perf_counter() - models_started
+
+    # Move everything loaded so far out of the collector's reach, so forked
+    # workers don't dirty the shared pages just by running a GC pass
+    gc.collect()
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
+    _warmed_up = True
+    timings['total'] = time.perf_counter() - started
+    logger.info(f"Warm-up finished in {timings['total']:.2f}s")
+    return timings
+
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+_PROFILE_SCRIPT = '''
+import os, sys, time
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', {settings_module!r})
+started = time.perf_counter()
+import django
+django.setup()
+from django.conf import settings
+__import__(settings.ROOT_URLCONF)
+if {preload!r}:
+    from sentiment_app.startup import warm_up
+    warm_up(force=True)
+sys.stderr.write('startup seconds: %f\\n' % (time.perf_counter() - started))
+'''
+
+
+def import_time_report(preload=False):
+    """
+    Profile a cold ``django.setup()`` + URLconf import (and optionally the
+    warm-up) in a fresh interpreter.
+
+    Returns ``(total_seconds, modules)`` where ``modules`` is a list of
+    ``(name, self_us, cumulative_us, depth)`` tuples in import order.
+    """
+    script = _PROFILE_SCRIPT.format(
+        settings_module=os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),
+        preload=preload,
+    )
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        cwd=str(settings.BASE_DIR), capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f'Profiled startup failed:\n{completed.stderr[-2000:]}')
+
+    total = None
+    modules = []
+    for line in completed.stderr.splitlines():
+        if line.startswith('startup seconds:'):
+            total = float(line.split(':', 1)[1])
+            continue
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return total, modules
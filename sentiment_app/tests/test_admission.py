@@ -0,0 +1,74 @@
+import json
+import uuid
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from sentiment_app import admission
+from sentiment_app.admission import (
+    AdmissionController, AdmissionRejected, json_texts_rows, max_reviews_rows, request_json,
+)
+
+
+class RowEstimateTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _json(self, data):
+        return self.factory.post('/', json.dumps(data), content_type='application/json')
+
+    def test_missing_max_reviews_counts_as_the_cap(self):
+        estimate = max_reviews_rows(lambda: 250)
+        self.assertEqual(estimate(self._json({})), 250)
+        self.assertEqual(estimate(self._json({'max_reviews': 'lots'})), 250)
+        self.assertEqual(estimate(self._json({'max_reviews': 40})), 40)
+        self.assertEqual(estimate(self.factory.post('/', {'max_reviews': '7'})), 7)
+
+    def test_body_is_parsed_once(self):
+        request = self._json({'texts': ['a', 'b', 'c']})
+        with mock.patch('sentiment_app.admission.json.loads', wraps=json.loads) as loads:
+            self.assertEqual(json_texts_rows(request), 3)
+            self.assertEqual(request_json(request)['texts'], ['a', 'b', 'c'])
+        self.assertEqual(loads.call_count, 1)
+
+
+class AdmissionControllerTests(SimpleTestCase):
+    def setUp(self):
+        self.controller = AdmissionController(
+            lanes={'batch': {'max_concurrent': 1, 'max_rows': 100, 'per_user_rows': 50,
+                             'max_queue': 0}},
+            endpoints={'bulk': {'lane': 'batch'}},
+        )
+
+    def test_request_over_the_row_budget_is_too_large(self):
+        with self.assertRaises(AdmissionRejected) as caught:
+            with self.controller.admit('bulk', 'user:1', rows=51):
+                pass
+        self.assertEqual(caught.exception.status, 413)
+
+    def test_full_lane_sheds_with_retry_after(self):
+        with self.controller.admit('bulk', 'user:1', rows=10):
+            with self.assertRaises(AdmissionRejected) as caught:
+                with self.controller.admit('bulk', 'user:2', rows=10):
+                    pass
+        self.assertEqual(caught.exception.status, 429)
+        self.assertGreaterEqual(caught.exception.retry_after, 1)
+        self.assertEqual(self.controller.snapshot()['batch']['active'], 0)
+
+
+@override_settings(
+    CHUNKED_UPLOAD_MAX_REVIEWS=500,
+    ADMISSION_CONTROL={'ENABLED': True, 'LANES': {'batch': {'per_user_rows': 100}}},
+)
+class UploadCompleteAdmissionTests(TestCase):
+    def setUp(self):
+        admission._controller = None
+        self.addCleanup(setattr, admission, '_controller', None)
+        self.client.force_login(User.objects.create_user('bulk-user'))
+
+    def test_request_without_max_reviews_is_charged_the_upload_cap(self):
+        url = reverse('api_upload_complete', args=[uuid.uuid4()])
+        response = self.client.post(url, '{}', content_type='application/json')
+        self.assertEqual(response.status_code, 413)
@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from sentiment_app.analytics import compute_user_analytics, get_user_analytics
+from sentiment_app.data_version import bump_scopes, get_data_version, user_scope
+from sentiment_app.models import SentimentAnalysis
+
+
+class UserAnalyticsTests(TransactionTestCase):
+    # Real commits, so the on_commit invalidations run as in production
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('analyst')
+
+    def _analysis(self, sentiment='positive'):
+        return SentimentAnalysis.objects.create(user=self.user, text='text',
+                                                sentiment=sentiment, confidence=0.5)
+
+    def test_compute_takes_three_queries(self):
+        self._analysis()
+        with self.assertNumQueries(3):
+            analytics = compute_user_analytics(self.user)
+        self.assertEqual(analytics['total'], 1)
+
+    def test_cached_until_the_users_data_changes(self):
+        self._analysis()
+        self.assertEqual(get_user_analytics(self.user)['total'], 1)
+        with self.assertNumQueries(1):  # just the version
+            self.assertEqual(get_user_analytics(self.user)['total'], 1)
+
+        self._analysis('negative')
+        analytics = get_user_analytics(self.user)
+        self.assertEqual(analytics['distribution']['negative'], 1)
+
+    def test_version_bumped_elsewhere_invalidates_the_local_cache(self):
+        get_user_analytics(self.user)
+        # Another process wrote and bumped the version; our cache never heard of it
+        with mock.patch('sentiment_app.analytics.invalidate_user_analytics'):
+            self._analysis()
+        bump_scopes([user_scope(self.user.id)])
+
+        self.assertEqual(get_user_analytics(self.user)['total'], 1)
+
+    def test_one_bump_per_transaction(self):
+        version = get_data_version(user_scope(self.user.id))
+        with transaction.atomic():
+            for _ in range(5):
+                self._analysis()
+        self.assertEqual(get_data_version(user_scope(self.user.id)), version + 1)
+
+    def test_rolled_back_transaction_does_not_block_the_next_bump(self):
+        version = get_data_version(user_scope(self.user.id))
+        global_version = get_data_version()
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self._analysis()
+                raise RuntimeError('rolled back')
+        self.assertEqual(get_data_version(user_scope(self.user.id)), version)
+
+        with transaction.atomic():
+            self._analysis()
+        self.assertEqual(get_data_version(user_scope(self.user.id)), version + 1)
+        self.assertEqual(get_data_version(), global_version + 1)
@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from sentiment_app.archive import HistoryList, archive_analyses, read_archived
+from sentiment_app.models import ArchivedRollup, ArchivePart, SentimentAnalysis
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    pyarrow = None
+
+
+@unittest.skipUnless(pyarrow, 'pyarrow is not installed')
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir, ignore_errors=True)
+        overrides = override_settings(ARCHIVE_DIR=self.archive_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = User.objects.create_user('archivist')
+
+    def _analysis(self, text, created, sentiment='positive'):
+        analysis = SentimentAnalysis.objects.create(
+            user=self.user, text=text, sentiment=sentiment, confidence=0.8,
+        )
+        SentimentAnalysis.objects.filter(pk=analysis.pk).update(
+            created_at=datetime(*created, tzinfo=dt_timezone.utc))
+        return analysis
+
+    def _parquet_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(d, f), self.archive_dir)
+            for d, _, files in os.walk(self.archive_dir) for f in files
+        )
+
+    def test_rerun_after_crash_does_not_duplicate_rows(self):
+        self._analysis('first', (2020, 1, 5))
+        self._analysis('second', (2020, 1, 6))
+
+        # Die after the Parquet file is written but before the rows are deleted
+        with mock.patch.object(ArchivedRollup.objects, 'get_or_create',
+                               side_effect=RuntimeError('crash')):
+            with self.assertRaises(RuntimeError):
+                archive_analyses(older_than_days=1)
+        self.assertEqual(len(self._parquet_files()), 1)
+        self.assertEqual(ArchivePart.objects.count(), 0)
+        self.assertEqual(SentimentAnalysis.objects.count(), 2)
+
+        # A row added meanwhile changes the batch's id range and file name
+        self._analysis('third', (2020, 1, 7))
+        self.assertEqual(archive_analyses(older_than_days=1), 3)
+
+        self.assertEqual(SentimentAnalysis.objects.count(), 0)
+        self.assertEqual(self._parquet_files(), [ArchivePart.objects.get().path])
+        archived = read_archived(self.user)
+        self.assertEqual(len(archived), 3)
+        self.assertEqual([a.text for a in archived], ['third', 'second', 'first'])
+
+    def test_slices_only_read_the_months_they_reach(self):
+        for month in (1, 2, 3):
+            for day in (1, 2):
+                self._analysis(f'2020-{month}-{day}', (2020, month, day),
+                               sentiment='positive' if day == 1 else 'negative')
+        archive_analyses(older_than_days=1)
+
+        archived = read_archived(self.user)
+        with mock.patch.object(archived, '_read_month', wraps=archived._read_month) as read:
+            page = archived[2:4]
+        self.assertEqual([a.text for a in page], ['2020-2-2', '2020-2-1'])
+        self.assertEqual([c.args[0].month for c in read.call_args_list], [2])
+
+        negative = read_archived(self.user, sentiment='negative')
+        self.assertEqual([a.text for a in negative], ['2020-3-2', '2020-2-2', '2020-1-2'])
+        searched = read_archived(self.user, search='2020-2')
+        self.assertEqual(len(searched), 2)
+
+    def test_history_list_pages_from_hot_into_archived_rows(self):
+        self._analysis('old', (2020, 1, 1))
+        archive_analyses(older_than_days=1)
+        SentimentAnalysis.objects.create(user=self.user, text='new',
+                                         sentiment='neutral', confidence=0.5)
+
+        history = HistoryList(SentimentAnalysis.objects.filter(user=self.user), user=self.user)
+        self.assertEqual(history.count(), 2)
+        self.assertEqual([a.text for a in history[0:2]], ['new', 'old'])
+        self.assertTrue(history[1].is_archived)
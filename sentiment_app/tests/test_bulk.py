@@ -0,0 +1,178 @@
+import csv
+import errno
+import fcntl
+import gzip
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from sentiment_app import bulk
+from sentiment_app.batch_summary import summarize_results_file
+from sentiment_app.bulk import (
+    JobTaken, create_bulk_job, get_job_dir, process_bulk_job, resume_bulk_job, run_bulk_analysis,
+)
+from sentiment_app.dedup import group_duplicates
+from sentiment_app.models import BatchAnalysis
+from sentiment_app.reports import batch_report_files
+
+TEXTS = ['good', 'bad', 'fine', 'good', 'great', 'awful', 'okay']
+
+
+def fake_batch_analyze(texts, model_type):
+    return [{'sentiment': 'negative' if text in ('bad', 'awful') else 'positive',
+             'confidence': 0.9, 'model': 'fake'} for text in texts]
+
+
+class BulkDirsMixin:
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.staging_dir = tempfile.mkdtemp()
+        for path in (self.media_root, self.staging_dir):
+            self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=self.media_root,
+            BULK_JOB_DIR=os.path.join(self.staging_dir, 'bulk_jobs'),
+            BULK_CHECKPOINT_ROWS=2,
+            BULK_REPORT_FORMATS=['csv'],
+            OUTBOX_AUTOSTART=False,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        patcher = mock.patch.object(bulk.analyzer, 'batch_analyze', side_effect=fake_batch_analyze)
+        self.batch_analyze = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read_report(self, batch):
+        with open(batch.results_file.path, newline='') as f:
+            return list(csv.DictReader(f))
+
+    def assertSummaryMatchesReport(self, batch):
+        expected = summarize_results_file(batch.results_file.path, TEXTS)
+        for summary in (batch.summary, expected):
+            summary.pop('computed_at')
+        self.assertEqual(batch.summary, expected)
+
+
+class BulkResumeTests(BulkDirsMixin, TestCase):
+    def test_chunk_scores_each_group_once_and_fans_out(self):
+        texts = ['good', 'bad', 'Good!']
+        groups = group_duplicates(texts)
+
+        records = bulk._score_chunk(texts, range(3), groups, {}, 'ensemble')
+
+        self.batch_analyze.assert_called_once_with(['good', 'bad'], 'ensemble')
+        self.assertEqual([r['sentiment'] for r in records], ['positive', 'negative', 'positive'])
+        self.assertEqual([r['group_id'] for r in records], [0, 1, 0])
+        self.assertEqual(records[2]['text'], 'Good!')
+
+    def test_resume_continues_from_the_checkpoint(self):
+        self.batch_analyze.side_effect = [fake_batch_analyze(['good', 'bad'], None),
+                                          RuntimeError('scorer died')]
+        with self.assertRaises(RuntimeError):
+            run_bulk_analysis(None, 'reviews.csv', TEXTS)
+        batch = BatchAnalysis.objects.get()
+        self.assertEqual((batch.status, batch.processed_reviews), ('failed', 2))
+
+        self.batch_analyze.side_effect = fake_batch_analyze
+        batch = resume_bulk_job(batch)
+
+        self.assertEqual(batch.status, 'completed')
+        rows = self.read_report(batch)
+        self.assertEqual([int(r['id']) for r in rows], list(range(len(TEXTS))))
+        self.assertEqual((batch.positive_count, batch.negative_count), (5, 2))
+        self.assertSummaryMatchesReport(batch)
+        self.assertFalse(os.path.exists(get_job_dir(batch.id)))
+
+    def test_job_that_died_after_publishing_is_completed_on_resume(self):
+        with mock.patch('sentiment_app.bulk._complete_job', side_effect=RuntimeError('killed')):
+            with self.assertRaises(RuntimeError):
+                run_bulk_analysis(None, 'reviews.csv', TEXTS)
+        batch = BatchAnalysis.objects.get()
+        self.assertEqual(batch.processed_reviews, len(TEXTS))
+
+        batch = resume_bulk_job(batch)
+
+        self.assertEqual(batch.status, 'completed')
+        self.assertEqual(len(self.read_report(batch)), len(TEXTS))
+        self.assertEqual(batch.summary['rows'], len(TEXTS))
+
+    def test_worker_stops_when_its_checkpoint_was_replaced(self):
+        batch, _ = create_bulk_job(None, 'reviews.csv', TEXTS)
+        BatchAnalysis.objects.filter(pk=batch.pk).update(
+            checkpoint_at=timezone.now() + timedelta(seconds=1))
+
+        with self.assertRaises(JobTaken):
+            process_bulk_job(batch)
+        self.assertEqual(BatchAnalysis.objects.get(pk=batch.pk).processed_reviews, 0)
+
+    def test_locked_job_is_not_taken_over(self):
+        batch, _ = create_bulk_job(None, 'reviews.csv', TEXTS)
+        with open(os.path.join(get_job_dir(batch.id), bulk.LOCK_FILE), 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            self.assertIsNone(resume_bulk_job(batch))
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.processed_reviews), ('processing', 0))
+
+
+class BulkReportTests(BulkDirsMixin, TestCase):
+    def test_job_files_are_staged_outside_media(self):
+        batch, _ = create_bulk_job(None, 'reviews.csv', TEXTS)
+        self.assertTrue(get_job_dir(batch.id).startswith(self.staging_dir))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'bulk_jobs')))
+
+    def test_reports_are_copied_across_filesystems(self):
+        real_replace = os.replace
+
+        def replace(src, dst):
+            if src.startswith(self.staging_dir) and dst.startswith(self.media_root):
+                raise OSError(errno.EXDEV, 'Invalid cross-device link')
+            return real_replace(src, dst)
+
+        with mock.patch('sentiment_app.reports.os.replace', side_effect=replace):
+            batch, _ = run_bulk_analysis(None, 'reviews.csv', TEXTS)
+        self.assertEqual(len(self.read_report(batch)), len(TEXTS))
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'reports')),
+                         [batch.report_files['csv']])
+
+    def test_summary_is_built_while_scoring(self):
+        with mock.patch('sentiment_app.bulk.summarize_results_file') as summarize:
+            batch, _ = run_bulk_analysis(None, 'reviews.csv', TEXTS)
+        summarize.assert_not_called()
+        self.assertSummaryMatchesReport(batch)
+
+    def test_compressed_csv_is_recorded_under_its_own_name(self):
+        with override_settings(BULK_REPORT_COMPRESS=True):
+            batch, _ = run_bulk_analysis(None, 'reviews.csv', TEXTS)
+
+        self.assertEqual(batch.report_files, {'csv': f'batch_{batch.id}_results.csv.gz'})
+        self.assertEqual(batch.results_file.name, f'reports/batch_{batch.id}_results.csv.gz')
+        with gzip.open(batch.results_file.path, 'rt', newline='') as f:
+            self.assertEqual(len(list(csv.DictReader(f))), len(TEXTS))
+
+    def test_extra_formats_are_linked_and_deleted_by_recorded_name(self):
+        import openpyxl
+        import pyarrow.parquet as pq
+
+        with override_settings(BULK_REPORT_FORMATS=['csv', 'parquet', 'xlsx']):
+            batch, _ = run_bulk_analysis(None, 'reviews.csv', TEXTS)
+
+        files = dict(batch_report_files(batch))
+        self.assertEqual(set(files), {'parquet', 'xlsx'})
+        parquet_path = os.path.join(self.media_root, files['parquet'])
+        self.assertEqual(pq.read_table(parquet_path).num_rows, len(TEXTS))
+        workbook = openpyxl.load_workbook(os.path.join(self.media_root, files['xlsx']))
+        self.assertEqual(workbook['Results'].max_row, len(TEXTS) + 1)
+
+        # Links and cleanup follow the recorded names, not the current settings
+        batch.report_files['xlsx'] = 'renamed.xlsx'
+        os.rename(os.path.join(self.media_root, files['xlsx']),
+                  os.path.join(self.media_root, 'reports', 'renamed.xlsx'))
+        self.assertEqual(dict(batch_report_files(batch))['xlsx'], 'reports/renamed.xlsx')
+        batch.delete()
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'reports')), [])
@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+from django.contrib import messages
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date
+
+from sentiment_app.data_version import (
+    bump_scopes, get_data_modified, get_data_version, user_scope, versioned,
+)
+from sentiment_app.models import SentimentAnalysis
+
+
+class DataVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_version_lives_in_the_database(self):
+        version = get_data_version()
+        cache.clear()
+        self.assertEqual(get_data_version(), version)
+
+        bump_scopes(['global'])
+        self.assertEqual(get_data_version(), version + 1)
+
+    def test_write_bumps_the_version_on_commit(self):
+        version = get_data_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            SentimentAnalysis.objects.create(text='a', sentiment='positive', confidence=0.9)
+            SentimentAnalysis.objects.create(text='b', sentiment='negative', confidence=0.9)
+        self.assertEqual(get_data_version(), version + 1)
+
+    def test_scopes_are_independent(self):
+        global_version = get_data_version()
+        bump_scopes([user_scope(1)])
+        self.assertEqual(get_data_version(), global_version)
+
+    def test_versioned_rebuilds_after_a_bump(self):
+        builds = []
+        build = lambda: builds.append(1) or len(builds)  # noqa: E731
+
+        self.assertEqual(versioned('payload', build), 1)
+        self.assertEqual(versioned('payload', build), 1)
+        bump_scopes(['global'])
+        self.assertEqual(versioned('payload', build), 2)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_stats_answer_304_until_the_data_changes(self):
+        url = reverse('api_stats')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SentimentAnalysis.objects.create(text='new', sentiment='neutral', confidence=0.5)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_analyses'], 1)
+
+    def test_index_last_modified_follows_the_users_sign_in(self):
+        user = User.objects.create_user('poller', password='secret')
+        signed_in = timezone.now().replace(microsecond=0) + timedelta(hours=1)
+        User.objects.filter(pk=user.pk).update(last_login=signed_in)
+        self.client.force_login(user)
+        User.objects.filter(pk=user.pk).update(last_login=signed_in)
+
+        response = self.client.get(reverse('index'))
+        self.assertEqual(parse_http_date(response['Last-Modified']), int(signed_in.timestamp()))
+
+        earlier = http_date(get_data_modified().timestamp())
+        self.assertEqual(
+            self.client.get(reverse('index'), HTTP_IF_MODIFIED_SINCE=earlier).status_code, 200)
+
+    def test_dashboard_renders_pending_messages_then_sends_an_etag(self):
+        self.client.force_login(User.objects.create_user('uploader'))
+        storage = CookieStorage(RequestFactory().get('/'))
+        storage.add(messages.SUCCESS, 'Successfully analyzed 3 reviews')
+        response = HttpResponse()
+        storage.update(response)
+        self.client.cookies[storage.cookie_name] = response.cookies[storage.cookie_name].value
+
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'Successfully analyzed 3 reviews')
+        self.assertFalse(response.has_header('ETag'))
+
+        response = self.client.get(reverse('dashboard'))
+        self.assertNotContains(response, 'Successfully analyzed 3 reviews')
+        self.assertTrue(response.has_header('ETag'))
@@ -0,0 +1,45 @@
+import csv
+from datetime import date
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+
+from sentiment_app.db_tuning import _copy_rows, bulk_insert
+from sentiment_app.models import ArchivePart, OutboxEvent
+
+
+class SqlitePragmaTests(TestCase):
+    def test_configured_pragmas_are_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            synchronous = cursor.fetchone()[0]
+            cursor.execute('PRAGMA cache_size')
+            cache_size = cursor.fetchone()[0]
+
+        self.assertEqual(synchronous, 1)  # NORMAL
+        self.assertEqual(cache_size, settings.SQLITE_PRAGMAS['cache_size'])
+
+    def test_lock_wait_comes_from_the_database_timeout(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            busy_timeout = cursor.fetchone()[0]
+        self.assertEqual(busy_timeout, settings.DATABASES['default']['OPTIONS']['timeout'] * 1000)
+
+
+class BulkInsertTests(TestCase):
+    def test_rows_are_inserted(self):
+        parts = [ArchivePart(month=date(2020, 1, 1), path=f'part-{i}.parquet', rows=i)
+                 for i in range(3)]
+        self.assertEqual(bulk_insert(ArchivePart, parts), 3)
+        self.assertEqual(sorted(ArchivePart.objects.values_list('rows', flat=True)), [0, 1, 2])
+
+    def test_copy_rows_only_write_null_for_none(self):
+        fields = [OutboxEvent._meta.get_field(name) for name in ('kind', 'dedup_key', 'processed_at')]
+        events = [OutboxEvent(kind='\\N', dedup_key='', processed_at=None),
+                  OutboxEvent(kind='say "hi", ok', dedup_key='x', processed_at=None)]
+
+        lines = _copy_rows(fields, events, connection).read().splitlines()
+
+        self.assertEqual(lines[0], '"\\N","",')
+        self.assertEqual(next(csv.reader(lines[1:])), ['say "hi", ok', 'x', ''])
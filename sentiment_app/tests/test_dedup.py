@@ -0,0 +1,39 @@
+from django.test import SimpleTestCase
+
+from sentiment_app.dedup import (
+    DEDUP_EXACT, DEDUP_NEAR, DEDUP_NONE, group_duplicates, lsh_parameters, normalize_text,
+)
+
+LONG_REVIEW = ('The battery lasts all day and the screen is bright enough to read outside, '
+               'but the speaker is quiet and the case scratches easily.')
+
+
+class GroupDuplicatesTests(SimpleTestCase):
+    def test_exact_mode_ignores_case_punctuation_and_spacing(self):
+        texts = ['Great product!', 'great   product', 'Awful.', 'GREAT PRODUCT?!']
+        groups = group_duplicates(texts, mode=DEDUP_EXACT)
+
+        self.assertEqual(groups.group_ids, [0, 0, 1, 0])
+        self.assertEqual(groups.representatives, [0, 2])
+        self.assertEqual(groups.unique, 2)
+
+    def test_none_mode_keeps_every_row(self):
+        groups = group_duplicates(['a', 'a', 'a'], mode=DEDUP_NONE)
+        self.assertEqual(groups.group_ids, [0, 1, 2])
+
+    def test_near_mode_merges_small_edits_only(self):
+        texts = [LONG_REVIEW, LONG_REVIEW.replace('quiet', 'quite quiet'),
+                 'Completely different text about shipping delays and customer support.']
+        groups = group_duplicates(texts, mode=DEDUP_NEAR, threshold=0.7)
+
+        self.assertEqual(groups.group_ids[0], groups.group_ids[1])
+        self.assertNotEqual(groups.group_ids[0], groups.group_ids[2])
+
+    def test_exact_mode_does_not_merge_near_duplicates(self):
+        texts = [LONG_REVIEW, LONG_REVIEW.replace('quiet', 'quite quiet')]
+        self.assertEqual(group_duplicates(texts, mode=DEDUP_EXACT).unique, 2)
+
+    def test_normalize_and_lsh_parameters(self):
+        self.assertEqual(normalize_text('  Hello,   WORLD! '), 'hello world')
+        bands, rows = lsh_parameters(128, 0.9)
+        self.assertEqual(bands * rows, 128)
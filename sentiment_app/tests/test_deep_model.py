@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+import types
+from unittest import mock, skipUnless
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from sentiment_app import deep_model
+from sentiment_app.deep_model import (
+    META_FEATURES, NumpyDeepModel, clean_text, export_keras_model, extract_meta_features,
+)
+
+try:
+    import keras
+except ImportError:
+    keras = None
+
+
+def _tokenizer(num_words):
+    # Stand-in with the attributes export_keras_model reads from a Keras Tokenizer
+    words = ['<OOV>'] + [f'word{i}' for i in range(1, 2 * num_words)]
+    return types.SimpleNamespace(
+        num_words=num_words,
+        word_index={word: i + 1 for i, word in enumerate(words)},
+        oov_token='<OOV>',
+        filters='!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n',
+        lower=True,
+        split=' ',
+    )
+
+
+@skipUnless(keras is not None, 'Keras is not installed')
+class KerasParityTests(SimpleTestCase):
+    """The NumPy forward pass must reproduce the Keras model's probabilities"""
+
+    max_len = 12
+    vocabulary = 30
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from keras import layers
+
+        keras.utils.set_random_seed(0)
+        text_in = keras.Input(shape=(cls.max_len,), name='text_input')
+        x = layers.Embedding(cls.vocabulary, 8)(text_in)
+        x = layers.Conv1D(6, 3, padding='same', activation='relu')(x)
+        x = layers.Bidirectional(layers.LSTM(5, return_sequences=True))(x)
+        x = layers.GlobalMaxPooling1D()(x)
+        meta_in = keras.Input(shape=(len(META_FEATURES),), name='meta_input')
+        meta = layers.Dense(4, activation='relu')(meta_in)
+        x = layers.Dropout(0.3)(layers.Concatenate()([x, meta]))
+        output = layers.Dense(3, activation='softmax')(x)
+        cls.model = keras.Model([text_in, meta_in], output)
+
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.bundle_path = os.path.join(cls.tmp_dir, 'bundle.npz')
+        export_keras_model(cls.model, _tokenizer(cls.vocabulary), cls.bundle_path,
+                           max_len=cls.max_len)
+        cls.numpy_model = NumpyDeepModel(cls.bundle_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_forward_pass_matches_keras(self):
+        rng = np.random.default_rng(0)
+        sequences = rng.integers(0, self.vocabulary, size=(8, self.max_len))
+        meta = rng.normal(size=(8, len(META_FEATURES))).astype(np.float32)
+
+        expected = self.model.predict([sequences, meta], verbose=0)
+        actual = self.numpy_model.forward({'text_input': sequences, 'meta_input': meta})
+
+        np.testing.assert_allclose(actual, expected, atol=1e-5)
+
+    def test_predict_proba_matches_keras_on_raw_texts(self):
+        texts = ['word1 word2 word3 great', 'WORD4, word5!! word40', '']
+        sequences = self.numpy_model.pad_sequences(
+            self.numpy_model.texts_to_sequences([clean_text(t) for t in texts]))
+        meta = self.numpy_model.scale_meta(
+            [extract_meta_features(t, META_FEATURES) for t in texts])
+
+        expected = self.model.predict([sequences, meta], verbose=0)
+        np.testing.assert_allclose(self.numpy_model.predict_proba(texts), expected, atol=1e-5)
+
+    def test_probabilities_sum_to_one(self):
+        probabilities = self.numpy_model.predict_proba(['word1 word2', 'word3'])
+        np.testing.assert_allclose(probabilities.sum(axis=1), 1.0, atol=1e-5)
+
+
+class CleanTextTests(SimpleTestCase):
+    def test_matches_notebook_steps(self):
+        text = 'I did NOT like these shoes!! http://example.com @bob #great, it was the worst 10/10'
+        with mock.patch.object(deep_model, '_lemmatizer', False):
+            self.assertEqual(clean_text(text), 'like shoes great worst')
+
+    def test_without_nltk_data_words_are_not_lemmatized(self):
+        # Documented difference from the notebook when NLTK data is missing
+        with mock.patch.object(deep_model, '_lemmatizer', False):
+            self.assertEqual(clean_text('The reviews were running'), 'reviews running')
+
+    def test_lemmatizer_is_applied_when_available(self):
+        def lemmatize(tokens):
+            return [token.rstrip('s') for token in tokens]
+        with mock.patch.object(deep_model, '_lemmatizer', lemmatize):
+            self.assertEqual(clean_text('The reviews were running'), 'review running')
+
+    def test_textblob_import_is_only_attempted_once(self):
+        with mock.patch.object(deep_model, '_textblob', None), \
+                mock.patch.dict('sys.modules', {'textblob': None}):
+            extract_meta_features('first')
+            self.assertIs(deep_model._textblob, False)
+            with mock.patch('builtins.__import__', side_effect=AssertionError('retried')):
+                extract_meta_features('second')
@@ -0,0 +1,69 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+from sentiment_app.evaluation import (
+    ScorerUnavailable, UnknownScorer, _wait_for_result, build_scorer, parse_cascade, pareto_front,
+    validate_scorer,
+)
+from sentiment_app.services import SentimentAnalyzer
+
+
+class ScorerNameTests(SimpleTestCase):
+    def test_registered_names_and_cascades_are_accepted(self):
+        for name in ('keyword', 'ensemble', 'online', 'deep_learning', 'online>deep_learning@0.7'):
+            validate_scorer(name)
+        self.assertEqual(parse_cascade('online>ensemble'), ('online', 'ensemble', 0.8))
+
+    def test_unknown_names_are_rejected(self):
+        for name in ('deep', 'ensembel', 'online>deep@0.7', 'online>ensemble@high',
+                     'online>ensemble@1.5'):
+            with self.assertRaises(UnknownScorer, msg=name):
+                validate_scorer(name)
+
+    def test_command_rejects_unknown_scorer_before_running(self):
+        with self.assertRaisesMessage(CommandError, "Unknown scorer 'deep'"):
+            call_command('evaluate_models', scorers=['deep'], csv='/nonexistent.csv')
+
+
+    def test_ensemble_is_unavailable_without_a_trained_model(self):
+        analyzer = SentimentAnalyzer()
+        with self.assertRaises(ScorerUnavailable):
+            build_scorer('ensemble', analyzer)
+        rows = build_scorer('keyword', analyzer).score(['great product', 'awful'])
+        self.assertEqual([row.index(max(row)) for row in rows], [2, 0])
+
+
+class IsolatedRunTests(SimpleTestCase):
+    def _run(self, target, args, timeout=30):
+        context = multiprocessing.get_context('spawn')
+        queue = context.Queue()
+        process = context.Process(target=target, args=args)
+        process.start()
+        return _wait_for_result('online', process, queue, timeout)
+
+    def test_crashed_child_is_reported_as_failed(self):
+        result = self._run(os._exit, (3,))
+        self.assertFalse(result['available'])
+        self.assertTrue(result['failed'])
+        self.assertIn('exited with code 3', result['error'])
+
+    def test_slow_child_times_out(self):
+        started = time.monotonic()
+        result = self._run(time.sleep, (60,), timeout=0.5)
+        self.assertIn('timed out', result['error'])
+        self.assertLess(time.monotonic() - started, 30)
+
+
+class ParetoFrontTests(SimpleTestCase):
+    def test_dominated_scorers_are_left_out(self):
+        results = [
+            {'scorer': 'a', 'available': True, 'f1_weighted': 0.9, 'rows_per_sec': 100},
+            {'scorer': 'b', 'available': True, 'f1_weighted': 0.8, 'rows_per_sec': 1000},
+            {'scorer': 'c', 'available': True, 'f1_weighted': 0.7, 'rows_per_sec': 500},
+            {'scorer': 'd', 'available': False, 'error': 'missing'},
+        ]
+        self.assertEqual(pareto_front(results), ['a', 'b'])
@@ -0,0 +1,40 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+
+from sentiment_app.models import ModelVersion, SentimentAnalysis
+
+
+class ModelVersionTests(TestCase):
+    def test_deleted_row_is_recreated(self):
+        ModelVersion.for_name('Online Model v1').delete()
+
+        analysis = SentimentAnalysis.from_result(
+            {'sentiment': 'positive', 'confidence': 0.9, 'model': 'Online Model v1'}, text='ok')
+        analysis.save()
+        self.assertEqual(analysis.model_version.name, 'Online Model v1')
+
+
+class CompactRowsMigrationTests(TransactionTestCase):
+    before = [('sentiment_app', '0001_initial')]
+    after = [('sentiment_app', '0002_compact_sentiment_analysis')]
+
+    def tearDown(self):
+        # Drop the unmigrated rows so the schema can be brought forward again
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SentimentAnalysis._meta.db_table}')
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_unknown_label_fails_the_migration(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        OldAnalysis = apps.get_model('sentiment_app', 'SentimentAnalysis')
+        OldAnalysis.objects.create(text='a', sentiment='positive', confidence=0.9)
+        bad = OldAnalysis.objects.create(text='b', sentiment='mixed', confidence=0.5)
+
+        executor = MigrationExecutor(connection)
+        with self.assertRaisesMessage(ValueError, f"{bad.pk} ('mixed')"):
+            executor.migrate(self.after)
+        self.assertEqual(OldAnalysis.objects.get(pk=bad.pk).sentiment, 'mixed')
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+
+from sentiment_app.online_model import (
+    OnlineSentimentModel, current_version_path, encode_label, load_current_model,
+    publish_model, published_versions,
+)
+
+TEXTS = ['great product, love it', 'terrible, broke in a day', 'it is okay I guess']
+LABELS = [2, 0, 1]
+
+
+class OnlineModelPublishTests(SimpleTestCase):
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp()
+        self.override = override_settings(ONLINE_MODEL_DIR=self.model_dir)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.model_dir, ignore_errors=True)
+
+    def _trained_model(self):
+        model = OnlineSentimentModel(n_features=2 ** 10)
+        model.partial_fit(TEXTS, LABELS)
+        return model
+
+    def test_versions_increase_and_current_points_at_latest(self):
+        model = self._trained_model()
+        publish_model(model)
+        publish_model(model)
+        self.assertEqual(model.version, 2)
+        self.assertEqual(os.path.basename(current_version_path()), 'online_v0002.joblib')
+        self.assertEqual(load_current_model().version, 2)
+
+    def test_fresh_model_is_numbered_after_existing_versions(self):
+        model = self._trained_model()
+        for _ in range(7):
+            publish_model(model, keep=5)
+
+        # A reset starts from version 0 but must not reuse or sort before v7
+        path = publish_model(self._trained_model(), keep=5)
+
+        self.assertEqual(os.path.basename(path), 'online_v0008.joblib')
+        self.assertEqual(current_version_path(), path)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(sorted(published_versions()), [4, 5, 6, 7, 8])
+
+    def test_prune_never_removes_the_current_version(self):
+        model = self._trained_model()
+        publish_model(model)
+        # Leftover versions numbered above the one being published
+        for number in (20, 21, 22):
+            shutil.copy(current_version_path(),
+                        os.path.join(self.model_dir, f'online_v{number:04d}.joblib'))
+        model.version = 0
+        path = publish_model(model, keep=1)
+
+        self.assertEqual(os.path.basename(path), 'online_v0023.joblib')
+        self.assertEqual(current_version_path(), path)
+        self.assertEqual(list(published_versions().values()), ['online_v0023.joblib'])
+
+
+class UpdateOnlineModelCommandTests(SimpleTestCase):
+    def test_requires_labeled_csv(self):
+        with self.assertRaises(CommandError):
+            call_command('update_online_model')
+
+    def test_encode_label(self):
+        self.assertEqual(encode_label('Positive'), 2)
+        self.assertEqual(encode_label(3), 1)
+        self.assertEqual(encode_label('1'), 0)
+        self.assertIsNone(encode_label('unknown'))
+        self.assertIsNone(encode_label(float('nan')))
@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from sentiment_app import outbox
+from sentiment_app.models import OutboxEvent
+
+
+@override_settings(OUTBOX_AUTOSTART=False)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.delivered = []
+        handlers = dict(outbox.HANDLERS)
+        self.addCleanup(lambda: (outbox.HANDLERS.clear(), outbox.HANDLERS.update(handlers)))
+        outbox.handler('test_event')(self.delivered.append)
+
+    def test_event_is_delivered_once_by_concurrent_drainers(self):
+        outbox.enqueue('test_event', {'n': 1})
+        # Drainer A read the event, but drainer B claims and delivers it first
+        seen_by_a = list(OutboxEvent.objects.all())
+        self.assertEqual(outbox.drain(), 1)
+
+        lease = timezone.now() + timedelta(seconds=300)
+        self.assertFalse(outbox._claim_event(seen_by_a[0], lease))
+        self.assertEqual(outbox.drain(), 0)
+        self.assertEqual(self.delivered, [{'n': 1}])
+
+    def test_events_leased_by_another_drainer_are_skipped(self):
+        first = outbox.enqueue('test_event', {'n': 1})
+        outbox.enqueue('test_event', {'n': 2})
+        # Another drainer holds the lease on the first event
+        OutboxEvent.objects.filter(pk=first.pk).update(
+            available_at=timezone.now() + timedelta(seconds=300))
+
+        self.assertFalse(outbox._claim_event(first, timezone.now()))
+        self.assertEqual(outbox.drain(), 1)
+        self.assertEqual(self.delivered, [{'n': 2}])
+
+    def test_once_events_are_recorded_once(self):
+        self.assertIsNotNone(outbox.enqueue('test_event', {'n': 1}, dedup_key=7, once=True))
+        outbox.drain()
+        self.assertIsNone(outbox.enqueue('test_event', {'n': 2}, dedup_key=7, once=True))
+
+        self.assertEqual(OutboxEvent.objects.filter(dedup_key='7').count(), 1)
+        self.assertEqual(self.delivered, [{'n': 1}])
+
+    def test_pending_events_with_the_same_key_are_merged(self):
+        outbox.enqueue('test_event', {'n': 1}, dedup_key='k')
+        outbox.enqueue('test_event', {'n': 2}, dedup_key='k')
+        outbox.drain()
+        self.assertEqual(self.delivered, [{'n': 2}])
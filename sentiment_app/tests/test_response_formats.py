@@ -0,0 +1,55 @@
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from sentiment_app.response_formats import (
+    FORMAT_COLUMNAR, FORMAT_JSON, render_batch_results, to_columns,
+)
+
+RESULTS = [
+    {'id': 0, 'text': 'good', 'sentiment': 'positive', 'confidence': 0.9, 'model': 'm',
+     'probabilities': {'negative': 0.05, 'neutral': 0.05, 'positive': 0.9}},
+    {'id': 1, 'text': 'bad', 'sentiment': 'negative', 'confidence': 0.8, 'model': 'm',
+     'probabilities': {'negative': 0.8, 'neutral': 0.1, 'positive': 0.1}},
+]
+
+
+class RenderBatchResultsTests(SimpleTestCase):
+    def test_every_format_varies_on_accept(self):
+        for fmt in (FORMAT_JSON, FORMAT_COLUMNAR):
+            response = render_batch_results(RESULTS, fmt, 'ensemble')
+            self.assertIn('Accept', response['Vary'], fmt)
+
+    def test_probabilities_are_opt_in(self):
+        body = json.loads(render_batch_results(RESULTS, FORMAT_JSON, 'ensemble').content)
+        self.assertNotIn('probabilities', body['results'][0])
+        self.assertNotIn('prob_positive', to_columns(RESULTS))
+
+        body = json.loads(render_batch_results(RESULTS, FORMAT_JSON, 'ensemble',
+                                               include_probabilities=True).content)
+        self.assertEqual(body['results'][0]['probabilities']['positive'], 0.9)
+        self.assertEqual(to_columns(RESULTS, include_probabilities=True)['prob_negative'],
+                         [0.05, 0.8])
+
+
+class BatchAnalyzeViewTests(TestCase):
+    def _post(self, **data):
+        return self.client.post(reverse('api_batch_analyze'), json.dumps(data),
+                                content_type='application/json')
+
+    def test_probabilities_only_computed_on_request(self):
+        with mock.patch('sentiment_app.views.analyzer.batch_analyze',
+                        return_value=RESULTS) as batch_analyze:
+            response = self._post(texts=['good', 'bad'])
+            self.assertFalse(batch_analyze.call_args.kwargs['include_probabilities'])
+            self._post(texts=['good', 'bad'], include_probabilities=True)
+            self.assertTrue(batch_analyze.call_args.kwargs['include_probabilities'])
+
+        self.assertEqual(response['Vary'].count('Accept'), 1)
+
+    def test_unsupported_format_varies_on_accept(self):
+        response = self._post(texts=['good'], format='yaml')
+        self.assertEqual(response.status_code, 406)
+        self.assertIn('Accept', response['Vary'])
@@ -0,0 +1,137 @@
+import fcntl
+import io
+import json
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from sentiment_app.uploads import (
+    ChunkedUpload, ChunkedUploadError, OffsetMismatch, UploadBusy, UploadTooLarge,
+)
+
+
+class StagingDirMixin:
+    def setUp(self):
+        super().setUp()
+        self.staging_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.staging_dir, ignore_errors=True)
+        overrides = override_settings(CHUNKED_UPLOAD_DIR=self.staging_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+
+class ChunkedUploadTests(StagingDirMixin, TestCase):
+    def test_chunks_resume_from_the_stored_size(self):
+        upload = ChunkedUpload.create(None, 'reviews.csv', total_size=10)
+
+        self.assertEqual(upload.append(io.BytesIO(b'12345'), 0), 5)
+        upload = ChunkedUpload.load(upload.upload_id)
+        self.assertEqual(upload.offset, 5)
+        self.assertFalse(upload.is_complete)
+
+        self.assertEqual(upload.append(io.BytesIO(b'67890'), 5), 10)
+        self.assertTrue(upload.is_complete)
+        with open(upload.path, 'rb') as handle:
+            self.assertEqual(handle.read(), b'1234567890')
+
+    def test_wrong_offset_reports_the_expected_one(self):
+        upload = ChunkedUpload.create(None, 'reviews.csv', total_size=10)
+        upload.append(io.BytesIO(b'abc'), 0)
+
+        with self.assertRaises(OffsetMismatch) as caught:
+            upload.append(io.BytesIO(b'abc'), 0)
+        self.assertEqual(caught.exception.expected, 3)
+        self.assertEqual(upload.offset, 3)
+
+    def test_concurrent_append_is_rejected_while_a_chunk_is_written(self):
+        upload = ChunkedUpload.create(None, 'reviews.csv', total_size=10)
+        with open(upload.path, 'ab') as other_writer:
+            fcntl.flock(other_writer, fcntl.LOCK_EX)
+            with self.assertRaises(UploadBusy):
+                upload.append(io.BytesIO(b'abc'), 0)
+        self.assertEqual(upload.offset, 0)
+
+        upload.append(io.BytesIO(b'abc'), 0)
+        self.assertEqual(upload.offset, 3)
+
+    def test_chunk_past_declared_size_is_rolled_back(self):
+        upload = ChunkedUpload.create(None, 'reviews.csv', total_size=4)
+        with self.assertRaises(Exception):
+            upload.append(io.BytesIO(b'too long'), 0)
+        self.assertEqual(upload.offset, 0)
+
+    def test_empty_upload_is_not_complete(self):
+        upload = ChunkedUpload.create(None, 'reviews.csv', total_size=3)
+        self.assertFalse(upload.is_complete)
+
+    @override_settings(CHUNKED_UPLOAD_MAX_BYTES=8)
+    def test_size_above_the_cap_is_rejected(self):
+        with self.assertRaises(UploadTooLarge):
+            ChunkedUpload.create(None, 'reviews.csv', total_size=9)
+
+    def test_cap_lowered_mid_upload_still_applies(self):
+        upload = ChunkedUpload.create(None, 'reviews.csv', total_size=10)
+        with override_settings(CHUNKED_UPLOAD_MAX_BYTES=4):
+            with self.assertRaises(ChunkedUploadError):
+                upload.append(io.BytesIO(b'123456'), 0)
+        self.assertEqual(upload.offset, 0)
+
+
+@override_settings(CHUNKED_UPLOAD_MAX_BYTES=100)
+class UploadStartTests(StagingDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_user('starter'))
+
+    def _start(self, **data):
+        return self.client.post(reverse('api_upload_start'), json.dumps(data),
+                                content_type='application/json')
+
+    def test_total_size_is_required(self):
+        response = self._start(file_name='reviews.csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('total_size', response.json()['error'])
+
+    def test_total_size_above_the_cap_is_too_large(self):
+        response = self._start(file_name='reviews.csv', total_size=101)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.json()['limit'], 100)
+        self.assertEqual(self._start(file_name='reviews.csv', total_size=100).status_code, 201)
+
+
+@override_settings(CHUNKED_UPLOAD_MAX_REVIEWS=3, ADMISSION_CONTROL={'ENABLED': False})
+class UploadCompleteTests(StagingDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('uploader', password='secret')
+        self.client.force_login(self.user)
+        body = ('reviewText\n' + '\n'.join(f'review {i}' for i in range(5)) + '\n').encode()
+        self.upload = ChunkedUpload.create(self.user, 'reviews.csv', total_size=len(body))
+        self.upload.append(io.BytesIO(body), 0)
+        self.url = reverse('api_upload_complete', args=[self.upload.upload_id])
+
+    def _complete(self, **data):
+        return self.client.post(self.url, json.dumps(data), content_type='application/json')
+
+    def test_max_reviews_above_the_limit_is_rejected(self):
+        response = self._complete(max_reviews=4)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('between 1 and 3', response.json()['error'])
+
+    def test_missing_max_reviews_is_capped_at_the_limit(self):
+        analysed = []
+
+        def fake_run(user, file_name, texts, **kwargs):
+            analysed.extend(texts)
+            return SimpleNamespace(id=1, total_reviews=len(texts)), SimpleNamespace(unique=len(texts))
+
+        with mock.patch('sentiment_app.views.run_bulk_analysis', side_effect=fake_run):
+            response = self._complete()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(analysed, ['review 0', 'review 1', 'review 2'])
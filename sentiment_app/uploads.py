@@ -0,0 +1,272 @@
+# sentiment_app/uploads.py
+"""
+Upload handling for bulk analysis.
+
+Uploaded files are parsed where Django already put them: a spooled temporary
+file is handed to the parser by path and an in-memory upload is read straight
+from its stream, so nothing is copied into ``media/uploads/`` unless
+``RETAIN_UPLOADS`` is enabled. Large files can also be sent in pieces through
+the resumable chunked upload API, staged under ``CHUNKED_UPLOAD_DIR``. A
+chunked upload declares its size up front. The size may not exceed
+``CHUNKED_UPLOAD_MAX_BYTES``, and no chunk may write past it.
+"""
+import fcntl
+import json
+import logging
+import os
+import time
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+logger = logging.getLogger(__name__)
+
+PARSE_CHUNK_SIZE = 10000
+COPY_BLOCK_SIZE = 64 * 1024
+
+
+class MissingColumnError(ValueError):
+    """The requested text column is not present in the uploaded file"""
+
+    def __init__(self, column):
+        self.column = column
+        super().__init__(f'Column "{column}" not found in file')
+
+
+def upload_source(uploaded_file):
+    """Return something pandas can read without copying the upload"""
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        return uploaded_file.temporary_file_path()
+    uploaded_file.seek(0)
+    return uploaded_file
+
+
+def is_excel(file_name):
+    return os.path.splitext(str(file_name))[1].lower() in ('.xlsx', '.xls')
+
+
+def iter_upload_texts(source, file_name, text_column, limit=None, chunksize=PARSE_CHUNK_SIZE):
+    """
+    Yield lists of non-empty texts from ``text_column``, chunk by chunk.
+
+    Only the text column is parsed, and CSV parsing stops as soon as ``limit``
+    texts have been produced.
+    """
+    import pandas as pd
+
+    remaining = limit
+
+    if is_excel(file_name):
+        # Excel workbooks cannot be streamed; at least only read one column
+        try:
+            df = pd.read_excel(source, usecols=lambda c: c == text_column)
+        except ValueError as e:
+            raise MissingColumnError(text_column) from e
+        chunks = [df]
+    else:
+        chunks = pd.read_csv(source, usecols=lambda c: c == text_column,
+                             dtype=str, chunksize=chunksize)
+
+    for chunk in chunks:
+        if text_column not in chunk.columns:
+            raise MissingColumnError(text_column)
+        texts = chunk[text_column].dropna().astype(str).tolist()
+        if remaining is not None:
+            texts = texts[:remaining]
+            remaining -= len(texts)
+        if texts:
+            yield texts
+        if remaining is not None and remaining <= 0:
+            break
+
+
+def read_upload_texts(source, file_name, text_column, limit=None):
+    texts = []
+    for chunk in iter_upload_texts(source, file_name, text_column, limit):
+        texts.extend(chunk)
+    return texts
+
+
+def retain_upload(uploaded_file):
+    """Keep a copy of the upload in media/uploads/ only when configured to"""
+    if not getattr(settings, 'RETAIN_UPLOADS', False):
+        return None
+    uploaded_file.seek(0)
+    fs = FileSystemStorage(location=os.path.join(settings.MEDIA_ROOT, 'uploads'))
+    return fs.save(uploaded_file.name, uploaded_file)
+
+
+# ---------------------------------------------------------------------------
+# Resumable chunked uploads
+# ---------------------------------------------------------------------------
+
+class ChunkedUploadError(Exception):
+    pass
+
+
+class OffsetMismatch(ChunkedUploadError):
+    def __init__(self, expected):
+        self.expected = expected
+        super().__init__(f'Chunk must start at offset {expected}')
+
+
+class UploadBusy(ChunkedUploadError):
+    def __init__(self, offset):
+        self.offset = offset
+        super().__init__('Another chunk of this upload is being written')
+
+
+class UploadTooLarge(ChunkedUploadError):
+    def __init__(self, limit):
+        self.limit = limit
+        super().__init__(f'Uploads are limited to {limit} bytes')
+
+
+def max_upload_bytes():
+    return getattr(settings, 'CHUNKED_UPLOAD_MAX_BYTES', 512 * 1024 * 1024)
+
+
+def get_staging_dir():
+    # Outside MEDIA_ROOT, so half-uploaded files are never served as media
+    staging_dir = getattr(settings, 'CHUNKED_UPLOAD_DIR',
+                          os.path.join(settings.BASE_DIR, 'staging', 'chunked'))
+    os.makedirs(staging_dir, exist_ok=True)
+    return staging_dir
+
+
+class ChunkedUpload:
+    """
+    A partially uploaded file: ``<id>.part`` holds the bytes received so far
+    and ``<id>.json`` its manifest. The resume offset is simply the size of
+    the part file, so a client can always ask where to continue from.
+    """
+
+    def __init__(self, upload_id, manifest):
+        self.upload_id = str(upload_id)
+        self.manifest = manifest
+
+    @classmethod
+    def _paths(cls, upload_id):
+        staging_dir = get_staging_dir()
+        return (os.path.join(staging_dir, f'{upload_id}.part'),
+                os.path.join(staging_dir, f'{upload_id}.json'))
+
+    @classmethod
+    def create(cls, user, file_name, total_size):
+        if total_size <= 0:
+            raise ChunkedUploadError('total_size must be positive')
+        if total_size > max_upload_bytes():
+            raise UploadTooLarge(max_upload_bytes())
+        upload_id = str(uuid.uuid4())
+        manifest = {
+            'file_name': os.path.basename(file_name),
+            'total_size': total_size,
+            'user_id': user.id if user is not None else None,
+            'created': time.time(),
+        }
+        part_path, manifest_path = cls._paths(upload_id)
+        open(part_path, 'wb').close()
+        with open(manifest_path, 'w') as handle:
+            json.dump(manifest, handle)
+        logger.info(f"Started chunked upload {upload_id} for {manifest['file_name']}")
+        return cls(upload_id, manifest)
+
+    @classmethod
+    def load(cls, upload_id):
+        """Return the upload, or None if it does not exist"""
+        upload_id = str(uuid.UUID(str(upload_id)))
+        part_path, manifest_path = cls._paths(upload_id)
+        if not os.path.exists(manifest_path) or not os.path.exists(part_path):
+            return None
+        with open(manifest_path) as handle:
+            return cls(upload_id, json.load(handle))
+
+    @property
+    def path(self):
+        return self._paths(self.upload_id)[0]
+
+    @property
+    def file_name(self):
+        return self.manifest['file_name']
+
+    @property
+    def total_size(self):
+        return self.manifest.get('total_size')
+
+    @property
+    def offset(self):
+        return os.path.getsize(self.path)
+
+    @property
+    def is_complete(self):
+        # Manifests from before total_size was required never complete
+        return self.total_size is not None and self.offset >= self.total_size
+
+    def belongs_to(self, user):
+        return self.manifest.get('user_id') == getattr(user, 'id', None)
+
+    def append(self, stream, offset):
+        """Append bytes read from ``stream``; ``offset`` must equal the current size"""
+        written = 0
+        # The server-wide cap applies even if it was lowered after the upload began
+        limit = min(self.total_size or 0, max_upload_bytes())
+        with open(self.path, 'ab') as handle:
+            # Hold an exclusive lock from the offset check to the last write, so
+            # two requests for the same offset cannot both append
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadBusy(self.offset)
+            current = os.fstat(handle.fileno()).st_size
+            if offset != current:
+                raise OffsetMismatch(current)
+
+            while True:
+                block = stream.read(COPY_BLOCK_SIZE)
+                if not block:
+                    break
+                handle.write(block)
+                written += len(block)
+                if current + written > limit:
+                    handle.truncate(current)
+                    raise ChunkedUploadError('Chunk exceeds the declared file size')
+        return self.offset
+
+    def delete(self):
+        for path in self._paths(self.upload_id):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def to_dict(self):
+        return {
+            'upload_id': self.upload_id,
+            'file_name': self.file_name,
+            'offset': self.offset,
+            'total_size': self.total_size,
+            'complete': self.is_complete,
+        }
+
+
+def cleanup_stale_uploads(max_age=None):
+    """Delete chunked uploads that were abandoned; returns how many were removed"""
+    if max_age is None:
+        max_age = getattr(settings, 'CHUNKED_UPLOAD_EXPIRY', 24 * 3600)
+    staging_dir = get_staging_dir()
+    cutoff = time.time() - max_age
+    removed = 0
+
+    for name in os.listdir(staging_dir):
+        if not name.endswith('.json'):
+            continue
+        upload_id = name[:-len('.json')]
+        part_path = os.path.join(staging_dir, f'{upload_id}.part')
+        last_activity = os.path.getmtime(part_path) if os.path.exists(part_path) \
+            else os.path.getmtime(os.path.join(staging_dir, name))
+        if last_activity < cutoff:
+            ChunkedUpload(upload_id, {}).delete()
+            removed += 1
+
+    if removed:
+        logger.info(f"Removed {removed} stale chunked uploads")
+    return removed
@@ -14,6 +14,10 @@ urlpatterns = [
     path('api/analyze/', views.api_analyze, name='api_analyze'),
     path('api/batch-analyze/', views.api_batch_analyze, name='api_batch_analyze'),
     path('api/stats/', views.api_stats, name='api_stats'),
+    path('api/batches/<int:batch_id>/summary/', views.api_batch_summary, name='api_batch_summary'),
+    path('api/uploads/', views.api_upload_start, name='api_upload_start'),
+    path('api/uploads/<uuid:upload_id>/', views.api_upload_chunk, name='api_upload_chunk'),
+    path('api/uploads/<uuid:upload_id>/complete/', views.api_upload_complete, name='api_upload_complete'),
     
     # Documentation
     path('api/docs/', views.api_documentation, name='api_docs'),
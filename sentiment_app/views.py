@@ -1,30 +1,74 @@
 # Create your views here.
 import json
-import pandas as pd
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse, HttpResponse
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_exempt
-from django.core.files.storage import FileSystemStorage
+from django.views.decorators.http import condition
 from django.contrib import messages
-from django.db.models import Count, Avg
+from django.core.files.storage import default_storage
 from django.core.paginator import Paginator
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
 
 from .forms import SingleAnalysisForm, BulkAnalysisForm
-from .models import SentimentAnalysis, BatchAnalysis
-from .services import SentimentAnalyzer
+from .models import SENTIMENT_CODES, SentimentAnalysis, BatchAnalysis
+from .services import analyzer
+from .admission import admission_controlled, json_texts_rows, max_reviews_rows, request_json
+from .analytics import get_user_analytics
+from .batch_summary import SUMMARY_VERSION, get_batch_summary
+from .archive import HistoryList, combined_totals
+from .data_version import get_data_modified, get_data_version, versioned
+from .reports import LABELS as REPORT_LABELS, batch_report_files
+from .response_formats import UnsupportedFormat, negotiate_format, render_batch_results
+from .bulk import run_bulk_analysis
+from .uploads import (
+    ChunkedUpload, ChunkedUploadError, MissingColumnError, OffsetMismatch, UploadBusy,
+    UploadTooLarge,
+    read_upload_texts, retain_upload, upload_source,
+)
 
-analyzer = SentimentAnalyzer()
+def cached_totals():
+    """combined_totals() for the current data version"""
+    return versioned('combined_totals', combined_totals)
 
+def data_etag(name, per_user=True):
+    """ETag function for views whose output only changes with the data version"""
+    def etag(request, *args, **kwargs):
+        if per_user and messages.get_messages(request):
+            # Pending flash messages must be rendered, not answered with a 304
+            return None
+        tag = f'{name}-{get_data_version()}'
+        if per_user:
+            tag += f'-{request.user.pk or 0}'
+        return tag
+    return etag
+
+def data_last_modified(per_user=True):
+    """Last-Modified function matching ``data_etag``"""
+    def last_modified(request, *args, **kwargs):
+        if per_user and messages.get_messages(request):
+            return None
+        modified = get_data_modified()
+        last_login = getattr(request.user, 'last_login', None) if per_user else None
+        if last_login is not None:
+            # The page also changes when its user signs in
+            modified = max(modified, last_login.replace(microsecond=0))
+        return modified
+    return last_modified
+
+@cache_control(no_cache=True)
+@condition(etag_func=data_etag('index'), last_modified_func=data_last_modified())
 def index(request):
     """Home page"""
-    # Get some statistics
+    # Get some statistics (hot table + archive rollups)
+    totals = cached_totals()
     stats = {
-        'total_analyses': SentimentAnalysis.objects.count(),
-        'positive_count': SentimentAnalysis.objects.filter(sentiment='positive').count(),
-        'negative_count': SentimentAnalysis.objects.filter(sentiment='negative').count(),
-        'neutral_count': SentimentAnalysis.objects.filter(sentiment='neutral').count(),
+        'total_analyses': totals['total'],
+        'positive_count': totals['positive'],
+        'negative_count': totals['negative'],
+        'neutral_count': totals['neutral'],
     }
     
     # Sample reviews for demonstration
@@ -41,6 +85,7 @@ def index(request):
         'sample_reviews': sample_reviews
     })
 
+@admission_controlled('analyze_single', json_response=False)
 def analyze_single(request):
     """Single review analysis"""
     if request.method == 'POST':
@@ -54,14 +99,11 @@ def analyze_single(request):
                 
                 # Save to database if user is authenticated
                 if request.user.is_authenticated:
-                    SentimentAnalysis.objects.create(
+                    SentimentAnalysis.from_result(
+                        result,
                         user=request.user,
                         text=text[:500],  # Store first 500 chars
-                        sentiment=result['sentiment'],
-                        confidence=result['confidence'],
-                        model_used=result['model'],
-                        meta_data=result
-                    )
+                    ).save()
                 
                 # Prepare data for visualization
                 chart_data = {
@@ -88,7 +130,17 @@ def analyze_single(request):
     
     return render(request, 'sentiment_app/analyze_single.html', {'form': form})
 
+def bulk_form_max_reviews():
+    """Most reviews one bulk form submission can analyze"""
+    return BulkAnalysisForm.base_fields['max_reviews'].max_value
+
+def upload_max_reviews():
+    """Most reviews one completed chunked upload can analyze"""
+    return getattr(settings, 'CHUNKED_UPLOAD_MAX_REVIEWS', 10000)
+
 @login_required
+@admission_controlled('analyze_bulk', rows=max_reviews_rows(bulk_form_max_reviews),
+                      json_response=False)
 def analyze_bulk(request):
     """Bulk file analysis"""
     if request.method == 'POST':
@@ -100,70 +152,29 @@ def analyze_bulk(request):
             max_reviews = form.cleaned_data['max_reviews']
             
             try:
-                # Save uploaded file - FIXED PATH
-                fs = FileSystemStorage(location='media/uploads/')
-                filename = fs.save(file.name, file)
-                file_path = fs.path(filename)
-                
-                # Read file
-                if filename.endswith('.csv'):
-                    df = pd.read_csv(file_path)
-                else:
-                    df = pd.read_excel(file_path)
-                
-                # Get text column
-                if text_column not in df.columns:
-                    messages.error(request, f'Column "{text_column}" not found in file')
-                    return render(request, 'sentiment_app/analyze_bulk.html', {'form': form})
-                
-                texts = df[text_column].dropna().tolist()
-                texts = texts[:max_reviews]  # Limit reviews
-                
-                # Analyze in batches to prevent timeout
-                results = []
-                batch_size = 50
+                # Parse straight from Django's upload (temp file path or memory)
+                texts = read_upload_texts(upload_source(file), file.name, text_column,
+                                          limit=max_reviews)
+                retained_name = retain_upload(file)
                 
-                for i in range(0, len(texts), batch_size):
-                    batch_texts = texts[i:i+batch_size]
-                    batch_results = analyzer.batch_analyze(batch_texts, model_type)
-                    results.extend(batch_results)
-                
-                # Create summary
-                sentiments = [r['sentiment'] for r in results if 'sentiment' in r]
-                sentiment_counts = pd.Series(sentiments).value_counts()
-                
-                # Create batch record
-                batch = BatchAnalysis.objects.create(
-                    user=request.user if request.user.is_authenticated else None,
-                    file_name=filename,
-                    total_reviews=len(texts),
-                    positive_count=sentiment_counts.get('positive', 0),
-                    negative_count=sentiment_counts.get('negative', 0),
-                    neutral_count=sentiment_counts.get('neutral', 0),
-                    average_confidence=sum(r.get('confidence', 0) for r in results) / len(results) if results else 0
+                batch, groups = run_bulk_analysis(
+                    request.user,
+                    retained_name or file.name,
+                    texts,
+                    model_type=model_type,
+                    dedup_mode=form.cleaned_data.get('dedup_mode'),
+                    similarity_threshold=form.cleaned_data.get('similarity_threshold'),
                 )
                 
-                # Save detailed results to CSV - FIXED PATH
-                import os
-                from django.conf import settings
-                
-                # Create reports directory if it doesn't exist
-                reports_dir = os.path.join(settings.MEDIA_ROOT, 'reports')
-                os.makedirs(reports_dir, exist_ok=True)
-                
-                # Save results
-                results_df = pd.DataFrame(results)
-                results_filename = f'batch_{batch.id}_results.csv'
-                results_path = os.path.join(reports_dir, results_filename)
-                results_df.to_csv(results_path, index=False)
-                
-                # Save relative path to database
-                batch.results_file.name = f'reports/{results_filename}'
-                batch.save()
-                
-                messages.success(request, f'Successfully analyzed {len(results)} reviews')
+                if groups.duplicates:
+                    messages.info(request, f'{groups.duplicates} duplicate reviews collapsed into '
+                                           f'{groups.unique} unique groups')
+                messages.success(request, f'Successfully analyzed {batch.total_reviews} reviews')
                 return redirect('batch_detail', batch_id=batch.id)
                 
+            except MissingColumnError as e:
+                messages.error(request, str(e))
+                return render(request, 'sentiment_app/analyze_bulk.html', {'form': form})
             except Exception as e:
                 messages.error(request, f'Error processing file: {str(e)}')
     
@@ -212,6 +223,8 @@ from django.conf import settings
 
 def read_results_file(file_path):
     """Safely read results CSV file"""
+    import pandas as pd
+    
     try:
         if os.path.exists(file_path):
             return pd.read_csv(file_path)
@@ -234,38 +247,21 @@ def read_results_file(file_path):
         print(f"Error reading file {file_path}: {e}")
         return None
 
-def dashboard(request):
-    """Interactive dashboard"""
-    # Get overall statistics
-    sentiment_dist = SentimentAnalysis.objects.values('sentiment').annotate(
-        count=Count('id')
-    ).order_by('sentiment')
-    
-    # Prepare data for charts - with safe defaults
-    labels = []
-    counts = [0, 0, 0]  # [negative, neutral, positive]
-    
-    for item in sentiment_dist:
-        sentiment = item['sentiment']
-        count = item['count']
-        
-        if sentiment == 'negative':
-            labels.append('Negative')
-            counts[0] = count
-        elif sentiment == 'neutral':
-            labels.append('Neutral')
-            counts[1] = count
-        elif sentiment == 'positive':
-            labels.append('Positive')
-            counts[2] = count
-    
-    # Ensure all labels exist
-    if 'Negative' not in labels:
-        labels.append('Negative')
-    if 'Neutral' not in labels:
-        labels.append('Neutral')
-    if 'Positive' not in labels:
-        labels.append('Positive')
+def dashboard_etag(request):
+    etag = data_etag('dashboard')(request)
+    analytics = get_user_analytics(request.user)
+    if etag and analytics:
+        # Time-windowed user numbers change when the analytics cache expires
+        etag += f"-{analytics['computed_at'].timestamp():.0f}"
+    return etag
+
+def build_dashboard_payload():
+    """Chart data and recent analyses shared by every dashboard visitor"""
+    # Get overall statistics (hot table + archive rollups)
+    totals = cached_totals()
+    
+    labels = ['Negative', 'Neutral', 'Positive']
+    counts = [totals['negative'], totals['neutral'], totals['positive']]
     
     chart_data = {
         'labels': labels,
@@ -274,37 +270,61 @@ def dashboard(request):
     }
     
     # Recent analyses
-    recent_analyses = SentimentAnalysis.objects.all().order_by('-created_at')[:10]
+    recent_analyses = list(
+        SentimentAnalysis.objects.select_related('model_version').order_by('-created_at')[:10]
+    )
     
-    return render(request, 'sentiment_app/dashboard.html', {
+    return {
         'chart_data': json.dumps(chart_data),
         'recent_analyses': recent_analyses,
-        'total_analyses': SentimentAnalysis.objects.count()
-    })
+        'total_analyses': totals['total'],
+    }
+
+@cache_control(no_cache=True)
+@condition(etag_func=dashboard_etag)
+def dashboard(request):
+    """Interactive dashboard"""
+    context = dict(versioned('dashboard_payload', build_dashboard_payload))
+    context['user_analytics'] = get_user_analytics(request.user)
+    return render(request, 'sentiment_app/dashboard.html', context)
 
 # sentiment_app/views.py - Add this function
 @csrf_exempt
+@admission_controlled('api_batch_analyze', rows=json_texts_rows)
 def api_batch_analyze(request):
-    """API endpoint for batch analysis"""
+    """
+    API endpoint for batch analysis.
+    
+    The response format is negotiated from a ``format`` option (body or query
+    string) or the Accept header: json (default), columnar, msgpack or arrow.
+    ``include_text`` (true by default) drops the text echo when set to false;
+    the probability vector is only added with ``include_probabilities: true``.
+    """
     if request.method == 'POST':
         try:
-            import json
-            data = json.loads(request.body)
+            data = request_json(request)
             texts = data.get('texts', [])
             model_type = data.get('model_type', 'ensemble')
+            include_text = data.get('include_text', True) is not False
+            include_probabilities = data.get('include_probabilities', False) is True
             
             if isinstance(texts, str):
                 texts = [texts]
             
+            try:
+                fmt = negotiate_format(request, data.get('format') or request.GET.get('format'))
+            except UnsupportedFormat as e:
+                response = JsonResponse({'success': False, 'error': str(e)}, status=406)
+                patch_vary_headers(response, ['Accept'])
+                return response
+            
             # Analyze using sentiment analyzer
-            results = sentiment_analyzer.batch_analyze(texts, model_type)
+            results = analyzer.batch_analyze(texts, model_type,
+                                             include_probabilities=include_probabilities)
             
-            return JsonResponse({
-                'success': True,
-                'results': results,
-                'count': len(results),
-                'model_used': model_type
-            })
+            return render_batch_results(results, fmt, model_type,
+                                        include_text=include_text,
+                                        include_probabilities=include_probabilities)
         except Exception as e:
             return JsonResponse({
                 'success': False,
@@ -313,24 +333,65 @@ def api_batch_analyze(request):
     
     return JsonResponse({'error': 'Method not allowed'}, status=405)
 
+def batch_summary_etag(request, batch_id):
+    """A completed batch's summary never changes, so its identity is the ETag"""
+    completed_at = BatchAnalysis.objects.filter(
+        id=batch_id, user=request.user, status='completed',
+    ).values_list('completed_at', flat=True).first()
+    if completed_at is None:
+        return None
+    return f'batch-{batch_id}-{completed_at.timestamp():.0f}-v{SUMMARY_VERSION}'
+
 @login_required
 def batch_detail(request, batch_id):
     """View batch analysis details"""
     batch = get_object_or_404(BatchAnalysis, id=batch_id, user=request.user)
     
-    # Read results file
-    if batch.results_file:
-        results_df = pd.read_csv(batch.results_file.path)
-        results = results_df.to_dict('records')
-    else:
-        results = []
+    # Served from the precomputed summary instead of re-reading the report
+    summary = get_batch_summary(batch)
+    
+    reports = [
+        {'label': REPORT_LABELS[fmt], 'url': default_storage.url(name)}
+        for fmt, name in batch_report_files(batch)
+    ]
     
     return render(request, 'sentiment_app/batch_detail.html', {
         'batch': batch,
-        'results': results[:50],  # Show first 50 results
+        'summary': summary,
+        'results': summary['sample'] if summary else [],
+        'reports': reports,
+    })
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=batch_summary_etag)
+def api_batch_summary(request, batch_id):
+    """API endpoint for a batch's precomputed summary"""
+    batch = get_object_or_404(BatchAnalysis, id=batch_id, user=request.user)
+    summary = get_batch_summary(batch)
+    if summary is None:
+        return JsonResponse({
+            'success': False,
+            'error': f'No summary available for a {batch.status} batch',
+            'status': batch.status,
+        }, status=409 if batch.status != 'completed' else 404)
+    
+    return JsonResponse({
+        'success': True,
+        'batch_id': batch.id,
+        'status': batch.status,
+        'total_reviews': batch.total_reviews,
+        'sentiment_distribution': {
+            'positive': batch.positive_count,
+            'negative': batch.negative_count,
+            'neutral': batch.neutral_count,
+        },
+        'average_confidence': batch.average_confidence,
+        'summary': summary,
     })
 
 @csrf_exempt
+@admission_controlled('api_analyze')
 def api_analyze(request):
     """API endpoint for single analysis"""
     if request.method == 'POST':
@@ -358,16 +419,20 @@ def api_analyze(request):
     
     return JsonResponse({'error': 'Method not allowed'}, status=405)
 
+@cache_control(no_cache=True)
+@condition(etag_func=data_etag('stats', per_user=False),
+           last_modified_func=data_last_modified(per_user=False))
 def api_stats(request):
     """API endpoint for statistics"""
+    totals = cached_totals()
     stats = {
-        'total_analyses': SentimentAnalysis.objects.count(),
+        'total_analyses': totals['total'],
         'sentiment_distribution': {
-            'positive': SentimentAnalysis.objects.filter(sentiment='positive').count(),
-            'negative': SentimentAnalysis.objects.filter(sentiment='negative').count(),
-            'neutral': SentimentAnalysis.objects.filter(sentiment='neutral').count(),
+            'positive': totals['positive'],
+            'negative': totals['negative'],
+            'neutral': totals['neutral'],
         },
-        'average_confidence': SentimentAnalysis.objects.aggregate(Avg('confidence'))['confidence__avg'] or 0,
+        'average_confidence': totals['average_confidence'],
     }
     
     return JsonResponse(stats)
@@ -376,11 +441,12 @@ def api_stats(request):
 @login_required
 def analysis_history(request):
     """View analysis history with export, filter, and search functionality"""
-    analyses = SentimentAnalysis.objects.filter(user=request.user).order_by('-created_at')
+    analyses = SentimentAnalysis.objects.filter(user=request.user).select_related(
+        'model_version').order_by('-created_at')
     
     # Handle filtering by sentiment
     sentiment_filter = request.GET.get('sentiment')
-    if sentiment_filter and sentiment_filter != 'all':
+    if sentiment_filter in SENTIMENT_CODES:
         analyses = analyses.filter(sentiment=sentiment_filter)
     
     # Handle search
@@ -388,6 +454,20 @@ def analysis_history(request):
     if search_query:
         analyses = analyses.filter(text__icontains=search_query)
     
+    # Cached per-user totals double as the paginator count
+    analytics = get_user_analytics(request.user)
+    sentiment = sentiment_filter if sentiment_filter in SENTIMENT_CODES else None
+    total = analytics['distribution'][sentiment] if sentiment else analytics['total']
+    
+    # Archived analyses follow the hot rows transparently
+    analyses = HistoryList(
+        analyses,
+        user=request.user,
+        sentiment=sentiment,
+        search=search_query,
+        total=total,
+    )
+    
     # Handle export requests
     export_format = request.GET.get('export')
     if export_format in ['csv', 'excel']:
@@ -402,10 +482,13 @@ def analysis_history(request):
         'page_obj': page_obj,
         'current_filter': sentiment_filter,
         'search_query': search_query,
+        'analytics': analytics,
     })
 
 def export_history(queryset, format_type):
     """Export analysis history to CSV or Excel"""
+    import pandas as pd
+    
     # Prepare data
     data = []
     for analysis in queryset:
@@ -462,6 +545,103 @@ def delete_analysis(request, analysis_id):
     return JsonResponse({'error': 'Method not allowed'}, status=405)
 
 
+@csrf_exempt
+@login_required
+def api_upload_start(request):
+    """Start a resumable chunked upload"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    
+    try:
+        data = json.loads(request.body or '{}')
+        file_name = data.get('file_name', '')
+        total_size = data.get('total_size')
+        if not file_name:
+            return JsonResponse({'error': 'file_name is required'}, status=400)
+        if total_size is None:
+            return JsonResponse({'error': 'total_size is required'}, status=400)
+        
+        upload = ChunkedUpload.create(request.user, file_name, int(total_size))
+        return JsonResponse(upload.to_dict(), status=201)
+    except UploadTooLarge as e:
+        return JsonResponse({'error': str(e), 'limit': e.limit}, status=413)
+    except (ChunkedUploadError, ValueError, TypeError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+@csrf_exempt
+@login_required
+def api_upload_chunk(request, upload_id):
+    """Report the resume offset (GET) or append a chunk at ?offset=N (PUT/POST)"""
+    upload = ChunkedUpload.load(upload_id)
+    if upload is None or not upload.belongs_to(request.user):
+        return JsonResponse({'error': 'Upload not found'}, status=404)
+    
+    if request.method in ('GET', 'HEAD'):
+        return JsonResponse(upload.to_dict())
+    
+    if request.method not in ('PUT', 'POST'):
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    
+    try:
+        offset = int(request.GET.get('offset', 0))
+        # Stream the body to disk instead of loading it into memory
+        upload.append(request, offset)
+        return JsonResponse(upload.to_dict())
+    except OffsetMismatch as e:
+        return JsonResponse({'error': str(e), 'offset': e.expected}, status=409)
+    except UploadBusy as e:
+        return JsonResponse({'error': str(e), 'offset': e.offset}, status=409)
+    except (ChunkedUploadError, ValueError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+@csrf_exempt
+@login_required
+@admission_controlled('api_upload_complete', rows=max_reviews_rows(upload_max_reviews))
+def api_upload_complete(request, upload_id):
+    """Run bulk analysis on a fully uploaded file and discard the staged copy"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    
+    upload = ChunkedUpload.load(upload_id)
+    if upload is None or not upload.belongs_to(request.user):
+        return JsonResponse({'error': 'Upload not found'}, status=404)
+    if not upload.is_complete:
+        return JsonResponse({'error': 'Upload is incomplete', 'offset': upload.offset}, status=409)
+    
+    try:
+        data = request_json(request)
+        # Scoring runs inside this request, so it is always capped
+        limit = upload_max_reviews()
+        max_reviews = int(data.get('max_reviews') or limit)
+        if not 1 <= max_reviews <= limit:
+            return JsonResponse({
+                'success': False,
+                'error': f'max_reviews must be between 1 and {limit}',
+            }, status=400)
+        texts = read_upload_texts(upload.path, upload.file_name,
+                                  data.get('text_column', 'reviewText'),
+                                  limit=max_reviews)
+        
+        batch, groups = run_bulk_analysis(
+            request.user,
+            upload.file_name,
+            texts,
+            model_type=data.get('model_type', 'ensemble'),
+            dedup_mode=data.get('dedup_mode'),
+            similarity_threshold=data.get('similarity_threshold'),
+        )
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    upload.delete()
+    return JsonResponse({
+        'success': True,
+        'batch_id': batch.id,
+        'total_reviews': batch.total_reviews,
+        'unique_reviews': groups.unique,
+    })
+
+
 def api_documentation(request):
     """API documentation page"""
     return render(request, 'sentiment_app/api_docs.html')
\ No newline at end of file